@@ -0,0 +1,279 @@
+"""HTTP load test for the triage API.
+
+Drives the fraud, credit, unified triage and KPI endpoints through the full
+FastAPI stack (routing, validation, serialization) with closed-loop workers,
+stepping concurrency up to draw a saturation curve.
+
+	# in-process, via an ASGI transport (no sockets)
+	python -m benchmarks.load --concurrency 1,4,16,64 --duration 10
+
+	# against a running server, or one started for the run
+	python -m benchmarks.load --url http://127.0.0.1:8000
+	python -m benchmarks.load --spawn-uvicorn --workers 2 --out load.json
+
+Latencies are kept in HDR-style histograms (microsecond values), so the
+reported p50/p95/p99 carry at most ~1.6% relative error.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+
+from benchmarks.synthetic import SyntheticBank
+from src.core.histogram import LatencyHistogram
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_MIX = "fraud=6,credit=2,triage=1,kpis=1"
+_ACCOUNTS = 200  # synthetic accounts requests are spread over
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+	mix = {}
+	for part in spec.split(","):
+		name, _, weight = part.partition("=")
+		name = name.strip()
+		if name not in ("fraud", "credit", "triage", "kpis"):
+			raise ValueError(f"unknown endpoint in mix: {name!r}")
+		mix[name] = float(weight or 1)
+	return mix
+
+
+class RequestFactory:
+	"""Seeded request generator; each worker gets its own stream."""
+
+	def __init__(self, seed: int) -> None:
+		self.bank = SyntheticBank(seed)
+		self.accounts = [self.bank.account(0, account_id=f"load-{i:04d}") for i in range(_ACCOUNTS)]
+
+	def make(self, kind: str, rng: random.Random) -> tuple[str, str, dict | None]:
+		if kind == "kpis":
+			return "GET", "/api/v1/analytics/kpis", None
+		if kind == "credit":
+			return "POST", "/api/v1/credit/triage", self.bank.credit_application()
+		txn = self.bank.transaction(rng.choice(self.accounts))
+		if kind == "triage":
+			payload = self.bank.credit_application() if rng.random() < 0.25 else txn
+			return "POST", "/api/v1/triage", {"payload": payload}
+		return "POST", "/api/v1/fraud/triage", txn
+
+
+class StepStats:
+	def __init__(self) -> None:
+		self.hist: dict[str, LatencyHistogram] = {}
+		self.overall = LatencyHistogram()
+		self.requests = 0
+		self.errors: dict[str, int] = {}
+
+	def record(self, kind: str, latency_s: float, error: str | None) -> None:
+		us = latency_s * 1e6
+		self.hist.setdefault(kind, LatencyHistogram()).record(us)
+		self.overall.record(us)
+		self.requests += 1
+		if error is not None:
+			self.errors[error] = self.errors.get(error, 0) + 1
+
+	@staticmethod
+	def _latency_ms(hist: LatencyHistogram) -> dict:
+		out = {k: (v / 1000.0 if v is not None else None) for k, v in hist.percentiles((50, 95, 99)).items()}
+		out["max"] = hist.max_value / 1000.0
+		return out
+
+	def summary(self, concurrency: int, elapsed_s: float) -> dict:
+		n_errors = sum(self.errors.values())
+		return {
+			"concurrency": concurrency,
+			"duration_s": elapsed_s,
+			"requests": self.requests,
+			"throughput_rps": self.requests / elapsed_s if elapsed_s else 0.0,
+			"error_rate": n_errors / self.requests if self.requests else 0.0,
+			"errors": dict(self.errors),
+			"latency_ms": self._latency_ms(self.overall),
+			"by_endpoint": {
+				kind: {"requests": h.total, "latency_ms": self._latency_ms(h)}
+				for kind, h in sorted(self.hist.items())
+			},
+		}
+
+
+async def run_step(client: httpx.AsyncClient, factory: RequestFactory, mix: dict[str, float], *, concurrency: int, duration_s: float, seed: int) -> dict:
+	"""Run `concurrency` closed-loop workers for `duration_s` seconds."""
+	stats = StepStats()
+	kinds, weights = list(mix), list(mix.values())
+	deadline = perf_counter() + duration_s
+
+	async def worker(n: int) -> None:
+		rng = random.Random(seed * 1_000 + n)
+		while perf_counter() < deadline:
+			kind = rng.choices(kinds, weights)[0]
+			method, path, body = factory.make(kind, rng)
+			error = None
+			t0 = perf_counter()
+			try:
+				resp = await client.request(method, path, json=body)
+				# Read the body so serialization cost is included
+				await resp.aread()
+				if resp.status_code >= 400:
+					error = f"http_{resp.status_code}"
+			except httpx.HTTPError as exc:
+				error = type(exc).__name__
+			stats.record(kind, perf_counter() - t0, error)
+
+	started = perf_counter()
+	await asyncio.gather(*(worker(i) for i in range(concurrency)))
+	return stats.summary(concurrency, perf_counter() - started)
+
+
+def saturation(steps: list[dict], budget_ms: float) -> dict:
+	"""Summarize the curve: peak throughput and where p99 first exceeds the budget."""
+	if not steps:
+		return {}
+	peak = max(steps, key=lambda s: s["throughput_rps"])
+	over = next((s["concurrency"] for s in steps if (s["latency_ms"]["p99"] or 0) > budget_ms), None)
+	return {
+		"peak_throughput_rps": peak["throughput_rps"],
+		"peak_concurrency": peak["concurrency"],
+		"p99_budget_ms": budget_ms,
+		"p99_over_budget_at_concurrency": over,
+	}
+
+
+@asynccontextmanager
+async def _in_process_client(max_connections: int):
+	from main import app
+
+	# ASGITransport does not run lifespan events; run them here so warm-up
+	# matches a real server
+	async with app.router.lifespan_context(app):
+		transport = httpx.ASGITransport(app=app)
+		async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30.0) as client:
+			yield client
+
+
+@asynccontextmanager
+async def _http_client(url: str, max_connections: int):
+	limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+	async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+		yield client
+
+
+def _free_port() -> int:
+	with socket.socket() as s:
+		s.bind(("127.0.0.1", 0))
+		return s.getsockname()[1]
+
+
+async def _spawn_uvicorn(workers: int) -> tuple[subprocess.Popen, str]:
+	port = _free_port()
+	proc = subprocess.Popen(
+		[sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+		cwd=PROJECT_ROOT,
+	)
+	url = f"http://127.0.0.1:{port}"
+	async with httpx.AsyncClient(base_url=url, timeout=2.0) as client:
+		for _ in range(300):
+			if proc.poll() is not None:
+				raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+			try:
+				if (await client.get("/health")).status_code == 200:
+					return proc, url
+			except httpx.HTTPError:
+				pass
+			await asyncio.sleep(0.1)
+	proc.terminate()
+	raise RuntimeError("uvicorn did not become healthy within 30s")
+
+
+async def run(*, concurrency: list[int], duration_s: float, warmup_s: float, mix: dict[str, float], seed: int, url: str | None, spawn_uvicorn: bool, workers: int, budget_ms: float) -> dict:
+	proc = None
+	if spawn_uvicorn:
+		proc, url = await _spawn_uvicorn(workers)
+	mode = "http" if url else "asgi"
+	factory = RequestFactory(seed)
+	steps = []
+	try:
+		client_cm = _http_client(url, max(concurrency)) if url else _in_process_client(max(concurrency))
+		async with client_cm as client:
+			if warmup_s > 0:
+				await run_step(client, factory, mix, concurrency=min(concurrency), duration_s=warmup_s, seed=seed + 1)
+			for c in concurrency:
+				step = await run_step(client, factory, mix, concurrency=c, duration_s=duration_s, seed=seed)
+				steps.append(step)
+				lat = step["latency_ms"]
+				print(
+					f"c={c:<5} {step['throughput_rps']:>9.1f} req/s  err {step['error_rate']:>6.2%}  "
+					f"p50 {lat['p50']:>8.2f}ms  p95 {lat['p95']:>8.2f}ms  p99 {lat['p99']:>8.2f}ms  max {lat['max']:>8.2f}ms",
+					file=sys.stderr,
+				)
+	finally:
+		if proc is not None:
+			proc.terminate()
+			proc.wait(timeout=10)
+	return {
+		"suite": "load",
+		"created_at": datetime.now(timezone.utc).isoformat(),
+		"mode": mode,
+		"target": url or "main:app",
+		"uvicorn_workers": workers if spawn_uvicorn else None,
+		"mix": mix,
+		"seed": seed,
+		"duration_s": duration_s,
+		"steps": steps,
+		"saturation": saturation(steps, budget_ms),
+	}
+
+
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--url", help="base URL of a running server; default drives main:app in-process")
+	parser.add_argument("--spawn-uvicorn", action="store_true", help="start uvicorn on a free port for the run")
+	parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes with --spawn-uvicorn")
+	parser.add_argument("--concurrency", default="1,2,4,8,16,32,64", help="comma-separated concurrency steps")
+	parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency step")
+	parser.add_argument("--warmup", type=float, default=2.0, help="seconds of unrecorded warm-up")
+	parser.add_argument("--mix", default=DEFAULT_MIX, help=f"endpoint weights (default: {DEFAULT_MIX})")
+	parser.add_argument("--seed", type=int, default=7)
+	parser.add_argument("--budget-ms", type=float, help="p99 budget for the saturation summary (default: SLA_BUDGET_MS)")
+	parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+	args = parser.parse_args(argv)
+
+	if args.url and args.spawn_uvicorn:
+		parser.error("--url and --spawn-uvicorn are mutually exclusive")
+	if args.budget_ms is None:
+		from src.core.config import get_settings
+
+		args.budget_ms = float(get_settings().sla_budget_ms)
+	os.chdir(PROJECT_ROOT)  # main:app resolves ./static and ./data relative to cwd
+
+	report = asyncio.run(run(
+		concurrency=[int(c) for c in args.concurrency.split(",") if c],
+		duration_s=args.duration,
+		warmup_s=args.warmup,
+		mix=parse_mix(args.mix),
+		seed=args.seed,
+		url=args.url,
+		spawn_uvicorn=args.spawn_uvicorn,
+		workers=args.workers,
+		budget_ms=args.budget_ms,
+	))
+	text = json.dumps(report, indent=2)
+	if args.out:
+		Path(args.out).write_text(text + "\n", encoding="utf-8")
+	else:
+		print(text)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,227 @@
+"""Micro-benchmarks for the fraud and credit hot paths.
+
+Run from the project root:
+
+	python -m benchmarks.micro --out bench.json
+	python -m benchmarks.micro --filter build_features --min-time 0.5
+
+Every case runs on data from a seeded `SyntheticBank`, so results from
+different commits are comparable. The JSON report records ops/sec and the
+per-call latency distribution of each case along with the commit and
+interpreter it was produced on.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from statistics import mean, pstdev
+from time import perf_counter_ns
+from typing import Callable
+
+from benchmarks.synthetic import SyntheticBank
+from src.agents.credit_risk_agent import CreditRiskAgent
+from src.agents.fraud_triage_agent import FraudTriageAgent
+from src.credit_risk.affordability_calculator import compute_dti
+from src.credit_risk.scorecard import calculate_scorecard
+from src.fraud_detection.anomaly_detector import zscore_to_anomaly
+from src.fraud_detection.feature_engineering import build_features
+from src.fraud_detection.rule_engine import evaluate_rules
+from src.fraud_detection.telemetry import TriageEvent, compute_kpis, record_event, record_label
+
+
+HISTORY_DEPTHS = (10, 1_000, 100_000)
+_POOL = 64  # distinct inputs cycled through per case
+
+
+def _percentile(sorted_ns: list[int], p: float) -> float:
+	if not sorted_ns:
+		return 0.0
+	k = (len(sorted_ns) - 1) * p / 100.0
+	lo = int(k)
+	hi = min(lo + 1, len(sorted_ns) - 1)
+	return sorted_ns[lo] + (sorted_ns[hi] - sorted_ns[lo]) * (k - lo)
+
+
+def measure(fn: Callable[[int], object], *, min_time_s: float, min_calls: int = 5, max_calls: int = 200_000) -> dict:
+	"""Call `fn(i)` repeatedly until `min_time_s` has elapsed, timing each call."""
+	for i in range(min(3, min_calls)):  # warm caches and lazy imports
+		fn(i)
+	samples: list[int] = []
+	budget_ns = int(min_time_s * 1e9)
+	spent = 0
+	i = 0
+	while (spent < budget_ns or i < min_calls) and i < max_calls:
+		t0 = perf_counter_ns()
+		fn(i)
+		dt = perf_counter_ns() - t0
+		samples.append(dt)
+		spent += dt
+		i += 1
+	samples.sort()
+	us = 1e-3
+	return {
+		"calls": len(samples),
+		"ops_per_sec": len(samples) / (spent / 1e9) if spent else None,
+		"latency_us": {
+			"min": samples[0] * us,
+			"mean": mean(samples) * us,
+			"stdev": pstdev(samples) * us,
+			"p50": _percentile(samples, 50) * us,
+			"p90": _percentile(samples, 90) * us,
+			"p99": _percentile(samples, 99) * us,
+			"max": samples[-1] * us,
+		},
+	}
+
+
+def _cases(seed: int, depths: tuple[int, ...]) -> list[tuple[str, dict, Callable[[], Callable[[int], object]]]]:
+	"""(name, params, setup) triples; `setup` builds inputs and returns the timed callable."""
+	cases = []
+
+	def fraud_inputs(depth: int):
+		bank = SyntheticBank(seed)
+		account = bank.account(depth)
+		txns = [bank.transaction(account) for _ in range(_POOL)]
+		return bank, account, txns
+
+	for depth in depths:
+		def setup_features(depth=depth):
+			bank, account, txns = fraud_inputs(depth)
+
+			def run(i: int):
+				t = txns[i % _POOL]
+				return build_features(t["amount"], bank.now, t["mcc"], t["geo"], t["device_id"], account.history)
+			return run
+
+		def setup_triage(depth=depth):
+			bank, account, txns = fraud_inputs(depth)
+			agent = FraudTriageAgent()
+
+			def run(i: int):
+				t = txns[i % _POOL]
+				return agent.triage(amount=t["amount"], mcc=t["mcc"], geo=t["geo"], device_id=t["device_id"], history=account.history, now=bank.now)
+			return run
+
+		cases.append(("build_features", {"history_depth": depth}, setup_features))
+		cases.append(("FraudTriageAgent.triage", {"history_depth": depth}, setup_triage))
+
+	def setup_rules():
+		bank, account, txns = fraud_inputs(1_000)
+		feats = [build_features(t["amount"], bank.now, t["mcc"], t["geo"], t["device_id"], account.history) for t in txns]
+		return lambda i: evaluate_rules(feats[i % _POOL])
+
+	def setup_zscore():
+		import random
+
+		rng = random.Random(seed)
+		zs = [rng.uniform(-6.0, 6.0) for _ in range(_POOL)]
+		return lambda i: zscore_to_anomaly(zs[i % _POOL])
+
+	def setup_scorecard():
+		bank = SyntheticBank(seed)
+		apps = [bank.credit_application() for _ in range(_POOL)]
+		args = [
+			{
+				"dti": compute_dti(a["income"], a["liabilities"]),
+				"delinquencies": len(a["delinquency_flags"]),
+				"requested_limit_ratio": a["requested_limit"] / a["income"],
+			}
+			for a in apps
+		]
+		return lambda i: calculate_scorecard(**args[i % _POOL])
+
+	def setup_credit():
+		bank = SyntheticBank(seed)
+		apps = [bank.credit_application() for _ in range(_POOL)]
+		agent = CreditRiskAgent()
+
+		def run(i: int):
+			a = apps[i % _POOL]
+			return agent.triage(income=a["income"], liabilities=a["liabilities"], delinquency_flags=a["delinquency_flags"], requested_limit=a["requested_limit"])
+		return run
+
+	def setup_kpis():
+		# Fill the telemetry window with labelled events so KPIs have work to do
+		bank = SyntheticBank(seed)
+		rng = bank.rng
+		for n in range(5_000):
+			band = rng.choices(("low", "medium", "high"), (85, 10, 5))[0]
+			event_id = f"bench-{n}"
+			record_event(TriageEvent(
+				event_id=event_id, timestamp_s=0.0, intent="fraud", payload={},
+				decision="review", risk_band=band, alert_score=0.0, explanations=[],
+				features={}, sla_ms=rng.randint(1, 200),
+			))
+			if rng.random() < 0.3:
+				record_label(event_id, "fraud" if rng.random() < 0.2 else "genuine")
+		return lambda i: compute_kpis()
+
+	cases += [
+		("evaluate_rules", {}, setup_rules),
+		("zscore_to_anomaly", {}, setup_zscore),
+		("calculate_scorecard", {}, setup_scorecard),
+		("CreditRiskAgent.triage", {}, setup_credit),
+		("compute_kpis", {"events": 5_000}, setup_kpis),
+	]
+	return cases
+
+
+def _git_commit() -> str | None:
+	try:
+		out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent, timeout=5)
+	except (OSError, subprocess.SubprocessError):
+		return None
+	return out.stdout.strip() or None
+
+
+def run(*, seed: int = 7, min_time_s: float = 1.0, depths: tuple[int, ...] = HISTORY_DEPTHS, name_filter: str | None = None) -> dict:
+	results = []
+	for name, params, setup in _cases(seed, depths):
+		if name_filter and name_filter not in name:
+			continue
+		fn = setup()
+		stats = measure(fn, min_time_s=min_time_s)
+		results.append({"name": name, "params": params, **stats})
+		label = name + "".join(f" {k}={v}" for k, v in params.items())
+		print(f"{label:<48} {stats['ops_per_sec']:>12,.0f} ops/s  p50 {stats['latency_us']['p50']:>10.1f}us  p99 {stats['latency_us']['p99']:>10.1f}us", file=sys.stderr)
+	return {
+		"suite": "micro",
+		"created_at": datetime.now(timezone.utc).isoformat(),
+		"commit": _git_commit(),
+		"seed": seed,
+		"min_time_s": min_time_s,
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"results": results,
+	}
+
+
+def main(argv: list[str] | None = None) -> None:
+	parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+	parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+	parser.add_argument("--seed", type=int, default=7)
+	parser.add_argument("--min-time", type=float, default=1.0, help="seconds of timed calls per case")
+	parser.add_argument("--depths", default=",".join(str(d) for d in HISTORY_DEPTHS), help="comma-separated history depths")
+	parser.add_argument("--filter", help="only run cases whose name contains this text")
+	args = parser.parse_args(argv)
+
+	report = run(
+		seed=args.seed,
+		min_time_s=args.min_time,
+		depths=tuple(int(d) for d in args.depths.split(",") if d),
+		name_filter=args.filter,
+	)
+	text = json.dumps(report, indent=2)
+	if args.out:
+		Path(args.out).write_text(text + "\n", encoding="utf-8")
+	else:
+		print(text)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,8 +1,14 @@
+from time import perf_counter
+
+_IMPORT_STARTED = perf_counter()
+
+import asyncio
 import logging
 import os
 import sys
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -12,6 +18,8 @@ if CURRENT_DIR not in sys.path:
 	sys.path.insert(0, CURRENT_DIR)
 
 from src.core.config import get_settings
+from src.core.metrics import registry as metrics_registry
+from src.core.startup import prewarm, report as startup_report
 
 # Import API routes (implemented incrementally)
 try:
@@ -21,6 +29,7 @@ except Exception as import_exc:  # Avoid hard failure during initial scaffold
 	logging.getLogger(__name__).warning(
 		"Banking API routes not yet available: %s", import_exc
 	)
+startup_report.record_phase("import", perf_counter() - _IMPORT_STARTED)
 
 
 @asynccontextmanager
@@ -28,12 +37,39 @@ async def lifespan(app: FastAPI):
 	"""Application startup/shutdown hooks.
 
 	- Load configuration
-	- Later: initialize DB connections, vector stores, etc.
+	- Warm the triage graph, scoring path, anomaly model, policy index and
+	  Redis concurrently (src.core.startup); /ready reports when that is done
+	- Start the stream consumer when one is configured
 	"""
+	started = perf_counter()
 	settings = get_settings()
 	logging.basicConfig(level=logging.INFO)
 	logging.getLogger(__name__).info("Starting Banking Ops API in %s mode", "debug" if settings.allow_debug else "prod")
+	prewarm_task = None
+	if banking_router is not None:
+		if settings.startup_prewarm:
+			prewarm_task = asyncio.create_task(prewarm())
+			if settings.startup_block_until_ready:
+				await prewarm_task
+		else:
+			startup_report.ready = True
+		if settings.stream_consumer_source:
+			from src.channels.stream_consumer import consumer_from_settings, start_consumer
+			start_consumer(consumer_from_settings())
+	else:
+		startup_report.ready = True
+	startup_report.record_phase("lifespan", perf_counter() - started)
 	yield
+	if prewarm_task is not None and not prewarm_task.done():
+		prewarm_task.cancel()
+	if banking_router is not None:
+		from src.agents import rationale_worker, scoring_pool
+		from src.channels.stream_consumer import stop_consumers
+		from src.fraud_detection import training_jobs
+		await stop_consumers()
+		await rationale_worker.shutdown()
+		scoring_pool.shutdown()
+		training_jobs.shutdown()
 	logging.getLogger(__name__).info("Shutting down Banking Ops API")
 
 
@@ -67,6 +103,22 @@ async def root():
 	return {"status": "ok", "service": "banking-ops"}
 
 
+@app.get("/ready")
+async def ready():
+	"""Readiness probe: 503 until startup prewarm finishes, with the timing breakdown.
+
+	Components that failed to warm are listed under `degraded` (status
+	"degraded"); the worker still takes traffic and retries them lazily.
+	"""
+	return JSONResponse(startup_report.to_dict(), status_code=200 if startup_report.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+	"""Prometheus scrape endpoint: per-stage latency histograms and decision counters."""
+	return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if banking_router is not None:
 	app.include_router(banking_router, prefix="/api/v1")
 
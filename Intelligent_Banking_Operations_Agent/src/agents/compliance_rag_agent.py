@@ -19,12 +19,21 @@ class ComplianceRAGAgent:
 		self.retriever = retriever
 
 	def cite(self, query_text: str, k: int = 3) -> ComplianceResult:
-		results = self.retriever.query(query_text, k=k)
+		return self.cite_many([query_text], k=k)[0]
+
+	def cite_many(self, query_texts: list[str], k: int = 3) -> list[ComplianceResult]:
+		"""Ground several queries with one batched retrieval; results keep input order."""
+		return [self._result(results) for results in self.retriever.query_many(query_texts, k=k)]
+
+	@staticmethod
+	def _result(results: list[dict]) -> ComplianceResult:
 		citations: list[str] = []
 		snippets: list[str] = []
 		for r in results:
-			citations.append(r["metadata"].get("title", r["doc_id"]))
-			snippets.append(r["text"][:400])
+			meta = r["metadata"] or {}
+			title = meta.get("title", r["doc_id"])
+			# Section chunks cite "Title Section x.y"; whole-document entries cite the title
+			section = meta.get("section")
+			citations.append(f"{title} Section {section}" if section and section != "preamble" else title)
+			snippets.append(r["text"] if section else r["text"][:400])
 		return ComplianceResult(citations=citations, snippets=snippets)
-
-
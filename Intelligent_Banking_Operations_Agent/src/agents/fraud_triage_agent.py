@@ -6,10 +6,13 @@ from typing import Any
 
 from time import perf_counter
 
-from src.fraud_detection.feature_engineering import HistoricalTxn, build_features
-from src.fraud_detection.rule_engine import evaluate_rules
-from src.fraud_detection.anomaly_detector import choose_anomaly_score
+import numpy as np
+
+from src.fraud_detection.feature_engineering import FEATURE_NAMES, AccountFeatureState, HistoricalTxn, build_features, build_features_batch, build_features_from_state
+from src.fraud_detection.rule_engine import evaluate_rules, evaluate_rules_batch
+from src.fraud_detection.anomaly_detector import choose_anomaly_score, choose_anomaly_scores
 from src.fraud_detection.fraud_config import get_config
+from src.core.metrics import record_stage, span
 
 
 @dataclass
@@ -29,17 +32,81 @@ class FraudTriageAgent:
 	This is a minimal, deterministic version without LLM rationales yet.
 	"""
 
-	def triage(self, *, amount: float, mcc: str | None, geo: str | None, device_id: str | None, history: list[HistoricalTxn], now: datetime | None = None) -> FraudTriageOutput:
+	def triage(self, *, amount: float, mcc: str | None, geo: str | None, device_id: str | None, history: list[HistoricalTxn] | None = None, now: datetime | None = None, state: AccountFeatureState | None = None, features: dict[str, Any] | None = None) -> FraudTriageOutput:
+		"""Score one transaction.
+
+		Features come from, in order of preference: `features` precomputed by the
+		caller (e.g. the online feature store), the account's rolling `state`
+		(constant cost per call), or a scan of `history`.
+		"""
 		now = now or datetime.utcnow()
 		started = perf_counter()
-		features = build_features(amount, now, mcc, geo, device_id, history)
-		rule_score, rule_hits = evaluate_rules(features)
+		with span("build_features"):
+			if features is not None:
+				features = dict(features)
+			elif state is not None:
+				features = build_features_from_state(amount, now, mcc, geo, device_id, state)
+			else:
+				features = build_features(amount, now, mcc, geo, device_id, history or [])
+		with span("evaluate_rules"):
+			rule_score, rule_hits = evaluate_rules(features)
 
 		cfg = get_config()
-		anom = choose_anomaly_score(features, preferred_method=cfg.anomaly_method)
+		with span("choose_anomaly_score"):
+			anom = choose_anomaly_score(features, preferred_method=cfg.anomaly_method)
 		anomaly_score = float(anom.score)
 		alert_score = max(0.0, min(1.0, 0.6 * rule_score + 0.4 * anomaly_score))
+		out = self._output(alert_score, features, rule_hits, cfg)
+		record_stage("fraud_triage", perf_counter() - started)
+		return out
+
+	def triage_batch(self, transactions: list[dict[str, Any]], *, history: dict[str, list[HistoricalTxn]] | None = None, now: datetime | None = None) -> list[FraudTriageOutput]:
+		"""Score many transactions in one pass, returning outputs in input order.
+
+		Each transaction dict carries `amount`, `mcc`, `geo`, `device_id` and
+		optionally `account_id`; `history` maps account ids to their past
+		transactions. Features are built as one matrix and anomaly scoring and
+		banding are vectorized; results match calling `triage` per item.
+		"""
+		if not transactions:
+			return []
+		now = now or datetime.utcnow()
+		history = history or {}
+		hist_rows = [(acct, h) for acct, txns in history.items() for h in txns]
+		with span("build_features_batch"):
+			matrix = build_features_batch(
+				[str(t.get("account_id") or "") for t in transactions],
+				[float(t.get("amount", 0.0)) for t in transactions],
+				[now] * len(transactions),
+				[t.get("mcc") for t in transactions],
+				[t.get("geo") for t in transactions],
+				[t.get("device_id") for t in transactions],
+				hist_account_ids=[acct for acct, _ in hist_rows],
+				hist_amounts=[h.amount for _, h in hist_rows],
+				hist_timestamps=np.array([h.timestamp for _, h in hist_rows], dtype="datetime64[us]"),
+				hist_mcc=[h.mcc for _, h in hist_rows],
+				hist_geo=[h.geo for _, h in hist_rows],
+				hist_device_id=[h.device_id for _, h in hist_rows],
+			)
+		return self.score_feature_matrix(matrix)
+
+	def score_feature_matrix(self, matrix: np.ndarray) -> list[FraudTriageOutput]:
+		"""Score prebuilt feature rows (columns in `FEATURE_NAMES` order)."""
+		rows = [dict(zip(FEATURE_NAMES, r)) for r in matrix.tolist()]
+		with span("evaluate_rules_batch"):
+			rule_scores, rule_hits = evaluate_rules_batch(matrix, FEATURE_NAMES)
+
+		cfg = get_config()
+		with span("choose_anomaly_scores"):
+			anomaly_scores, _ = choose_anomaly_scores(matrix, FEATURE_NAMES, preferred_method=cfg.anomaly_method)
+		alert_scores = np.clip(0.6 * rule_scores + 0.4 * anomaly_scores, 0.0, 1.0)
+		return [
+			self._output(float(alert_scores[i]), rows[i], rule_hits[i], cfg)
+			for i in range(len(rows))
+		]
 
+	@staticmethod
+	def _output(alert_score: float, features: dict[str, Any], rule_hits: list[str], cfg) -> FraudTriageOutput:
 		if alert_score >= cfg.thresholds.high_band_threshold:
 			decision = "alert-high"
 			risk_band = "high"
@@ -52,7 +119,6 @@ class FraudTriageAgent:
 
 		reasons = ", ".join(rule_hits) if rule_hits else "no significant rule triggers"
 		rationale = f"Combined rules and anomaly analysis; reasons: {reasons}."
-		_ = perf_counter() - started  # latency available to caller via API, not stored here
 		return FraudTriageOutput(
 			alert_score=alert_score,
 			decision=decision,
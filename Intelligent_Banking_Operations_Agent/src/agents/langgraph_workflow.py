@@ -1,64 +1,167 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+from threading import Lock
 from typing import Any, TypedDict, Literal
 
 from langgraph.graph import StateGraph, END
 
 from src.agents.banking_supervisor import BankingSupervisor
-from src.agents.fraud_triage_agent import FraudTriageAgent
-from time import perf_counter
+from src.agents.rationale_worker import request_rationale
+from src.agents.scoring_pool import triage_credit, triage_fraud
+from src.channels.fraud_pipeline import fraud_explanations, fraud_summary
+from time import monotonic, perf_counter
 from uuid import uuid4
 from datetime import datetime
 from src.fraud_detection.telemetry import record_event, TriageEvent
-from src.agents.credit_risk_agent import CreditRiskAgent
+from src.core.config import get_settings
+from src.core.metrics import record_decision, span
+from src.fraud_detection.feature_store import ObservedTxn, fetch_account_features, observe_account_txn
+
+
+logger = logging.getLogger(__name__)
 
 
 class TriageState(TypedDict, total=False):
 	payload: dict[str, Any]
 	intent: Literal["fraud", "credit", "operations"]
 	result: dict[str, Any]
+	# Precomputed account features (online feature store); optional
+	features: dict[str, Any]
+	# Policy grounding gathered in parallel with scoring
+	citations: list[str]
+	snippets: list[str]
+
+
+# Agents are stateless, so one instance per process is shared by all graph runs;
+# scoring goes through src.agents.scoring_pool (inline or on worker processes).
+_supervisor = BankingSupervisor()
+
+
+_compliance_agent = None
+_compliance_retry_after: float = 0.0
+_COMPLIANCE_RETRY_BACKOFF_S = 30.0
+_compliance_lock = Lock()
+
+
+def get_compliance_agent():
+	"""Return the shared ComplianceRAGAgent, or None when the policy index is unavailable.
+
+	Built lazily on first use: the retriever pulls in the vector store client, and
+	the index is brought in line with the policy documents. After a failure the
+	build is skipped for a short backoff, then retried on a later call.
+	"""
+	global _compliance_agent, _compliance_retry_after
+	if _compliance_agent is not None or monotonic() < _compliance_retry_after:
+		return _compliance_agent
+	with _compliance_lock:
+		if _compliance_agent is None and monotonic() >= _compliance_retry_after:
+			try:
+				from src.agents.compliance_rag_agent import ComplianceRAGAgent
+				from src.rag.indexer import index_policies
+				from src.rag.retriever import PolicyRetriever
+
+				settings = get_settings()
+				retriever = PolicyRetriever(settings.vector_db_path)
+				# Incremental: only sections edited since the last run are embedded
+				index_policies(retriever, settings.policies_dir)
+				_compliance_agent = ComplianceRAGAgent(retriever)
+			except Exception as exc:
+				_compliance_retry_after = monotonic() + _COMPLIANCE_RETRY_BACKOFF_S
+				logger.warning("Policy grounding unavailable, retrying in %.0fs: %s", _COMPLIANCE_RETRY_BACKOFF_S, exc)
+	return _compliance_agent
+
 
+_COMPLIANCE_QUERIES = {
+	"fraud": "suspicious transaction monitoring velocity new device high-risk merchant",
+	"credit": "credit policy affordability debt-to-income delinquencies limit",
+}
 
-def supervisor_node(state: TriageState) -> dict[str, Any]:
-	supervisor = BankingSupervisor()
-	decision = supervisor.classify(state["payload"])
+
+def _compliance_query(intent: str | None, payload: dict[str, Any]) -> str:
+	query = _COMPLIANCE_QUERIES.get(intent or "", _COMPLIANCE_QUERIES["credit"])
+	if intent == "fraud" and payload.get("mcc"):
+		query += f" MCC {payload['mcc']}"
+	return query
+
+
+# The first call may build the policy index (blocking I/O and embedding), so
+# the agent is resolved in the worker thread together with the lookup.
+def _cite(query: str):
+	agent = get_compliance_agent()
+	return None if agent is None else agent.cite(query)
+
+
+def _cite_many(queries: list[str]):
+	agent = get_compliance_agent()
+	return None if agent is None else agent.cite_many(queries)
+
+
+async def supervisor_node(state: TriageState) -> dict[str, Any]:
+	with span("supervisor_classify"):
+		decision = _supervisor.classify(state["payload"])
 	return {"intent": decision.intent}
 
 
-def fraud_node(state: TriageState) -> dict[str, Any]:
+async def compliance_node(state: TriageState) -> dict[str, Any]:
+	"""Policy lookup; runs in a worker thread concurrently with scoring."""
+	if state.get("citations") is not None:
+		# Grounded up front for the whole batch (TriageOrchestrator.ainvoke_many)
+		return {"citations": state["citations"], "snippets": state.get("snippets", [])}
+	query = _compliance_query(state.get("intent"), state["payload"])
+	try:
+		res = await asyncio.to_thread(_cite, query)
+	except Exception as exc:
+		logger.warning("Policy lookup failed: %s", exc)
+		return {"citations": [], "snippets": []}
+	if res is None:
+		return {"citations": [], "snippets": []}
+	return {"citations": res.citations, "snippets": res.snippets}
+
+
+async def ground_many(payloads: list[dict[str, Any]]) -> list[dict[str, list[str]]] | None:
+	"""Policy grounding for a batch of payloads in one retrieval call; None when unavailable."""
+	queries = [_compliance_query(_supervisor.classify(p).intent, p) for p in payloads]
+	try:
+		results = await asyncio.to_thread(_cite_many, queries)
+	except Exception as exc:
+		logger.warning("Policy lookup failed: %s", exc)
+		return None
+	if results is None:
+		return None
+	return [{"citations": r.citations, "snippets": r.snippets} for r in results]
+
+
+async def fraud_node(state: TriageState) -> dict[str, Any]:
 	payload = state["payload"]
 	started = perf_counter()
-	agent = FraudTriageAgent()
-	result = agent.triage(
+	now = datetime.utcnow()
+	features = state.get("features")
+	account_id = str(payload.get("account_id"))
+	if features is None:
+		features = await fetch_account_features(
+			account_id,
+			amount=float(payload.get("amount", 0.0)),
+			now=now,
+			mcc=payload.get("mcc"),
+			geo=payload.get("geo"),
+			device_id=payload.get("device_id"),
+		)
+	result = await triage_fraud(
 		amount=float(payload.get("amount", 0.0)),
 		mcc=payload.get("mcc"),
 		geo=payload.get("geo"),
 		device_id=payload.get("device_id"),
-		history=[],
+		now=now,
+		features=features,
 	)
 	sla_ms = int((perf_counter() - started) * 1000)
 	event_id = str(uuid4())
-	# Build human-friendly explanations and summary for unified endpoint
 	features = getattr(result, "features", {}) or {}
-	explanations: list[str] = []
-	if features.get("amount_zscore", 0.0) >= 3.5:
-		explanations.append(f"Transaction amount is {features['amount_zscore']:.1f}σ above the account's average")
-	if features.get("geo_novelty", 0.0) >= 1.0:
-		explanations.append("Transaction originates from a new or high-risk geographical location")
-	if features.get("device_novelty", 0.0) >= 1.0:
-		explanations.append("Device ID has not been seen on this account before")
-	if features.get("high_risk_mcc", 0.0) >= 1.0 and payload.get("mcc"):
-		explanations.append(f"Merchant Category ({payload.get('mcc')}) is flagged as high-risk")
-	if features.get("velocity_1h_count", 0.0) >= 5:
-		explanations.append("High transaction velocity in the last 1 hour")
-	for hit in getattr(result, "rule_hits", []) or []:
-		if hit not in explanations:
-			explanations.append(hit)
-	risk_score = round(float(getattr(result, "alert_score", 0.0)) * 100)
-	risk_band = getattr(result, "risk_band", "low")
-	risk_label = risk_band.capitalize()
-	decision_human = "Manual review recommended" if risk_band in {"medium", "high"} else "Approve"
-	summary = f"{risk_label} Risk ({risk_score}/100): {decision_human}."
+	with span("build_explanations"):
+		explanations = fraud_explanations(features, payload.get("mcc"), getattr(result, "rule_hits", []))
+		summary = fraud_summary(result)
 	# Record telemetry
 	record_event(TriageEvent(
 		event_id=event_id,
@@ -72,6 +175,15 @@ def fraud_node(state: TriageState) -> dict[str, Any]:
 		features=features,
 		sla_ms=sla_ms,
 	))
+	await observe_account_txn(account_id, ObservedTxn(
+		event_id=event_id,
+		amount=float(payload.get("amount", 0.0)),
+		timestamp=now,
+		mcc=payload.get("mcc"),
+		geo=payload.get("geo"),
+		device_id=payload.get("device_id"),
+	))
+	record_decision("fraud", perf_counter() - started, get_settings().sla_budget_ms)
 
 	return {
 		"result": {
@@ -90,17 +202,19 @@ def fraud_node(state: TriageState) -> dict[str, Any]:
 	}
 
 
-def credit_node(state: TriageState) -> dict[str, Any]:
+async def credit_node(state: TriageState) -> dict[str, Any]:
 	payload = state["payload"]
-	agent = CreditRiskAgent()
-	res = agent.triage(
-		income=float(payload.get("income", 0.0)),
-		liabilities=float(payload.get("liabilities", 0.0)),
-		delinquency_flags=list(payload.get("delinquency_flags", []) or []),
-		requested_limit=(float(payload.get("requested_limit")) if payload.get("requested_limit") is not None else None),
-	)
+	with span("credit_triage") as sp:
+		res = await triage_credit(
+			income=float(payload.get("income", 0.0)),
+			liabilities=float(payload.get("liabilities", 0.0)),
+			delinquency_flags=list(payload.get("delinquency_flags", []) or []),
+			requested_limit=(float(payload.get("requested_limit")) if payload.get("requested_limit") is not None else None),
+		)
+	record_decision("credit", sp.elapsed_s, get_settings().sla_budget_ms)
 	return {
 		"result": {
+			"event_id": str(uuid4()),
 			"score": res.score,
 			"decision": res.decision,
 			"rationale": res.rationale,
@@ -110,13 +224,29 @@ def credit_node(state: TriageState) -> dict[str, Any]:
 	}
 
 
-def _route_by_intent(state: TriageState) -> str:
+async def join_node(state: TriageState) -> dict[str, Any]:
+	"""Merge policy grounding into the scoring result and queue the LLM rationale."""
+	result = dict(state.get("result", {}))
+	citations = state.get("citations") or []
+	if citations:
+		result["policy_citations"] = list(result.get("policy_citations") or []) + [
+			c for c in citations if c not in (result.get("policy_citations") or [])
+		]
+		result["policy_snippets"] = state.get("snippets") or []
+	if result.get("event_id"):
+		# Generated in the background from the grounded result; never delays the decision
+		result["llm_rationale_status"] = request_rationale(state.get("intent") or "fraud", result["event_id"], result)
+	return {"result": result}
+
+
+def _route_by_intent(state: TriageState) -> list[str]:
+	# Scoring and the policy lookup fan out and run concurrently
 	intent = state.get("intent")
 	if intent == "fraud":
-		return "fraud"
+		return ["fraud", "compliance"]
 	if intent == "credit":
-		return "credit"
-	return "credit"  # default
+		return ["credit", "compliance"]
+	return ["credit", "compliance"]  # default
 
 
 def build_triage_graph():
@@ -124,30 +254,84 @@ def build_triage_graph():
 	graph.add_node("supervisor", supervisor_node)
 	graph.add_node("fraud", fraud_node)
 	graph.add_node("credit", credit_node)
+	graph.add_node("compliance", compliance_node)
+	graph.add_node("join", join_node)
 	graph.set_entry_point("supervisor")
 	graph.add_conditional_edges(
 		"supervisor",
 		_route_by_intent,
-		{
-			"fraud": "fraud",
-			"credit": "credit",
-		},
+		["fraud", "credit", "compliance"],
 	)
-	graph.add_edge("fraud", END)
-	graph.add_edge("credit", END)
+	# join waits for whichever scorer ran plus the policy lookup
+	graph.add_edge(["fraud", "compliance"], "join")
+	graph.add_edge(["credit", "compliance"], "join")
+	graph.add_edge("join", END)
 	return graph.compile()
 
 
 class TriageOrchestrator:
+	"""Runs payloads through a compiled triage graph.
+
+	Compiled graphs are immutable and safe to share across threads; use
+	`get_orchestrator()` for the process-wide instance rather than compiling
+	per request.
+	"""
+
 	def __init__(self) -> None:
 		self.app = build_triage_graph()
 
-	def invoke(self, payload: dict[str, Any]) -> dict[str, Any]:
+	@staticmethod
+	def _state_in(payload: dict[str, Any], features: dict[str, Any] | None) -> TriageState:
 		state_in: TriageState = {"payload": payload}
-		state_out = self.app.invoke(state_in)
+		if features is not None:
+			state_in["features"] = features
+		return state_in
+
+	@staticmethod
+	def _result(state_out: dict[str, Any]) -> dict[str, Any]:
 		out = dict(state_out.get("result", {}))
 		out["intent"] = state_out.get("intent")
 		return out
 
+	async def ainvoke(self, payload: dict[str, Any], features: dict[str, Any] | None = None) -> dict[str, Any]:
+		state_out = await self.app.ainvoke(self._state_in(payload, features))
+		return self._result(state_out)
+
+	async def ainvoke_many(self, payloads: list[dict[str, Any]], features: list[dict[str, Any] | None] | None = None) -> list[dict[str, Any]]:
+		"""Run many payloads through the compiled graph concurrently; results keep input order.
+
+		Policy grounding for the whole batch is fetched up front with one
+		`cite_many` call instead of one lookup per graph run.
+		"""
+		if not payloads:
+			return []
+		feats = features if features is not None else [None] * len(payloads)
+		states_in = [self._state_in(p, f) for p, f in zip(payloads, feats)]
+		grounding = await ground_many(payloads)
+		if grounding is not None:
+			for state_in, g in zip(states_in, grounding):
+				state_in.update(g)
+		states_out = await self.app.abatch(states_in)
+		return [self._result(s) for s in states_out]
+
+	def invoke(self, payload: dict[str, Any], features: dict[str, Any] | None = None) -> dict[str, Any]:
+		"""Blocking wrapper for scripts and workers without a running event loop."""
+		return asyncio.run(self.ainvoke(payload, features))
+
+	def invoke_many(self, payloads: list[dict[str, Any]], features: list[dict[str, Any] | None] | None = None) -> list[dict[str, Any]]:
+		"""Blocking wrapper around `ainvoke_many`."""
+		return asyncio.run(self.ainvoke_many(payloads, features))
+
+
+_orchestrator: TriageOrchestrator | None = None
+_orchestrator_lock = Lock()
 
 
+def get_orchestrator() -> TriageOrchestrator:
+	"""Return the process-wide orchestrator, compiling the graph on first use."""
+	global _orchestrator
+	if _orchestrator is None:
+		with _orchestrator_lock:
+			if _orchestrator is None:
+				_orchestrator = TriageOrchestrator()
+	return _orchestrator
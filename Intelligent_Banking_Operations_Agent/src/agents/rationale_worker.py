@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import random
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from time import monotonic, perf_counter, time
+from typing import Any, Protocol
+
+from src.core.config import get_settings
+from src.core.metrics import record_stage, registry
+from src.rag.query_cache import QueryCache
+from src.rag.templates import CREDIT_RATIONALE_TEMPLATE, FRAUD_RATIONALE_TEMPLATE
+
+
+logger = logging.getLogger(__name__)
+
+registry.describe("banking_rationale_total", "counter", "Deferred LLM rationale jobs, by outcome.")
+registry.describe("banking_rationale_cache_total", "counter", "Rationale cache lookups, by result.")
+
+_TEMPLATES = {"fraud": FRAUD_RATIONALE_TEMPLATE, "credit": CREDIT_RATIONALE_TEMPLATE}
+
+
+# -- LLM clients ----------------------------------------------------------------
+
+class LLMClient(Protocol):
+	async def complete(self, system: str, prompt: str) -> str: ...
+
+
+class FakeLLM:
+	"""Local stand-in for an LLM: fixed latency, optional random failures,
+	and a deterministic narrative assembled from the prompt's fields."""
+
+	def __init__(self, latency_s: float = 0.8, failure_rate: float = 0.0, seed: int | None = None) -> None:
+		self.latency_s = latency_s
+		self.failure_rate = failure_rate
+		self._rng = random.Random(seed)
+		self.calls = 0
+
+	async def complete(self, system: str, prompt: str) -> str:
+		self.calls += 1
+		await asyncio.sleep(self.latency_s)
+		if self._rng.random() < self.failure_rate:
+			raise RuntimeError("fake LLM failure")
+		fields = dict(line.split(": ", 1) for line in prompt.splitlines() if ": " in line)
+		parts = [f"Decision {fields.get('Decision', 'n/a')} at {fields.get('Risk band', fields.get('Score', 'n/a'))}."]
+		if fields.get("Signals"):
+			parts.append(f"Driven by: {fields['Signals']}.")
+		if fields.get("Policy sections"):
+			parts.append(f"Per {fields['Policy sections']}.")
+		parts.append(f"Next best action: {fields.get('Suggested action', 'review per policy').rstrip('.')}.")
+		return " ".join(parts)
+
+
+class OpenAIChatLLM:
+	"""Chat Completions over plain HTTP (no SDK dependency)."""
+
+	def __init__(self, api_key: str, model: str, base_url: str, timeout_s: float) -> None:
+		import httpx
+
+		self.model = model
+		self._client = httpx.AsyncClient(
+			base_url=base_url.rstrip("/"),
+			headers={"Authorization": f"Bearer {api_key}"},
+			timeout=timeout_s,
+		)
+
+	async def complete(self, system: str, prompt: str) -> str:
+		resp = await self._client.post("/chat/completions", json={
+			"model": self.model,
+			"temperature": 0.2,
+			"max_tokens": 300,
+			"messages": [{"role": "system", "content": system}, {"role": "user", "content": prompt}],
+		})
+		resp.raise_for_status()
+		return resp.json()["choices"][0]["message"]["content"].strip()
+
+	async def close(self) -> None:
+		await self._client.aclose()
+
+
+def _retryable(exc: Exception) -> bool:
+	status = getattr(getattr(exc, "response", None), "status_code", None)
+	# Client errors other than rate limiting will not succeed on retry
+	return status is None or status == 429 or status >= 500
+
+
+# -- prompts ----------------------------------------------------------------------
+
+def build_prompt(intent: str, context: dict[str, Any]) -> str:
+	"""User prompt from the deterministic decision; only fields that shape the
+	narrative are included, so identical cases share a cached rationale."""
+	if intent == "credit":
+		lines = [
+			f"Decision: {context.get('decision')}",
+			f"Score: {context.get('score')}",
+			f"Signals: {'; '.join(context.get('key_factors') or [])}",
+		]
+	else:
+		lines = [
+			f"Decision: {context.get('decision')}",
+			f"Risk band: {context.get('risk_band')}",
+			f"Signals: {'; '.join(context.get('explanations') or [])}",
+			f"Suggested action: {context.get('summary')}",
+		]
+	citations = context.get("policy_citations") or []
+	if citations:
+		lines.append(f"Policy sections: {', '.join(citations)}")
+	for snippet in (context.get("policy_snippets") or [])[:3]:
+		lines.append(f"Policy excerpt: {' '.join(snippet.split())[:400]}")
+	return "\n".join(lines)
+
+
+# -- jobs ---------------------------------------------------------------------------
+
+@dataclass
+class RationaleJob:
+	event_id: str
+	intent: str
+	status: str = "queued"  # queued | running | done | failed | dropped
+	rationale: str | None = None
+	error: str | None = None
+	attempts: int = 0
+	cached: bool = False
+	created_at: float = field(default_factory=time)
+	finished_at: float | None = None
+
+	def to_dict(self) -> dict:
+		return asdict(self)
+
+
+class _RateLimiter:
+	"""Spaces LLM calls at most `rate_per_s` apart across all workers."""
+
+	def __init__(self, rate_per_s: float) -> None:
+		self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+		self._next = 0.0
+		self._lock = asyncio.Lock()
+
+	async def acquire(self) -> None:
+		if not self.interval:
+			return
+		async with self._lock:
+			now = monotonic()
+			if self._next > now:
+				await asyncio.sleep(self._next - now)
+			self._next = max(now, self._next) + self.interval
+
+
+class RationaleService:
+	"""Generates LLM rationales after the decision has been returned.
+
+	`submit` never blocks: the job goes on a bounded queue (or is marked
+	"dropped" when the queue is full) and `concurrency` worker tasks drain it,
+	rate-limited, with per-call timeouts and exponential-backoff retries.
+	Finished rationales are kept per event_id (bounded, oldest evicted) and
+	cached per prompt, so repeated cases cost one LLM call.
+	"""
+
+	def __init__(
+		self,
+		llm: LLMClient,
+		*,
+		concurrency: int = 4,
+		rate_per_s: float = 5.0,
+		queue_max: int = 1000,
+		max_retries: int = 3,
+		timeout_s: float = 20.0,
+		store_max: int = 5000,
+		cache_entries: int = 1024,
+		backoff_s: float = 0.5,
+	) -> None:
+		self.llm = llm
+		self.concurrency = max(1, concurrency)
+		self.queue_max = queue_max
+		self.max_retries = max_retries
+		self.timeout_s = timeout_s
+		self.store_max = store_max
+		self.backoff_s = backoff_s
+		self.cache = QueryCache(cache_entries, 3600.0, metric="banking_rationale_cache_total")
+		self._rate_per_s = rate_per_s
+		self._limiter = _RateLimiter(rate_per_s)
+		self._jobs: OrderedDict[str, RationaleJob] = OrderedDict()
+		self._finished: dict[str, asyncio.Event] = {}
+		self._queue: asyncio.Queue | None = None
+		self._workers: list[asyncio.Task] = []
+		self._loop: asyncio.AbstractEventLoop | None = None
+
+	def _ensure_started(self) -> None:
+		loop = asyncio.get_running_loop()
+		if self._loop is loop:
+			return
+		# First use, or a new event loop (tests): queue and workers belong to one loop
+		self._loop = loop
+		self._queue = asyncio.Queue(maxsize=self.queue_max)
+		self._limiter = _RateLimiter(self._rate_per_s)
+		self._workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+
+	def submit(self, intent: str, event_id: str, context: dict[str, Any]) -> RationaleJob:
+		self._ensure_started()
+		system = _TEMPLATES.get(intent, FRAUD_RATIONALE_TEMPLATE)
+		prompt = build_prompt(intent, context)
+		job = RationaleJob(event_id=event_id, intent=intent)
+		self._store(job)
+		try:
+			self._queue.put_nowait((job, system, prompt))
+		except asyncio.QueueFull:
+			self._finish(job, "dropped", error="rationale queue full")
+		return job
+
+	def _store(self, job: RationaleJob) -> None:
+		self._jobs[job.event_id] = job
+		self._finished[job.event_id] = asyncio.Event()
+		while len(self._jobs) > self.store_max:
+			old, _ = self._jobs.popitem(last=False)
+			self._finished.pop(old, None)
+
+	def _finish(self, job: RationaleJob, status: str, *, rationale: str | None = None, error: str | None = None) -> None:
+		job.status = status
+		job.rationale = rationale
+		job.error = error
+		job.finished_at = time()
+		registry.inc("banking_rationale_total", "outcome", "cached" if job.cached else status)
+		event = self._finished.get(job.event_id)
+		if event is not None:
+			event.set()
+
+	def get(self, event_id: str) -> RationaleJob | None:
+		return self._jobs.get(event_id)
+
+	async def wait(self, event_id: str, timeout_s: float) -> RationaleJob | None:
+		"""Return the job, waiting up to `timeout_s` for it to finish (long polling)."""
+		job = self._jobs.get(event_id)
+		event = self._finished.get(event_id)
+		if job is None or event is None or timeout_s <= 0:
+			return job
+		try:
+			await asyncio.wait_for(event.wait(), timeout_s)
+		except asyncio.TimeoutError:
+			pass
+		return job
+
+	async def _worker(self) -> None:
+		while True:
+			job, system, prompt = await self._queue.get()
+			try:
+				await self._generate(job, system, prompt)
+			except Exception as exc:  # never let a worker die
+				logger.exception("Rationale worker error for %s", job.event_id)
+				self._finish(job, "failed", error=str(exc))
+			finally:
+				self._queue.task_done()
+
+	async def _generate(self, job: RationaleJob, system: str, prompt: str) -> None:
+		key = hashlib.sha256(f"{system}\x00{prompt}".encode("utf-8")).hexdigest()
+		cached = self.cache.get(key)
+		if cached is not None:
+			job.cached = True
+			self._finish(job, "done", rationale=cached)
+			return
+		job.status = "running"
+		started = perf_counter()
+		while True:
+			job.attempts += 1
+			await self._limiter.acquire()
+			try:
+				text = await asyncio.wait_for(self.llm.complete(system, prompt), self.timeout_s)
+			except Exception as exc:
+				error = f"{type(exc).__name__}: {exc}"
+				if job.attempts > self.max_retries or not _retryable(exc):
+					logger.warning("Rationale for %s failed after %d attempts: %s", job.event_id, job.attempts, error)
+					self._finish(job, "failed", error=error)
+					return
+				delay = self.backoff_s * 2 ** (job.attempts - 1)
+				await asyncio.sleep(delay * (0.5 + random.random()))
+				continue
+			record_stage("llm_rationale", perf_counter() - started)
+			self.cache.put(key, text)
+			self._finish(job, "done", rationale=text)
+			return
+
+	def stats(self) -> dict:
+		counts: dict[str, int] = {}
+		for job in self._jobs.values():
+			counts[job.status] = counts.get(job.status, 0) + 1
+		return {"queued": self._queue.qsize() if self._queue is not None else 0, "jobs": counts}
+
+	async def close(self) -> None:
+		for task in self._workers:
+			task.cancel()
+		await asyncio.gather(*self._workers, return_exceptions=True)
+		self._workers = []
+		self._loop = None
+		close = getattr(self.llm, "close", None)
+		if close is not None:
+			await close()
+
+
+_service: RationaleService | None = None
+_service_ready = False
+
+
+def _make_llm() -> LLMClient | None:
+	settings = get_settings()
+	if settings.rationale_llm == "fake":
+		return FakeLLM(latency_s=settings.rationale_fake_latency_ms / 1000.0, failure_rate=settings.rationale_fake_failure_rate)
+	if settings.rationale_llm == "openai":
+		if not settings.openai_api_key:
+			logger.warning("rationale_llm=openai but no OPENAI_API_KEY; deferred rationales disabled")
+			return None
+		return OpenAIChatLLM(settings.openai_api_key, settings.rationale_model, settings.openai_base_url, settings.rationale_timeout_s)
+	return None
+
+
+def get_rationale_service() -> RationaleService | None:
+	"""The process-wide service, or None when `rationale_llm` is "off"."""
+	global _service, _service_ready
+	if not _service_ready:
+		_service_ready = True
+		llm = _make_llm()
+		if llm is None:
+			return None
+		settings = get_settings()
+		_service = RationaleService(
+			llm,
+			concurrency=settings.rationale_concurrency,
+			rate_per_s=settings.rationale_rate_per_s,
+			queue_max=settings.rationale_queue_max,
+			max_retries=settings.rationale_max_retries,
+			timeout_s=settings.rationale_timeout_s,
+			store_max=settings.rationale_store_max,
+		)
+	return _service
+
+
+def request_rationale(intent: str, event_id: str, context: dict[str, Any]) -> str | None:
+	"""Queue a rationale for a decision already made; returns the job status,
+	or None when deferred rationales are disabled. Never waits on the LLM."""
+	service = get_rationale_service()
+	if service is None:
+		return None
+	return service.submit(intent, event_id, context).status
+
+
+async def shutdown() -> None:
+	global _service, _service_ready
+	if _service is not None:
+		await _service.close()
+	_service, _service_ready = None, False
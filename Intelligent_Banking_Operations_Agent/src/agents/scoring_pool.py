@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from multiprocessing import shared_memory
+from threading import Lock
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+
+from src.agents.credit_risk_agent import CreditRiskAgent, CreditTriageOutput
+from src.agents.fraud_triage_agent import FraudTriageAgent, FraudTriageOutput
+from src.core.config import get_settings
+from src.core.metrics import span
+from src.fraud_detection.feature_engineering import FEATURE_NAMES, build_features
+from src.fraud_detection.fraud_config import get_config, update_config
+from src.fraud_detection.rules_runtime import get_rule_plan, get_runtime_rules, replace_runtime_rules
+
+
+logger = logging.getLogger(__name__)
+
+_SNAPSHOT_BYTES = 1 << 20
+_HEADER = struct.Struct("<QQ")  # sequence number, payload length
+_READ_ATTEMPTS = 1000
+
+
+class SharedSnapshot:
+	"""Single-writer seqlock over a shared memory block.
+
+	The API process publishes the read-only scoring state (runtime rules and
+	fraud config) here; workers map the same block and only re-parse it when
+	the sequence number moves. The sequence is odd while a write is in
+	progress, so readers retry instead of seeing a torn payload.
+	"""
+
+	def __init__(self, name: str | None = None) -> None:
+		if name is None:
+			self.shm = shared_memory.SharedMemory(create=True, size=_SNAPSHOT_BYTES)
+			self.owner = True
+			_HEADER.pack_into(self.shm.buf, 0, 0, 0)
+		else:
+			self.shm = _attach(name)
+			self.owner = False
+
+	@property
+	def name(self) -> str:
+		return self.shm.name
+
+	def sequence(self) -> int:
+		return _HEADER.unpack_from(self.shm.buf, 0)[0]
+
+	def publish(self, payload: bytes) -> None:
+		if _HEADER.size + len(payload) > _SNAPSHOT_BYTES:
+			raise ValueError(f"scoring snapshot too large ({len(payload)} bytes)")
+		seq = self.sequence()
+		_HEADER.pack_into(self.shm.buf, 0, seq + 1, 0)
+		self.shm.buf[_HEADER.size:_HEADER.size + len(payload)] = payload
+		_HEADER.pack_into(self.shm.buf, 0, seq + 2, len(payload))
+
+	def read(self) -> tuple[int, bytes]:
+		"""Return a consistent (sequence, payload); TimeoutError if no write settles."""
+		for _ in range(_READ_ATTEMPTS):
+			seq, length = _HEADER.unpack_from(self.shm.buf, 0)
+			if not seq % 2:
+				payload = bytes(self.shm.buf[_HEADER.size:_HEADER.size + length])
+				if _HEADER.unpack_from(self.shm.buf, 0)[0] == seq:
+					return seq, payload
+			time.sleep(0)  # yield to the writer instead of spinning
+		raise TimeoutError("scoring snapshot write did not complete")
+
+	def close(self) -> None:
+		self.shm.close()
+		if self.owner:
+			self.shm.unlink()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+	try:
+		return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+	except TypeError:
+		# Spawned workers share the API process's resource tracker, so attaching
+		# re-registers a name it already tracks; only the owner unlinks
+		return shared_memory.SharedMemory(name=name)
+
+
+# -- worker process ---------------------------------------------------------
+
+_snapshot: SharedSnapshot | None = None
+_applied_seq = -1
+_fraud_agent = FraudTriageAgent()
+_credit_agent = CreditRiskAgent()
+
+
+def _init_worker(snapshot_name: str) -> None:
+	global _snapshot
+	_snapshot = SharedSnapshot(snapshot_name)
+	_sync_state()
+
+
+def _sync_state() -> None:
+	"""Bring this worker's rules and config up to the published snapshot."""
+	global _applied_seq
+	if _snapshot is None or _snapshot.sequence() == _applied_seq:
+		return
+	try:
+		seq, payload = _snapshot.read()
+	except TimeoutError:
+		# Keep scoring on the last applied state; the next call tries again
+		logger.warning("Scoring snapshot busy, keeping state from sequence %d", _applied_seq)
+		return
+	state = json.loads(payload or b"{}")
+	replace_runtime_rules(state.get("rules", []))
+	if "config" in state:
+		update_config(**state["config"])
+	_applied_seq = seq
+
+
+def _score_fraud(items: list[dict[str, Any]]) -> list[FraudTriageOutput]:
+	_sync_state()
+	matrix = np.empty((len(items), len(FEATURE_NAMES)), dtype=np.float64)
+	for i, item in enumerate(items):
+		features = item.get("features")
+		if features is None:
+			features = build_features(item["amount"], item["now"], item.get("mcc"), item.get("geo"), item.get("device_id"), [])
+		matrix[i] = [float(features.get(n, 0.0)) for n in FEATURE_NAMES]
+	return _fraud_agent.score_feature_matrix(matrix)
+
+
+def _score_credit(items: list[dict[str, Any]]) -> list[CreditTriageOutput]:
+	_sync_state()
+	return [_credit_agent.triage(**item) for item in items]
+
+
+def _warm() -> int:
+	return os.getpid()
+
+
+# -- API process ------------------------------------------------------------
+
+# Bumped on every fraud config change so the pool republishes only then, like
+# the runtime rules' RulePlan.version.
+_config_version = 0
+
+
+def update_fraud_config(**changes: Any) -> dict:
+	"""Apply a fraud config change and mark it for republishing to workers."""
+	global _config_version
+	result = update_config(**changes)
+	_config_version += 1
+	return result
+
+
+class MicroBatcher:
+	"""Coalesces concurrent single-item requests into batches for one dispatch.
+
+	While a worker is idle, items are flushed on the next loop iteration so a
+	lone request waits for nothing; once every worker is busy, items gather
+	for up to `max_wait_s` (or `max_batch` items) and go out together.
+	"""
+
+	def __init__(self, dispatch: Callable[[list[Any]], Awaitable[list[Any]]], *, workers: int, max_batch: int, max_wait_s: float) -> None:
+		self.dispatch = dispatch
+		self.workers = workers
+		self.max_batch = max_batch
+		self.max_wait_s = max_wait_s
+		self._pending: list[tuple[Any, asyncio.Future]] = []
+		self._timer: asyncio.TimerHandle | None = None
+		self._in_flight = 0
+		# Strong references to running batches; the loop only keeps weak ones
+		self._tasks: set[asyncio.Task] = set()
+
+	async def submit(self, item: Any) -> Any:
+		loop = asyncio.get_running_loop()
+		fut = loop.create_future()
+		self._pending.append((item, fut))
+		if len(self._pending) >= self.max_batch:
+			self._flush()
+		elif self._timer is None:
+			delay = 0.0 if self._in_flight < self.workers else self.max_wait_s
+			self._timer = loop.call_later(delay, self._flush)
+		return await fut
+
+	def _flush(self) -> None:
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+		batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+		if batch:
+			self._in_flight += 1
+			task = asyncio.ensure_future(self._run(batch))
+			self._tasks.add(task)
+			task.add_done_callback(self._run_done)
+		if self._pending and self._timer is None:
+			self._timer = asyncio.get_running_loop().call_later(self.max_wait_s, self._flush)
+
+	async def _run(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+		try:
+			results = await self.dispatch([item for item, _ in batch])
+		except Exception as exc:
+			for _, fut in batch:
+				if not fut.done():
+					fut.set_exception(exc)
+		else:
+			for (_, fut), result in zip(batch, results):
+				if not fut.done():
+					fut.set_result(result)
+		finally:
+			self._in_flight -= 1
+
+	def _run_done(self, task: asyncio.Task) -> None:
+		self._tasks.discard(task)
+		if not task.cancelled() and task.exception() is not None:
+			logger.error("Micro-batch dispatch failed", exc_info=task.exception())
+
+
+class ScoringPool:
+	"""Process pool for CPU-bound triage, fronted by per-kind micro-batchers.
+
+	The API process keeps all I/O and in-memory state (feature store,
+	telemetry, runtime rules); workers only score. Rules and config reach the
+	workers through a `SharedSnapshot`, republished whenever they change, and
+	the Isolation Forest is shared through the memory-mapped model registry.
+	"""
+
+	def __init__(self, *, workers: int, max_batch: int, max_wait_s: float) -> None:
+		self.workers = workers
+		self.snapshot = SharedSnapshot()
+		self._published: tuple[int, int] | None = None
+		self.publish_state()
+		self.executor = ProcessPoolExecutor(
+			max_workers=workers,
+			mp_context=multiprocessing.get_context("spawn"),
+			initializer=_init_worker,
+			initargs=(self.snapshot.name,),
+		)
+		self.fraud = MicroBatcher(lambda items: self._dispatch(_score_fraud, items), workers=workers, max_batch=max_batch, max_wait_s=max_wait_s)
+		self.credit = MicroBatcher(lambda items: self._dispatch(_score_credit, items), workers=workers, max_batch=max_batch, max_wait_s=max_wait_s)
+
+	def publish_state(self) -> None:
+		"""Republish rules and config if they changed since the last dispatch."""
+		key = (get_rule_plan().version, _config_version)
+		if key == self._published:
+			return
+		payload = json.dumps({"rules": get_runtime_rules(), "config": asdict(get_config())}).encode("utf-8")
+		self.snapshot.publish(payload)
+		self._published = key
+
+	async def _dispatch(self, fn: Callable[[list[Any]], list[Any]], items: list[Any]) -> list[Any]:
+		self.publish_state()
+		with span("scoring_pool_dispatch"):
+			return await asyncio.get_running_loop().run_in_executor(self.executor, fn, items)
+
+	async def score_many(self, fn: Callable[[list[Any]], list[Any]], items: list[Any]) -> list[Any]:
+		"""Split an already batched request across all workers."""
+		if not items:
+			return []
+		size = -(-len(items) // self.workers)
+		chunks = [items[i:i + size] for i in range(0, len(items), size)]
+		results = await asyncio.gather(*(self._dispatch(fn, chunk) for chunk in chunks))
+		return [r for chunk in results for r in chunk]
+
+	def warm(self) -> None:
+		"""Start every worker now rather than on the first requests."""
+		for f in [self.executor.submit(_warm) for _ in range(self.workers)]:
+			f.result()
+
+	def close(self) -> None:
+		self.executor.shutdown(wait=True, cancel_futures=True)
+		self.snapshot.close()
+
+
+_pool: ScoringPool | None = None
+_pool_lock = Lock()
+
+
+def get_scoring_pool() -> ScoringPool | None:
+	"""The process-wide scoring pool, or None when scoring runs inline."""
+	global _pool
+	settings = get_settings()
+	if settings.scoring_mode != "process_pool":
+		return None
+	if _pool is None:
+		with _pool_lock:
+			if _pool is None:
+				_pool = ScoringPool(
+					workers=settings.scoring_workers or os.cpu_count() or 1,
+					max_batch=settings.scoring_batch_max,
+					max_wait_s=settings.scoring_batch_wait_ms / 1000.0,
+				)
+	return _pool
+
+
+def shutdown() -> None:
+	global _pool
+	with _pool_lock:
+		pool, _pool = _pool, None
+	if pool is not None:
+		pool.close()
+
+
+async def triage_fraud(*, amount: float, mcc: str | None, geo: str | None, device_id: str | None, now: datetime, features: dict[str, Any] | None) -> FraudTriageOutput:
+	"""Score one transaction inline or on the scoring pool, per `scoring_mode`."""
+	pool = get_scoring_pool()
+	if pool is None:
+		return _fraud_agent.triage(amount=amount, mcc=mcc, geo=geo, device_id=device_id, history=[], now=now, features=features)
+	return await pool.fraud.submit({"amount": amount, "mcc": mcc, "geo": geo, "device_id": device_id, "now": now, "features": features})
+
+
+async def triage_fraud_batch(transactions: list[dict[str, Any]], *, now: datetime) -> list[FraudTriageOutput]:
+	"""Score a batch of history-free transactions, split across workers when pooled."""
+	pool = get_scoring_pool()
+	if pool is None:
+		return _fraud_agent.triage_batch(transactions, now=now)
+	items = [{**t, "amount": float(t.get("amount", 0.0)), "now": now, "features": None} for t in transactions]
+	return await pool.score_many(_score_fraud, items)
+
+
+async def triage_fraud_features(items: list[dict[str, Any]]) -> list[FraudTriageOutput]:
+	"""Score transactions that each carry `now` and optional precomputed `features`.
+
+	Items without features are scored on an empty history. Inline mode scores
+	the whole list in one vectorized pass; pooled mode splits it across workers.
+	"""
+	pool = get_scoring_pool()
+	if pool is None:
+		return _score_fraud(items)
+	return await pool.score_many(_score_fraud, items)
+
+
+async def triage_credit(*, income: float, liabilities: float, delinquency_flags: list[str] | None, requested_limit: float | None) -> CreditTriageOutput:
+	pool = get_scoring_pool()
+	application = {"income": income, "liabilities": liabilities, "delinquency_flags": delinquency_flags, "requested_limit": requested_limit}
+	if pool is None:
+		return _credit_agent.triage(**application)
+	return await pool.credit.submit(application)
@@ -1,16 +1,28 @@
+import asyncio
+from collections import deque
 from datetime import datetime
-from fastapi import APIRouter
-from pydantic import BaseModel
+from time import perf_counter
+from typing import AsyncIterator, Literal
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.requests import ClientDisconnect
+from pydantic import BaseModel, Field
 from uuid import uuid4
 
-from src.agents.fraud_triage_agent import FraudTriageAgent
 from src.fraud_detection.feature_engineering import HistoricalTxn
-from src.fraud_detection.fraud_config import get_config, update_config
-from src.fraud_detection.iforest_model import train_from_feature_rows, get_model_info
-from src.agents.credit_risk_agent import CreditRiskAgent
-from src.agents.langgraph_workflow import TriageOrchestrator
-from src.fraud_detection.telemetry import record_event, record_label, compute_kpis, TriageEvent, iter_events
+from src.fraud_detection.fraud_config import get_config
+from src.fraud_detection.iforest_model import ModelInfo, activate_model, get_model_info, list_models
+from src.fraud_detection.training_jobs import get_job, job_dict, list_jobs, submit_training
+from src.agents.scoring_pool import triage_credit, triage_fraud, triage_fraud_batch, triage_fraud_features, update_fraud_config
+from src.agents.rationale_worker import get_rationale_service, request_rationale
+from src.fraud_detection.telemetry import record_event, record_events, record_label, compute_kpis, TriageEvent, iter_events
 from src.fraud_detection.rules_runtime import get_runtime_rules, add_runtime_rule, clear_runtime_rules
+from src.fraud_detection.feature_store import ObservedTxn, fetch_account_features, fetch_batch_features, observe_account_txn
+from src.core.config import get_settings
+from src.core.metrics import record_decision, record_stage, span
+from src.channels.fraud_pipeline import fraud_explanations, fraud_summary, score_stream_events
+from src.channels.stream_consumer import consumer_statuses
+from src.channels.ndjson_stream import DuplexStreamingResponse, StreamEvent, dumps_line, iter_lines, parse_event
 
 router = APIRouter(tags=["banking"])
 
@@ -35,43 +47,40 @@ class ApplicationInput(BaseModel):
 	requested_limit: float | None = None
 
 
+class TransactionBatchInput(BaseModel):
+	transactions: list[TransactionInput] = Field(..., max_length=1000)
+
+
 @router.post("/fraud/triage")
 async def fraud_triage(input_txn: TransactionInput):
-	# For demo: use empty history and run the agent
-	agent = FraudTriageAgent()
-	result = agent.triage(
+	# Account history comes from the online feature store; without it the agent
+	# scores on an empty history
+	started = perf_counter()
+	now = datetime.utcnow()
+	stored = await fetch_account_features(
+		input_txn.account_id,
 		amount=input_txn.amount,
+		now=now,
 		mcc=input_txn.mcc,
 		geo=input_txn.geo,
 		device_id=input_txn.device_id,
-		history=[],
-		now=datetime.utcnow(),
+	)
+	result = await triage_fraud(
+		amount=input_txn.amount,
+		mcc=input_txn.mcc,
+		geo=input_txn.geo,
+		device_id=input_txn.device_id,
+		now=now,
+		features=stored,
 	)
 
-	# Build human-friendly explanations and summary
 	features = getattr(result, "features", {}) or {}
-	explanations: list[str] = []
-	if features.get("amount_zscore", 0.0) >= 3.5:
-		explanations.append(f"Transaction amount is {features['amount_zscore']:.1f}σ above the account's average")
-	if features.get("geo_novelty", 0.0) >= 1.0:
-		explanations.append("Transaction originates from a new or high-risk geographical location")
-	if features.get("device_novelty", 0.0) >= 1.0:
-		explanations.append("Device ID has not been seen on this account before")
-	if features.get("high_risk_mcc", 0.0) >= 1.0 and input_txn.mcc:
-		explanations.append(f"Merchant Category ({input_txn.mcc}) is flagged as high-risk")
-	if features.get("velocity_1h_count", 0.0) >= 5:
-		explanations.append("High transaction velocity in the last 1 hour")
-
-	# Always include rule hits (if any) to preserve transparency
-	for hit in getattr(result, "rule_hits", []) or []:
-		if hit not in explanations:
-			explanations.append(hit)
-
-	risk_score = round(float(getattr(result, "alert_score", 0.0)) * 100)
-	risk_band = getattr(result, "risk_band", "low")
-	risk_label = risk_band.capitalize()
-	decision_human = "Manual review recommended" if risk_band in {"medium", "high"} else "Approve"
-	summary = f"{risk_label} Risk ({risk_score}/100): {decision_human}."
+	with span("build_explanations"):
+		explanations = fraud_explanations(features, input_txn.mcc, getattr(result, "rule_hits", []))
+		summary = fraud_summary(result)
+
+	# SLA measurement (ms): feature fetch through decision, before telemetry
+	sla_ms = int((perf_counter() - started) * 1000)
 
 	# Minimal event_id and telemetry record
 	event_id = str(uuid4())
@@ -85,14 +94,19 @@ async def fraud_triage(input_txn: TransactionInput):
 		alert_score=float(result.alert_score),
 		explanations=list(explanations),
 		features=features,
-		sla_ms=None,
+		sla_ms=sla_ms,
 	)
 	record_event(tele)
-
-	# SLA measurement (ms)
-	# Note: For this demo path, we don't capture monotonic start/end in handler; reuse fraud agent fast path
-	sla_ms = None
-	return {
+	await observe_account_txn(input_txn.account_id, ObservedTxn(
+		event_id=event_id,
+		amount=input_txn.amount,
+		timestamp=now,
+		mcc=input_txn.mcc,
+		geo=input_txn.geo,
+		device_id=input_txn.device_id,
+	))
+	record_decision("fraud", perf_counter() - started, get_settings().sla_budget_ms)
+	out = {
 		"event_id": event_id,
 		"alert_score": result.alert_score,
 		"decision": result.decision,
@@ -104,24 +118,198 @@ async def fraud_triage(input_txn: TransactionInput):
 		"summary": summary,
 		"sla_ms": sla_ms,
 	}
+	# The LLM narrative is generated afterwards; poll GET /rationale/{event_id}
+	out["llm_rationale_status"] = request_rationale("fraud", event_id, out)
+	return out
+
+
+@router.post("/fraud/triage/batch")
+async def fraud_triage_batch(body: TransactionBatchInput):
+	"""Score a burst of transactions in one pass; items are returned in input order.
+
+	Stored account features are read once per account and the batch's own
+	earlier transactions are folded in, the batch is scored in one pass, and
+	every transaction is then observed into the feature store. Each item gets a
+	deferred LLM rationale, as on `/fraud/triage`.
+	"""
+	started = perf_counter()
+	txns = body.transactions
+	now = datetime.utcnow()
+	observed = [
+		(t.account_id, ObservedTxn(event_id=str(uuid4()), amount=t.amount, timestamp=now, mcc=t.mcc, geo=t.geo, device_id=t.device_id))
+		for t in txns
+	]
+	stored = await fetch_batch_features(observed)
+	if any(features is not None for features in stored):
+		results = await triage_fraud_features([
+			{"amount": t.amount, "mcc": t.mcc, "geo": t.geo, "device_id": t.device_id, "now": now, "features": features}
+			for t, features in zip(txns, stored)
+		])
+	else:
+		# Feature store disabled or down: history-free features built as one matrix
+		results = await triage_fraud_batch(
+			[{"account_id": t.account_id, "amount": t.amount, "mcc": t.mcc, "geo": t.geo, "device_id": t.device_id} for t in txns],
+			now=now,
+		)
+
+	with span("build_explanations"):
+		explanations = [fraud_explanations(r.features, t.mcc, r.rule_hits) for t, r in zip(txns, results)]
+	# SLA measurement (ms): feature fetch through decisions for the whole batch,
+	# before telemetry; every item shares it
+	sla_ms = int((perf_counter() - started) * 1000)
+
+	timestamp_s = datetime.utcnow().timestamp()
+	items = []
+	events = []
+	for txn, (_, obs), result, reasons in zip(txns, observed, results, explanations):
+		features = result.features
+		event_id = obs.event_id
+		events.append(TriageEvent(
+			event_id=event_id,
+			timestamp_s=timestamp_s,
+			intent="fraud",
+			payload=txn.model_dump(),
+			decision=str(result.decision),
+			risk_band=str(result.risk_band),
+			alert_score=float(result.alert_score),
+			explanations=list(reasons),
+			features=features,
+			sla_ms=sla_ms,
+		))
+		items.append({
+			"event_id": event_id,
+			"alert_score": result.alert_score,
+			"decision": result.decision,
+			"rationale": result.rationale,
+			"policy_citations": result.policy_citations,
+			"features": features,
+			"risk_band": result.risk_band,
+			"explanations": reasons,
+			"summary": fraud_summary(result),
+		})
+	record_events(events)
+	await asyncio.gather(*(observe_account_txn(account_id, obs) for account_id, obs in observed))
+	elapsed = perf_counter() - started
+	record_stage("fraud_triage_batch", elapsed)
+	# Queued like single triage; the service's rate limiter and queue bound
+	# how many LLM calls a large batch can trigger
+	for item in items:
+		item["llm_rationale_status"] = request_rationale("fraud", item["event_id"], item)
+	return {"items": items, "count": len(items), "sla_ms": sla_ms}
+
+
+async def _score_stream_batch(events: list[StreamEvent]) -> bytes:
+	"""Score one micro-batch of stream events; returns their NDJSON result lines."""
+	return b"".join(dumps_line(record) for record in await score_stream_events(events))
+
+
+async def _triage_stream(request: Request) -> AsyncIterator[bytes]:
+	"""Parse, score and emit an NDJSON transaction stream in bounded micro-batches.
+
+	At most `stream_max_inflight_batches` batches are being scored at once;
+	when the window is full the request body is not read further, so a slow
+	consumer or a fast producer is held back by TCP flow control instead of
+	buffering. Results are emitted in input order as each batch completes,
+	followed by a `{"done": true, ...}` trailer.
+	"""
+	settings = get_settings()
+	batch_size = max(1, settings.stream_batch_size)
+	window = max(1, settings.stream_max_inflight_batches)
+	started = perf_counter()
+	pending: deque[asyncio.Task] = deque()
+	batch: list[StreamEvent] = []
+	seq = events = errors = 0
+	try:
+		async for lines in iter_lines(request.stream(), max_line_bytes=settings.stream_max_line_bytes):
+			for line in lines:
+				event = parse_event(seq, line)
+				seq += 1
+				if event is None:
+					continue
+				events += 1
+				errors += event.error is not None
+				batch.append(event)
+				if len(batch) >= batch_size:
+					pending.append(asyncio.create_task(_score_stream_batch(batch)))
+					batch = []
+					while len(pending) >= window:
+						yield await pending.popleft()
+			# Input paused between chunks: don't hold a partial batch while idle
+			if batch and not pending:
+				pending.append(asyncio.create_task(_score_stream_batch(batch)))
+				batch = []
+			while pending and pending[0].done():
+				yield pending.popleft().result()
+		if batch:
+			pending.append(asyncio.create_task(_score_stream_batch(batch)))
+		while pending:
+			yield await pending.popleft()
+		yield dumps_line({"done": True, "events": events, "errors": errors, "elapsed_ms": int((perf_counter() - started) * 1000)})
+	except ClientDisconnect:
+		return
+	finally:
+		# Client went away or a batch failed: stop the rest of the work
+		for task in pending:
+			task.cancel()
+
+
+@router.post("/fraud/triage/stream")
+async def fraud_triage_stream(request: Request):
+	"""Score an NDJSON body of transaction events, streaming NDJSON results back.
+
+	Each input line is a transaction in the docs/data-contracts.md event
+	shape; each output line carries the input's `seq` (0-based line number)
+	and either the triage result or an `error`. Clients must read results
+	while uploading (e.g. `curl -N --data-binary @events.ndjson`); one that
+	sends the whole body first stalls once the in-flight window is full.
+	"""
+	return DuplexStreamingResponse(_triage_stream(request), media_type="application/x-ndjson")
+
+
+@router.get("/stream/consumers")
+async def stream_consumers():
+	"""Committed offsets, lag and throughput of the stream consumers running in this process."""
+	return {"consumers": consumer_statuses()}
 
 
 @router.post("/credit/triage")
 async def credit_triage(input_app: ApplicationInput):
-	agent = CreditRiskAgent()
-	res = agent.triage(
-		income=input_app.income,
-		liabilities=input_app.liabilities,
-		delinquency_flags=input_app.delinquency_flags,
-		requested_limit=input_app.requested_limit,
-	)
-	return {
+	with span("credit_triage") as sp:
+		res = await triage_credit(
+			income=input_app.income,
+			liabilities=input_app.liabilities,
+			delinquency_flags=input_app.delinquency_flags,
+			requested_limit=input_app.requested_limit,
+		)
+	record_decision("credit", sp.elapsed_s, get_settings().sla_budget_ms)
+	out = {
+		"event_id": str(uuid4()),
 		"score": res.score,
 		"decision": res.decision,
 		"rationale": res.rationale,
 		"policy_citations": res.policy_citations,
 		"key_factors": res.key_factors,
 	}
+	out["llm_rationale_status"] = request_rationale("credit", out["event_id"], out)
+	return out
+
+
+@router.get("/rationale/{event_id}")
+async def get_rationale(event_id: str, wait_s: float = 0.0):
+	"""Deferred LLM rationale for a decision.
+
+	200 once the job has finished (done, failed or dropped), 202 while it is
+	queued or running. `wait_s` (up to 30) long-polls: the response is held
+	until the job finishes or the wait runs out.
+	"""
+	service = get_rationale_service()
+	if service is None:
+		raise HTTPException(status_code=404, detail="deferred rationales are disabled")
+	job = await service.wait(event_id, min(max(wait_s, 0.0), 30.0))
+	if job is None:
+		raise HTTPException(status_code=404, detail=f"no rationale job for event {event_id}")
+	pending = job.status in ("queued", "running")
+	return JSONResponse(job.to_dict(), status_code=202 if pending else 200)
 
 
 @router.get("/analytics/kpis")
@@ -253,36 +441,71 @@ class UpdateFraudConfig(BaseModel):
 
 @router.put("/fraud/config")
 async def put_fraud_config(body: UpdateFraudConfig):
-	return update_config(**{k: v for k, v in body.model_dump().items() if v is not None})
-
-
-@router.post("/fraud/train-iforest")
-async def train_iforest():
-	# In a real system, pull historical feature rows from a feature store
-	# Here we synthesize a few rows using simple distributions
-	rows = []
-	for i in range(200):
-		rows.append({
-			"velocity_1h_count": 0.0,
-			"velocity_1h_total": 0.0,
-			"velocity_24h_count": float(i % 5),
-			"velocity_24h_total": float((i % 7) * 20),
-			"amount_zscore": float((i % 10) / 10.0),
-			"device_novelty": 0.0,
-			"geo_novelty": 0.0,
-			"high_risk_mcc": 1.0 if (i % 30 == 0) else 0.0,
-			"hour_of_day": float(i % 24),
-			"is_night": 1.0 if (i % 24 < 6 or i % 24 >= 22) else 0.0,
-			"first_time_mcc": 0.0,
-		})
-	info = train_from_feature_rows(rows)
-	return {"status": "ok", "model": {"loaded": info.loaded, "n_features": info.n_features, "feature_names": info.feature_names}}
+	return update_fraud_config(**{k: v for k, v in body.model_dump().items() if v is not None})
+
+
+def _model_info(info: ModelInfo) -> dict:
+	return {
+		"loaded": info.loaded,
+		"n_features": info.n_features,
+		"feature_names": info.feature_names,
+		"version": info.version,
+		"trained_at": info.trained_at,
+	}
+
+
+class TrainIForestBody(BaseModel):
+	source: Literal["telemetry", "file"] = "telemetry"
+	path: str | None = None  # export for source="file": .npy, .jsonl or .csv
+	sample_size: int | None = Field(default=None, ge=2)
+	n_jobs: int = Field(default=1, ge=-1)
+
+
+@router.post("/fraud/train-iforest", status_code=202)
+async def train_iforest(body: TrainIForestBody | None = None):
+	"""Queue background training in a worker process; the new model is activated when it finishes."""
+	body = body or TrainIForestBody()
+	try:
+		# Snapshotting telemetry touches every event; keep it off the event loop
+		job = await asyncio.to_thread(submit_training, source=body.source, path=body.path, sample_size=body.sample_size, n_jobs=body.n_jobs)
+	except FileNotFoundError as exc:
+		raise HTTPException(status_code=404, detail=str(exc))
+	except ValueError as exc:
+		raise HTTPException(status_code=400, detail=str(exc))
+	return {"status": "accepted", "job": job_dict(job)}
+
+
+@router.get("/fraud/train-iforest/jobs")
+async def train_iforest_jobs():
+	return {"jobs": [job_dict(j) for j in list_jobs()]}
+
+
+@router.get("/fraud/train-iforest/jobs/{job_id}")
+async def train_iforest_job(job_id: str):
+	job = get_job(job_id)
+	if job is None:
+		raise HTTPException(status_code=404, detail=f"unknown training job {job_id}")
+	return job_dict(job)
 
 
 @router.get("/fraud/model-info")
 async def fraud_model_info():
-	info = get_model_info()
-	return {"loaded": info.loaded, "n_features": info.n_features, "feature_names": info.feature_names}
+	return _model_info(get_model_info())
+
+
+@router.get("/fraud/models")
+async def fraud_models():
+	active = get_model_info().version
+	return {"active": active, "versions": [_model_info(m) for m in list_models()]}
+
+
+@router.post("/fraud/models/{version}/activate")
+async def fraud_model_activate(version: str):
+	try:
+		info = activate_model(version)
+	except KeyError:
+		raise HTTPException(status_code=404, detail=f"unknown model version {version}")
+	return {"status": "ok", "model": _model_info(info)}
 
 
 class TriageInput(BaseModel):
@@ -291,8 +514,11 @@ class TriageInput(BaseModel):
 
 @router.post("/triage")
 async def unified_triage(body: TriageInput):
-	orchestrator = TriageOrchestrator()
-	result = orchestrator.invoke(body.payload)
-	return result
+	# Feature store reads/writes happen inside the graph's fraud node.
+	# Imported here rather than at module load (the startup prewarm gets to
+	# it first): it pulls in LangGraph
+	from src.agents.langgraph_workflow import get_orchestrator
+
+	return await get_orchestrator().ainvoke(body.payload)
 
 
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from time import perf_counter
+from typing import Any
+from uuid import uuid4
+
+from src.agents.scoring_pool import triage_fraud_features
+from src.channels.ndjson_stream import StreamEvent
+from src.core.metrics import record_stage
+from src.fraud_detection.feature_store import ObservedTxn, fetch_batch_features, observe_account_txn
+from src.fraud_detection.telemetry import TriageEvent, record_events
+
+
+def fraud_explanations(features: dict, mcc: str | None, rule_hits: list[str] | None) -> list[str]:
+	"""Build human-friendly explanations from features and rule hits."""
+	explanations: list[str] = []
+	if features.get("amount_zscore", 0.0) >= 3.5:
+		explanations.append(f"Transaction amount is {features['amount_zscore']:.1f}σ above the account's average")
+	if features.get("geo_novelty", 0.0) >= 1.0:
+		explanations.append("Transaction originates from a new or high-risk geographical location")
+	if features.get("device_novelty", 0.0) >= 1.0:
+		explanations.append("Device ID has not been seen on this account before")
+	if features.get("high_risk_mcc", 0.0) >= 1.0 and mcc:
+		explanations.append(f"Merchant Category ({mcc}) is flagged as high-risk")
+	if features.get("velocity_1h_count", 0.0) >= 5:
+		explanations.append("High transaction velocity in the last 1 hour")
+
+	# Always include rule hits (if any) to preserve transparency
+	for hit in rule_hits or []:
+		if hit not in explanations:
+			explanations.append(hit)
+	return explanations
+
+
+def fraud_summary(result) -> str:
+	risk_score = round(float(getattr(result, "alert_score", 0.0)) * 100)
+	risk_band = getattr(result, "risk_band", "low")
+	risk_label = risk_band.capitalize()
+	decision_human = "Manual review recommended" if risk_band in {"medium", "high"} else "Approve"
+	return f"{risk_label} Risk ({risk_score}/100): {decision_human}."
+
+
+# Account -> completion future of the latest stream batch that touches it.
+_account_batches: dict[str, asyncio.Future] = {}
+
+
+async def score_stream_events(events: list[StreamEvent]) -> list[dict[str, Any]]:
+	"""Score a micro-batch of parsed stream events through the fraud triage pipeline.
+
+	Stored account features are read once per account with the batch's earlier
+	same-account events folded in, the batch is scored in one pass (inline or
+	on the scoring pool), and telemetry and feature-store observations are
+	written. Returns one record per input event, in order:
+	the triage result, or `{"seq", "error"}` for events that failed to parse.
+
+	Batches may be scored concurrently, but one that shares an account with a
+	batch started earlier waits for it to finish, so its feature read sees the
+	earlier batch's observations; batches on disjoint accounts still overlap.
+	"""
+	accounts = {e.account_id for e in events if e.error is None}
+	earlier = {_account_batches[a] for a in accounts if a in _account_batches}
+	done = asyncio.get_running_loop().create_future()
+	for account_id in accounts:
+		_account_batches[account_id] = done
+	try:
+		if earlier:
+			await asyncio.gather(*earlier)
+		return await _score_events(events)
+	finally:
+		done.set_result(None)
+		for account_id in accounts:
+			if _account_batches.get(account_id) is done:
+				del _account_batches[account_id]
+
+
+async def _score_events(events: list[StreamEvent]) -> list[dict[str, Any]]:
+	started = perf_counter()
+	valid = [e for e in events if e.error is None]
+	fallback_now = datetime.utcnow()
+	observed = [
+		(e.account_id, ObservedTxn(event_id=e.event_id or str(uuid4()), amount=e.amount, timestamp=e.timestamp or fallback_now, mcc=e.mcc, geo=e.geo, device_id=e.device_id))
+		for e in valid
+	]
+	stored = await fetch_batch_features(observed)
+	results = await triage_fraud_features([
+		{"amount": e.amount, "mcc": e.mcc, "geo": e.geo, "device_id": e.device_id, "now": obs.timestamp, "features": features}
+		for e, (_, obs), features in zip(valid, observed, stored)
+	])
+
+	timestamp_s = datetime.utcnow().timestamp()
+	by_seq: dict[int, dict] = {}
+	tele: list[TriageEvent] = []
+	for e, (_, obs), result in zip(valid, observed, results):
+		event_id = obs.event_id
+		explanations = fraud_explanations(result.features, e.mcc, result.rule_hits)
+		tele.append(TriageEvent(
+			event_id=event_id,
+			timestamp_s=timestamp_s,
+			intent="fraud",
+			payload=e.raw or {},
+			decision=str(result.decision),
+			risk_band=str(result.risk_band),
+			alert_score=float(result.alert_score),
+			explanations=list(explanations),
+			features=result.features,
+			sla_ms=None,
+		))
+		by_seq[e.seq] = {
+			"seq": e.seq,
+			"event_id": event_id,
+			"alert_score": result.alert_score,
+			"decision": result.decision,
+			"risk_band": result.risk_band,
+			"explanations": explanations,
+			"summary": fraud_summary(result),
+		}
+	record_events(tele)
+	await asyncio.gather(*(observe_account_txn(acct, txn) for acct, txn in observed))
+	record_stage("fraud_triage_stream_batch", perf_counter() - started)
+	return [by_seq[e.seq] if e.error is None else {"seq": e.seq, "error": e.error} for e in events]
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+
+@dataclass
+class StreamEvent:
+	"""One parsed line of a transaction stream; `error` is set instead of fields on bad input."""
+
+	seq: int
+	event_id: str | None = None
+	account_id: str = ""
+	amount: float = 0.0
+	mcc: str | None = None
+	geo: str | None = None
+	device_id: str | None = None
+	timestamp: datetime | None = None
+	raw: dict[str, Any] | None = None
+	error: str | None = None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], *, max_line_bytes: int) -> AsyncIterator[list[bytes]]:
+	"""Split a chunked byte stream into complete lines, one list per incoming chunk.
+
+	Only the trailing partial line is carried between chunks, so memory is
+	bounded by the chunk size plus `max_line_bytes`. A line that outgrows the
+	limit is yielded truncated to the limit and the rest of it is discarded,
+	so a missing newline cannot exhaust memory.
+	"""
+	buf = b""
+	skipping = False
+	async for chunk in chunks:
+		if not chunk:
+			continue
+		parts = (buf + chunk).split(b"\n")
+		buf = parts.pop()
+		if skipping and parts:
+			parts.pop(0)  # remainder of an oversized line
+			skipping = False
+		if len(buf) > max_line_bytes:
+			if not skipping:
+				parts.append(buf[:max_line_bytes])
+			buf = b""
+			skipping = True
+		if parts:
+			yield parts
+	if buf and not skipping:
+		yield [buf]
+
+
+def _parse_ts(value: Any) -> datetime | None:
+	if not value:
+		return None
+	ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+	# Feature code works in naive UTC, like datetime.utcnow()
+	return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def parse_event(seq: int, line: bytes) -> StreamEvent | None:
+	"""Parse one NDJSON line in the transaction event shape (docs/data-contracts.md).
+
+	`geo` may be a string or an object with `country`; `ts` (or `timestamp`)
+	is ISO-8601. Blank lines are skipped (None).
+	"""
+	line = line.strip()
+	if not line:
+		return None
+	try:
+		obj = json.loads(line)
+		if not isinstance(obj, dict):
+			raise ValueError("expected a JSON object")
+		if obj.get("account_id") in (None, ""):
+			raise ValueError("missing account_id")
+		geo = obj.get("geo")
+		if isinstance(geo, dict):
+			geo = geo.get("country")
+		return StreamEvent(
+			seq=seq,
+			event_id=str(obj["event_id"]) if obj.get("event_id") else None,
+			account_id=str(obj["account_id"]),
+			amount=float(obj["amount"]),
+			mcc=str(obj["mcc"]) if obj.get("mcc") is not None else None,
+			geo=str(geo) if geo is not None else None,
+			device_id=str(obj["device_id"]) if obj.get("device_id") is not None else None,
+			timestamp=_parse_ts(obj.get("ts") or obj.get("timestamp")),
+			raw=obj,
+		)
+	except (KeyError, TypeError, ValueError) as exc:
+		return StreamEvent(seq=seq, error=f"{type(exc).__name__}: {exc}" if not isinstance(exc, KeyError) else f"missing {exc}")
+
+
+def dumps_line(obj: dict[str, Any]) -> bytes:
+	return json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8") + b"\n"
+
+
+class DuplexStreamingResponse(StreamingResponse):
+	"""StreamingResponse for bodies that are produced while the request is still being read.
+
+	Starlette's StreamingResponse listens for client disconnects by consuming
+	`receive()`, which would swallow request body chunks that the generator
+	itself is reading through `request.stream()`. Here the generator is the
+	only reader; a disconnect surfaces as `ClientDisconnect` from the request
+	stream.
+	"""
+
+	async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+		await self.stream_response(send)
+		if self.background is not None:
+			await self.background()
@@ -0,0 +1,385 @@
+"""File-tail stream consumer: a local stand-in for a Kafka/Event Hubs consumer group.
+
+A topic is a directory of append-only NDJSON segment files (or a single
+file), read in name order. Each consumer group keeps its committed position
+(segment, byte offset, line count) in `<offsets_dir>/<group>.json`; results are
+written and fsynced before the offset is committed, so a restart resumes at
+the last committed event and delivery is at-least-once.
+
+	python -m src.channels.stream_consumer --source data/stream/transactions --group fraud-scorer
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import tempfile
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import IO
+
+from src.channels.fraud_pipeline import score_stream_events
+from src.channels.ndjson_stream import StreamEvent, dumps_line, parse_event
+from src.core.config import get_settings
+from src.core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_SUFFIXES = (".ndjson", ".jsonl")
+_READ_BYTES = 1 << 20
+
+
+@dataclass
+class CommittedOffset:
+	segment: str | None = None  # file name within the topic directory
+	position: int = 0  # byte offset just past the last committed line
+	lines: int = 0  # lines committed across all segments; used as the event seq
+
+
+@dataclass
+class _Line:
+	seq: int
+	segment: str
+	end: int
+	data: bytes | None  # None: the line exceeded max_line_bytes and was skipped
+
+
+class FileTailConsumer:
+	"""Tails a topic, scores events in micro-batches and commits offsets after each batch.
+
+	A batch closes at `batch_max_events` events or `batch_max_wait_s` after
+	its first event, whichever comes first, so throughput follows traffic:
+	large batches under load, prompt small ones when the stream is quiet.
+	"""
+
+	def __init__(
+		self,
+		source: str | Path,
+		*,
+		group: str,
+		offsets_dir: str | Path,
+		output: str | Path,
+		batch_max_events: int = 500,
+		batch_max_wait_s: float = 0.2,
+		poll_interval_s: float = 0.1,
+		max_line_bytes: int = 64 * 1024,
+	) -> None:
+		self.source = Path(source)
+		self.group = group
+		self.offsets_path = Path(offsets_dir) / f"{group}.json"
+		self.output_path = Path(output)
+		self.batch_max_events = max(1, batch_max_events)
+		self.batch_max_wait_s = batch_max_wait_s
+		self.poll_interval_s = poll_interval_s
+		self.max_line_bytes = max_line_bytes
+		self.committed = self._load_offset()
+		# Read position runs ahead of the committed one by at most a batch
+		self._segment = self.committed.segment
+		self._position = self.committed.position
+		self._lines = self.committed.lines
+		self._out: IO[bytes] | None = None
+		self.running = False
+		self.events_total = 0
+		self.errors_total = 0
+		self.batches_total = 0
+		self.throughput_eps = 0.0
+		self.last_batch_ms: float | None = None
+		self.last_event_time: datetime | None = None
+
+	# -- offsets -------------------------------------------------------------
+
+	def _load_offset(self) -> CommittedOffset:
+		try:
+			return CommittedOffset(**json.loads(self.offsets_path.read_text(encoding="utf-8")))
+		except FileNotFoundError:
+			return CommittedOffset()
+		except (ValueError, TypeError) as exc:
+			# Empty or corrupt offsets file: replay from the start (at-least-once)
+			logger.warning("Unreadable offsets for %s (%s); starting from the beginning", self.group, exc)
+			return CommittedOffset()
+
+	def _commit(self, offset: CommittedOffset) -> None:
+		self.offsets_path.parent.mkdir(parents=True, exist_ok=True)
+		fd, tmp = tempfile.mkstemp(prefix=".offset-", dir=self.offsets_path.parent)
+		with os.fdopen(fd, "w", encoding="utf-8") as f:
+			json.dump(asdict(offset), f)
+			# Durable before it becomes visible, or a crash can leave an empty file
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(tmp, self.offsets_path)
+		self.committed = offset
+
+	# -- reading -------------------------------------------------------------
+
+	def segments(self) -> list[Path]:
+		if self.source.is_dir():
+			return sorted(p for p in self.source.iterdir() if p.suffix in _SEGMENT_SUFFIXES and p.is_file())
+		return [self.source] if self.source.exists() else []
+
+	def _current_segment(self, segments: list[Path]) -> Path | None:
+		if not segments:
+			return None
+		if self._segment is None:
+			self._segment, self._position = segments[0].name, 0
+		for path in segments:
+			if path.name == self._segment:
+				return path
+		# The committed segment was removed by retention: resume at the next one
+		later = [p for p in segments if p.name > self._segment]
+		if later:
+			logger.warning("Stream segment %s is gone; %s resumes at %s", self._segment, self.group, later[0].name)
+			self._segment, self._position = later[0].name, 0
+			return later[0]
+		return None
+
+	def _read_lines(self, max_lines: int) -> list[_Line]:
+		"""Read up to `max_lines` complete lines past the read position (blocking I/O)."""
+		out: list[_Line] = []
+		segments = self.segments()
+		while len(out) < max_lines:
+			path = self._current_segment(segments)
+			if path is None:
+				break
+			with path.open("rb") as f:
+				f.seek(self._position)
+				chunk = f.read(max(_READ_BYTES, self.max_line_bytes + 1))
+				newer = any(p.name > path.name for p in segments)
+				start = 0
+				while len(out) < max_lines:
+					nl = chunk.find(b"\n", start)
+					if nl < 0:
+						break
+					self._emit(out, chunk[start:nl], self._position + nl + 1)
+					start = nl + 1
+				self._position += start
+				rest = chunk[start:]
+				if len(out) >= max_lines:
+					break
+				if len(rest) > self.max_line_bytes:
+					# No newline within the limit: skip to the end of this line
+					end = self._skip_line(f, self._position + len(rest))
+					self._emit(out, None, end)
+					self._position = end
+					continue
+				if start > 0:
+					continue  # more whole lines may follow in the file
+				if not newer:
+					break  # caught up with the live segment; wait for the writer
+				if rest:
+					# Sealed segment ending without a newline: its tail is a final line
+					self._emit(out, rest, self._position + len(rest))
+				self._segment = min(p.name for p in segments if p.name > path.name)
+				self._position = 0
+		return out
+
+	def _emit(self, out: list[_Line], data: bytes | None, end: int) -> None:
+		out.append(_Line(seq=self._lines, segment=self._segment or "", end=end, data=data))
+		self._lines += 1
+
+	@staticmethod
+	def _skip_line(f: IO[bytes], position: int) -> int:
+		f.seek(position)
+		while True:
+			chunk = f.read(_READ_BYTES)
+			if not chunk:
+				return position
+			nl = chunk.find(b"\n")
+			if nl >= 0:
+				return position + nl + 1
+			position += len(chunk)
+
+	# -- processing ------------------------------------------------------------
+
+	async def _next_batch(self, stop: asyncio.Event) -> list[_Line]:
+		batch: list[_Line] = []
+		deadline: float | None = None
+		while len(batch) < self.batch_max_events and not stop.is_set():
+			lines = await asyncio.to_thread(self._read_lines, self.batch_max_events - len(batch))
+			if lines:
+				batch += lines
+				deadline = deadline or monotonic() + self.batch_max_wait_s
+				continue
+			if batch and monotonic() >= deadline:
+				break
+			wait = self.poll_interval_s if deadline is None else min(self.poll_interval_s, max(0.0, deadline - monotonic()))
+			try:
+				await asyncio.wait_for(stop.wait(), timeout=wait)
+			except asyncio.TimeoutError:
+				pass
+		return batch
+
+	async def _process(self, batch: list[_Line]) -> None:
+		started = perf_counter()
+		events: list[StreamEvent] = []
+		for line in batch:
+			if line.data is None:
+				events.append(StreamEvent(seq=line.seq, error=f"line exceeds {self.max_line_bytes} bytes"))
+				continue
+			event = parse_event(line.seq, line.data)
+			if event is not None:
+				events.append(event)
+		records = await score_stream_events(events) if events else []
+		by_seq = {line.seq: line for line in batch}
+		payload = b"".join(
+			dumps_line({**r, "segment": by_seq[r["seq"]].segment, "offset": by_seq[r["seq"]].end})
+			for r in records
+		)
+		await asyncio.to_thread(self._write_output, payload)
+		last = batch[-1]
+		self._commit(CommittedOffset(segment=last.segment, position=last.end, lines=last.seq + 1))
+
+		elapsed = perf_counter() - started
+		errors = sum(1 for e in events if e.error is not None)
+		self.batches_total += 1
+		self.events_total += len(events)
+		self.errors_total += errors
+		self.last_batch_ms = elapsed * 1000.0
+		timestamps = [e.timestamp for e in events if e.timestamp is not None]
+		if timestamps:
+			self.last_event_time = max(timestamps)
+		rate = len(events) / elapsed if elapsed > 0 else 0.0
+		self.throughput_eps = rate if self.batches_total == 1 else 0.8 * self.throughput_eps + 0.2 * rate
+		registry.inc("banking_stream_events_total", "group", self.group, len(events))
+		self._report_lag()
+
+	def _write_output(self, payload: bytes) -> None:
+		if self._out is None:
+			self.output_path.parent.mkdir(parents=True, exist_ok=True)
+			self._out = self.output_path.open("ab")
+		self._out.write(payload)
+		self._out.flush()
+		os.fsync(self._out.fileno())
+
+	def lag_bytes(self) -> int:
+		"""Bytes between the committed offset and the end of the topic."""
+		lag = 0
+		for path in self.segments():
+			if self.committed.segment is None or path.name > self.committed.segment:
+				lag += path.stat().st_size
+			elif path.name == self.committed.segment:
+				lag += max(0, path.stat().st_size - self.committed.position)
+		return lag
+
+	def lag_seconds(self) -> float | None:
+		"""Event-time lag: how far behind now the last committed event's `ts` is."""
+		if self.last_event_time is None:
+			return None
+		return max(0.0, (datetime.utcnow() - self.last_event_time).total_seconds())
+
+	def _report_lag(self) -> None:
+		registry.set("banking_stream_lag_bytes", "group", self.group, float(self.lag_bytes()))
+		lag_s = self.lag_seconds()
+		if lag_s is not None:
+			registry.set("banking_stream_lag_seconds", "group", self.group, lag_s)
+
+	async def run(self, stop: asyncio.Event) -> None:
+		"""Consume until `stop` is set; the batch in progress is finished and committed first."""
+		self.running = True
+		logger.info("Stream consumer %s starting at %s", self.group, asdict(self.committed))
+		try:
+			while not stop.is_set():
+				batch = await self._next_batch(stop)
+				if batch:
+					await self._process(batch)
+				else:
+					self._report_lag()
+		finally:
+			self.running = False
+			if self._out is not None:
+				self._out.close()
+				self._out = None
+
+	def status(self) -> dict:
+		return {
+			"group": self.group,
+			"source": str(self.source),
+			"running": self.running,
+			"committed": asdict(self.committed),
+			"lag_bytes": self.lag_bytes(),
+			"lag_seconds": self.lag_seconds(),
+			"events_total": self.events_total,
+			"errors_total": self.errors_total,
+			"batches_total": self.batches_total,
+			"throughput_eps": round(self.throughput_eps, 1),
+			"last_batch_ms": self.last_batch_ms,
+		}
+
+
+_consumers: dict[str, tuple[FileTailConsumer, asyncio.Event, asyncio.Task]] = {}
+
+
+def consumer_from_settings(source: str | None = None, group: str | None = None) -> FileTailConsumer:
+	settings = get_settings()
+	return FileTailConsumer(
+		source or settings.stream_consumer_source or "",
+		group=group or settings.stream_consumer_group,
+		offsets_dir=settings.stream_offsets_dir,
+		output=settings.stream_consumer_output,
+		batch_max_events=settings.stream_consumer_batch_max,
+		batch_max_wait_s=settings.stream_consumer_batch_wait_ms / 1000.0,
+		max_line_bytes=settings.stream_max_line_bytes,
+	)
+
+
+def start_consumer(consumer: FileTailConsumer) -> None:
+	"""Run a consumer as a background task of the current event loop."""
+	if consumer.group in _consumers:
+		raise ValueError(f"consumer group {consumer.group} is already running")
+	stop = asyncio.Event()
+	task = asyncio.create_task(consumer.run(stop))
+	task.add_done_callback(lambda t: _consumer_done(consumer.group, t))
+	_consumers[consumer.group] = (consumer, stop, task)
+
+
+def _consumer_done(group: str, task: asyncio.Task) -> None:
+	if not task.cancelled() and task.exception() is not None:
+		logger.error("Stream consumer %s stopped with an error", group, exc_info=task.exception())
+
+
+async def stop_consumers() -> None:
+	for _, stop, _ in _consumers.values():
+		stop.set()
+	await asyncio.gather(*(task for _, _, task in _consumers.values()), return_exceptions=True)
+	_consumers.clear()
+
+
+def consumer_statuses() -> list[dict]:
+	return [consumer.status() for consumer, _, _ in _consumers.values()]
+
+
+async def _main(args: argparse.Namespace) -> None:
+	consumer = consumer_from_settings(args.source, args.group)
+	stop = asyncio.Event()
+	loop = asyncio.get_running_loop()
+	for sig in (signal.SIGINT, signal.SIGTERM):
+		try:
+			loop.add_signal_handler(sig, stop.set)
+		except NotImplementedError:
+			# Windows event loops have no add_signal_handler
+			signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+
+	async def report() -> None:
+		while not stop.is_set():
+			await asyncio.sleep(args.report_every)
+			logger.info("%s", json.dumps(consumer.status()))
+
+	reporter = asyncio.create_task(report())
+	try:
+		await consumer.run(stop)
+	finally:
+		reporter.cancel()
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Tail NDJSON transaction segments and score them in micro-batches.")
+	parser.add_argument("--source", help="topic directory or file (default: STREAM_CONSUMER_SOURCE)")
+	parser.add_argument("--group", help="consumer group (default: STREAM_CONSUMER_GROUP)")
+	parser.add_argument("--report-every", type=float, default=10.0, help="seconds between status log lines")
+	logging.basicConfig(level=logging.INFO)
+	asyncio.run(_main(parser.parse_args()))
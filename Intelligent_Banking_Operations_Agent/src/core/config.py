@@ -1,7 +1,16 @@
 from functools import lru_cache
+from pathlib import Path
+from typing import Literal
+
+from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+# Repository root; relative data paths that ship with the code resolve against
+# it, not against the working directory
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+
 class AppSettings(BaseSettings):
 	"""Application configuration loaded from environment or .env file.
 
@@ -9,6 +18,7 @@ class AppSettings(BaseSettings):
 	"""
 	# LLM/Observability
 	openai_api_key: str | None = None
+	openai_base_url: str = "https://api.openai.com/v1"
 	langchain_tracing_v2: bool = False
 	langchain_api_key: str | None = None
 	langchain_project: str | None = "banking-ops"
@@ -17,13 +27,98 @@ class AppSettings(BaseSettings):
 	mongodb_uri: str = "mongodb://localhost:27017"
 	mongodb_db: str = "banking_ops"
 	redis_url: str = "redis://localhost:6379/0"
+	# Redis socket timeouts (seconds); a stalled Redis fails fast instead of holding triage
+	redis_socket_timeout_s: float = 0.5
+	redis_connect_timeout_s: float = 1.0
+
+	# Online feature store (Redis-backed per-account fraud features)
+	feature_store_enabled: bool = True
+	feature_store_ttl_s: int = 90 * 24 * 3600
 
-	# Vector store
+	# Vector store: "chroma", or "numpy" for the in-process memory-mapped index
+	# (exact top-k, IVF-approximate from vector_ann_min_rows chunks)
 	vector_db_path: str = "./data/vectorstore"
+	vector_backend: Literal["chroma", "numpy"] = "chroma"
+	vector_ann_min_rows: int = 20_000
+	vector_ann_nprobe: int = 8
+	# Embeddings for the numpy backend: "minilm" (ONNX, Chroma's default model) or "hashing" (offline)
+	embedding_model: Literal["minilm", "hashing"] = "minilm"
+	# Persistent embedding cache under vector_db_path, keyed by (model, text SHA-256)
+	embedding_cache_enabled: bool = True
+	embedding_cache_max_entries: int = 200_000
+	# Policy documents; a relative path resolves against the project root
+	policies_dir: str = "./data/policies"
+	# Policy sections longer than this are split at paragraph breaks before embedding
+	policy_chunk_max_chars: int = 2000
+	# Policy retrieval: "dense" (vector store), "lexical" (BM25 only, no embedding
+	# model) or "hybrid" (reciprocal rank fusion of both)
+	retrieval_mode: Literal["dense", "lexical", "hybrid"] = "dense"
+	# Policy query result cache (entries, seconds); cleared on every re-index
+	rag_cache_max_entries: int = 1024
+	rag_cache_ttl_s: float = 600.0
+
+	# Versioned Isolation Forest artifacts (memory-mapped, shared across workers)
+	iforest_registry_dir: str = "./data/models/iforest"
+	# Background training: worker processes and rows kept in memory per job
+	iforest_train_workers: int = 1
+	iforest_train_sample_size: int = 100_000
+
+	# Fraud telemetry window (events kept in memory; labels are evicted with them)
+	telemetry_max_events: int = 5000
+
+	# Decision latency budget (docs/scope-metrics.md), used for over-budget counters
+	sla_budget_ms: int = 150
+
+	# Triage scoring: "inline" in the event loop, or "process_pool" (workers=0 means one per CPU)
+	scoring_mode: Literal["inline", "process_pool"] = "inline"
+	scoring_workers: int = 0
+	scoring_batch_max: int = 256
+	scoring_batch_wait_ms: float = 2.0
+
+	# NDJSON triage stream: events per micro-batch, batches scored concurrently
+	# (bounds in-flight memory) and the longest accepted line
+	stream_batch_size: int = 256
+	stream_max_inflight_batches: int = 4
+	stream_max_line_bytes: int = 64 * 1024
+
+	# File-tail stream consumer (started with the app when a source is set)
+	stream_consumer_source: str | None = None
+	stream_consumer_group: str = "fraud-scorer"
+	stream_consumer_output: str = "./data/stream/results.ndjson"
+	stream_offsets_dir: str = "./data/stream/offsets"
+	stream_consumer_batch_max: int = 500
+	stream_consumer_batch_wait_ms: int = 200
+
+	# Deferred LLM rationales, generated in the background after the decision is
+	# returned: "off", "fake" (local stand-in for tests and demos) or "openai"
+	rationale_llm: Literal["off", "fake", "openai"] = "off"
+	rationale_model: str = "gpt-4o-mini"
+	rationale_concurrency: int = 4
+	rationale_rate_per_s: float = 5.0
+	rationale_queue_max: int = 1000
+	rationale_max_retries: int = 3
+	rationale_timeout_s: float = 20.0
+	# Finished rationales kept for polling (oldest evicted first)
+	rationale_store_max: int = 5000
+	rationale_fake_latency_ms: int = 800
+	rationale_fake_failure_rate: float = 0.0
+
+	# Startup: warm the triage graph, scoring, anomaly model, policy index and
+	# Redis concurrently; block serving until ready, or (default) warm in the
+	# background and report through /ready
+	startup_prewarm: bool = True
+	startup_block_until_ready: bool = False
+	startup_component_timeout_s: float = 30.0
 
 	# App
 	allow_debug: bool = False
 
+	@field_validator("policies_dir")
+	@classmethod
+	def _from_project_root(cls, value: str) -> str:
+		path = Path(value)
+		return str(path if path.is_absolute() else PROJECT_ROOT / path)
+
 	model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", env_prefix="", extra="ignore")
 
 
@@ -41,7 +41,13 @@ async def get_redis_client() -> Redis:
 	global _redis_client
 	if _redis_client is None:
 		settings = get_settings()
-		_redis_client = Redis.from_url(settings.redis_url, encoding="utf-8", decode_responses=True)
+		_redis_client = Redis.from_url(
+			settings.redis_url,
+			encoding="utf-8",
+			decode_responses=True,
+			socket_timeout=settings.redis_socket_timeout_s,
+			socket_connect_timeout=settings.redis_connect_timeout_s,
+		)
 	return _redis_client
 
 
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+	import fcntl
+except ImportError:  # Windows
+	fcntl = None
+	import msvcrt
+
+
+@contextmanager
+def file_lock(path: str | Path) -> Iterator[None]:
+	"""Hold an exclusive cross-process lock on `path` for the duration of the block.
+
+	The lock file is created if missing. Uses `flock` on POSIX and
+	`msvcrt.locking` on Windows; both block until the lock is free and are
+	released by the OS if the holder dies.
+	"""
+	path = Path(path)
+	path.parent.mkdir(parents=True, exist_ok=True)
+	with open(path, "a+b") as f:
+		if fcntl is not None:
+			fcntl.flock(f, fcntl.LOCK_EX)
+		else:
+			f.seek(0)
+			while True:
+				try:
+					# LK_LOCK itself retries for ~10s before raising
+					msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+					break
+				except OSError:
+					continue
+		try:
+			yield
+		finally:
+			if fcntl is not None:
+				fcntl.flock(f, fcntl.LOCK_UN)
+			else:
+				f.seek(0)
+				msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+
+class LatencyHistogram:
+	"""HDR-style log-linear histogram of non-negative integer values (e.g. ms).
+
+	Values below `2**sub_bits` are counted exactly; above that each power-of-two
+	range is split into `2**(sub_bits-1)` linear buckets, bounding the relative
+	error of reported percentiles to `2**-(sub_bits-1)` (about 1.6% by default).
+	Recording and removing are O(1), percentile queries scan a bounded number of
+	buckets, and histograms with the same `sub_bits` merge by adding counts.
+	"""
+
+	__slots__ = ("sub_bits", "_sub_count", "_half", "counts", "total", "max_value")
+
+	def __init__(self, sub_bits: int = 7) -> None:
+		self.sub_bits = sub_bits
+		self._sub_count = 1 << sub_bits
+		self._half = self._sub_count >> 1
+		self.counts: list[int] = [0] * self._sub_count
+		self.total = 0
+		self.max_value = 0
+
+	def _index(self, value: int) -> int:
+		if value < self._sub_count:
+			return value
+		shift = value.bit_length() - self.sub_bits
+		return self._sub_count + (shift - 1) * self._half + ((value >> shift) - self._half)
+
+	def _highest_equivalent(self, index: int) -> int:
+		if index < self._sub_count:
+			return index
+		shift = (index - self._sub_count) // self._half + 1
+		sub = (index - self._sub_count) % self._half + self._half
+		return (sub << shift) + (1 << shift) - 1
+
+	def record(self, value: float, count: int = 1) -> None:
+		"""Add `count` observations of `value`; a negative count removes them."""
+		v = max(0, int(round(value)))
+		idx = self._index(v)
+		if idx >= len(self.counts):
+			self.counts.extend([0] * (idx + 1 - len(self.counts)))
+		self.counts[idx] += count
+		self.total += count
+		if count > 0 and v > self.max_value:
+			self.max_value = v
+
+	def remove(self, value: float) -> None:
+		self.record(value, -1)
+
+	def merge(self, other: "LatencyHistogram") -> None:
+		if other.sub_bits != self.sub_bits:
+			raise ValueError("cannot merge histograms with different precision")
+		if len(other.counts) > len(self.counts):
+			self.counts.extend([0] * (len(other.counts) - len(self.counts)))
+		for i, c in enumerate(other.counts):
+			if c:
+				self.counts[i] += c
+		self.total += other.total
+		self.max_value = max(self.max_value, other.max_value)
+
+	def percentile(self, p: float) -> int | None:
+		"""Value at percentile `p` (0-100), or None when empty."""
+		if self.total <= 0:
+			return None
+		target = max(1, int(-(-self.total * p // 100)))  # ceil(total * p / 100)
+		seen = 0
+		for i, c in enumerate(self.counts):
+			seen += c
+			if seen >= target:
+				# max_value is not lowered on removal, so it stays an upper bound
+				return min(self._highest_equivalent(i), self.max_value)
+		return self.max_value
+
+	def percentiles(self, ps: Iterable[float] = (50, 95, 99)) -> dict[str, int | None]:
+		return {f"p{p:g}": self.percentile(p) for p in ps}
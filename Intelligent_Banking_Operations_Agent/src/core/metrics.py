@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+
+
+# Stage latency buckets in seconds, dense around the 150 ms decision budget.
+STAGE_BUCKETS_S: tuple[float, ...] = (
+	0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+	0.025, 0.05, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5,
+)
+
+
+class _Histogram:
+	__slots__ = ("bounds", "counts", "total", "lock")
+
+	def __init__(self, bounds: tuple[float, ...]) -> None:
+		self.bounds = bounds
+		self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+		self.total = 0.0
+		self.lock = Lock()
+
+	def observe(self, value: float) -> None:
+		i = bisect_left(self.bounds, value)
+		with self.lock:
+			self.counts[i] += 1
+			self.total += value
+
+
+class MetricsRegistry:
+	"""Minimal in-process Prometheus registry: labelled histograms, counters and gauges.
+
+	Kept dependency-free and cheap enough (well under a few microseconds per
+	observation) to stay enabled in production.
+	"""
+
+	def __init__(self) -> None:
+		self._histograms: dict[tuple[str, str, str], _Histogram] = {}
+		self._counters: dict[tuple[str, str, str], float] = {}
+		self._gauges: dict[tuple[str, str, str], float] = {}
+		self._help: dict[str, tuple[str, str]] = {}
+		self._lock = Lock()
+
+	def describe(self, name: str, kind: str, help_text: str) -> None:
+		self._help[name] = (kind, help_text)
+
+	def observe(self, name: str, label: str, value: str, amount: float, bounds: tuple[float, ...] = STAGE_BUCKETS_S) -> None:
+		key = (name, label, value)
+		hist = self._histograms.get(key)
+		if hist is None:
+			with self._lock:
+				hist = self._histograms.setdefault(key, _Histogram(bounds))
+		hist.observe(amount)
+
+	def inc(self, name: str, label: str, value: str, amount: float = 1.0) -> None:
+		key = (name, label, value)
+		with self._lock:
+			self._counters[key] = self._counters.get(key, 0.0) + amount
+
+	def set(self, name: str, label: str, value: str, amount: float) -> None:
+		with self._lock:
+			self._gauges[(name, label, value)] = amount
+
+	def render(self) -> str:
+		"""Render all metrics in the Prometheus text exposition format (0.0.4)."""
+		lines: list[str] = []
+		seen: set[str] = set()
+
+		def header(name: str, default_kind: str) -> None:
+			if name in seen:
+				return
+			seen.add(name)
+			kind, help_text = self._help.get(name, (default_kind, name))
+			lines.append(f"# HELP {name} {help_text}")
+			lines.append(f"# TYPE {name} {kind}")
+
+		with self._lock:
+			histograms = sorted(self._histograms.items())
+			counters = sorted(self._counters.items())
+			gauges = sorted(self._gauges.items())
+		for (name, label, value), hist in histograms:
+			header(name, "histogram")
+			with hist.lock:
+				counts = list(hist.counts)
+				total = hist.total
+			cumulative = 0
+			for bound, c in zip(hist.bounds, counts):
+				cumulative += c
+				lines.append(f'{name}_bucket{{{label}="{value}",le="{bound:g}"}} {cumulative}')
+			cumulative += counts[-1]
+			lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {cumulative}')
+			lines.append(f'{name}_sum{{{label}="{value}"}} {total!r}')
+			lines.append(f'{name}_count{{{label}="{value}"}} {cumulative}')
+		for (name, label, value), amount in counters:
+			header(name, "counter")
+			lines.append(f'{name}{{{label}="{value}"}} {amount:g}')
+		for (name, label, value), amount in gauges:
+			header(name, "gauge")
+			lines.append(f'{name}{{{label}="{value}"}} {amount:g}')
+		return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("banking_stage_duration_seconds", "histogram", "Duration of triage pipeline stages in seconds.")
+registry.describe("banking_triage_requests_total", "counter", "Triage decisions by intent.")
+registry.describe("banking_triage_over_budget_total", "counter", "Triage decisions that exceeded the latency budget, by intent.")
+registry.describe("banking_stream_events_total", "counter", "Events consumed from transaction streams, by consumer group.")
+registry.describe("banking_stream_lag_bytes", "gauge", "Unconsumed bytes behind the committed offset, by consumer group.")
+registry.describe("banking_stream_lag_seconds", "gauge", "Event-time lag of the last committed event, by consumer group.")
+
+
+class _Span:
+	__slots__ = ("stage", "started", "elapsed_s")
+
+	def __init__(self, stage: str) -> None:
+		self.stage = stage
+		self.elapsed_s = 0.0
+
+	def __enter__(self) -> "_Span":
+		self.started = perf_counter()
+		return self
+
+	def __exit__(self, *exc) -> bool:
+		self.elapsed_s = perf_counter() - self.started
+		registry.observe("banking_stage_duration_seconds", "stage", self.stage, self.elapsed_s)
+		return False
+
+
+def span(stage: str) -> _Span:
+	"""Time a block as a pipeline stage: `with span("evaluate_rules"): ...`.
+
+	The elapsed time is recorded in the stage histogram and kept on the span
+	(`elapsed_s`) for callers that also need it.
+	"""
+	return _Span(stage)
+
+
+def record_stage(stage: str, elapsed_s: float) -> None:
+	"""Record an already measured stage duration."""
+	registry.observe("banking_stage_duration_seconds", "stage", stage, elapsed_s)
+
+
+def record_decision(intent: str, elapsed_s: float, budget_ms: float) -> None:
+	"""Count a triage decision and whether it blew the latency budget."""
+	registry.inc("banking_triage_requests_total", "intent", intent)
+	if elapsed_s * 1000.0 > budget_ms:
+		registry.inc("banking_triage_over_budget_total", "intent", intent)
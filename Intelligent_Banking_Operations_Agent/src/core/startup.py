@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from src.core.config import get_settings
+from src.core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+registry.describe("banking_startup_seconds", "gauge", "Time spent warming each component at startup.")
+
+
+@dataclass
+class ComponentStatus:
+	name: str
+	# Optional components (e.g. Redis) are reported but never hold back readiness
+	required: bool = True
+	status: str = "pending"  # pending | ready | failed
+	duration_ms: float | None = None
+	detail: str | None = None
+
+
+@dataclass
+class StartupReport:
+	"""Startup timing breakdown and readiness of this worker."""
+
+	phases_ms: dict[str, float] = field(default_factory=dict)
+	components: dict[str, ComponentStatus] = field(default_factory=dict)
+	prewarm_ms: float | None = None
+	ready: bool = False
+
+	def record_phase(self, name: str, elapsed_s: float) -> None:
+		self.phases_ms[name] = round(elapsed_s * 1000.0, 1)
+
+	def degraded(self) -> list[str]:
+		"""Components that failed to warm; the worker serves without them."""
+		return [c.name for c in self.components.values() if c.status == "failed"]
+
+	def status(self) -> str:
+		if not self.ready:
+			return "starting"
+		return "degraded" if self.degraded() else "ready"
+
+	def to_dict(self) -> dict:
+		return {
+			"ready": self.ready,
+			"status": self.status(),
+			"degraded": self.degraded(),
+			"phases_ms": self.phases_ms,
+			"prewarm_ms": self.prewarm_ms,
+			"components": {name: asdict(c) for name, c in self.components.items()},
+		}
+
+
+report = StartupReport()
+
+
+# -- components --------------------------------------------------------------
+# Each warms one thing the first request would otherwise pay for. Heavy
+# imports happen here, not at module import, so they overlap each other and
+# the server is already answering /health while they run.
+
+def _warm_triage_graph() -> str:
+	from src.agents.langgraph_workflow import get_orchestrator
+
+	get_orchestrator()
+	return "compiled"
+
+
+async def _warm_scoring() -> str:
+	from src.agents.scoring_pool import get_scoring_pool, triage_fraud
+
+	pool = get_scoring_pool()
+	if pool is not None:
+		# Spawn scoring workers up front so the first requests do not pay for it
+		await asyncio.to_thread(pool.warm)
+	# One throwaway decision exercises the rule plan and feature code paths
+	await triage_fraud(amount=1.0, mcc=None, geo=None, device_id=None, now=datetime.utcnow(), features=None)
+	return "process_pool" if pool is not None else "inline"
+
+
+def _warm_anomaly_model() -> str:
+	import numpy as np
+
+	from src.fraud_detection.iforest_model import get_active_model, get_model_info
+
+	model = get_active_model()
+	if model is None:
+		return "no active model"
+	# Touch the mapped arrays so their pages are resident before traffic
+	model.score_matrix(np.zeros((1, model.n_features)))
+	return f"version {get_model_info().version}"
+
+
+def _warm_policy_index() -> str:
+	from src.agents.langgraph_workflow import _COMPLIANCE_QUERIES, get_compliance_agent
+
+	agent = get_compliance_agent()
+	if agent is None:
+		raise RuntimeError("policy index unavailable, grounding is off")
+	# Loads the embedding model and primes the cache with the standard queries
+	agent.cite_many(list(_COMPLIANCE_QUERIES.values()))
+	return f"{agent.retriever.count()} chunks, {agent.retriever.mode}"
+
+
+async def _warm_feature_store() -> str:
+	from redis.exceptions import RedisError
+
+	from src.fraud_detection.feature_store import get_feature_store, mark_unavailable
+
+	if not get_settings().feature_store_enabled:
+		return "disabled"
+	store = await get_feature_store()
+	if store is None:
+		raise RuntimeError("Redis unavailable, retrying after backoff")
+	try:
+		await store.client.ping()
+	except (RedisError, OSError) as exc:
+		# Start the backoff now so first requests don't wait on Redis
+		mark_unavailable(exc)
+		raise
+	return "connected"
+
+
+def default_components() -> dict[str, tuple[Callable[[], Any], bool]]:
+	"""Components to warm, by name, with whether readiness waits for them."""
+	return {
+		"triage_graph": (_warm_triage_graph, True),
+		"scoring": (_warm_scoring, True),
+		"anomaly_model": (_warm_anomaly_model, True),
+		"policy_index": (_warm_policy_index, True),
+		"feature_store": (_warm_feature_store, False),
+	}
+
+
+# -- runner ------------------------------------------------------------------
+
+async def _run_component(status: ComponentStatus, fn: Callable[[], Any | Awaitable[Any]], timeout_s: float) -> None:
+	started = perf_counter()
+	try:
+		if inspect.iscoroutinefunction(fn):
+			result = await asyncio.wait_for(fn(), timeout_s)
+		else:
+			result = await asyncio.wait_for(asyncio.to_thread(fn), timeout_s)
+		status.status = "ready"
+		status.detail = None if result is None else str(result)
+	except Exception as exc:
+		status.status = "failed"
+		status.detail = f"{type(exc).__name__}: {exc}"
+		log = logger.error if status.required else logger.warning
+		log("Warming %s failed: %s", status.name, status.detail)
+	elapsed = perf_counter() - started
+	status.duration_ms = round(elapsed * 1000.0, 1)
+	registry.set("banking_startup_seconds", "component", status.name, elapsed)
+
+
+async def prewarm(components: dict[str, tuple[Callable[[], Any], bool]] | None = None) -> StartupReport:
+	"""Warm all components concurrently and mark the worker ready.
+
+	Blocking initializers run in threads, coroutines on the loop. The worker
+	is ready once every required component has been attempted (optional ones
+	may still be running): a failure is
+	reported in the breakdown rather than keeping the pod out of rotation
+	forever, since each component also initializes lazily on first use.
+	"""
+	components = default_components() if components is None else components
+	timeout_s = get_settings().startup_component_timeout_s
+	started = perf_counter()
+	for name, (_, required) in components.items():
+		report.components[name] = ComponentStatus(name=name, required=required)
+	tasks = {
+		name: asyncio.create_task(_run_component(report.components[name], fn, timeout_s))
+		for name, (fn, _) in components.items()
+	}
+	await asyncio.gather(*(t for name, t in tasks.items() if report.components[name].required))
+	report.prewarm_ms = round((perf_counter() - started) * 1000.0, 1)
+	report.ready = True
+	await asyncio.gather(*tasks.values())
+	breakdown = ", ".join(f"{c.name}={c.status} {c.duration_ms:.0f}ms" for c in report.components.values())
+	degraded = report.degraded()
+	if degraded:
+		logger.warning("Ready (degraded: %s) after %.0f ms prewarm: %s", ", ".join(degraded), report.prewarm_ms, breakdown)
+	else:
+		logger.info("Ready after %.0f ms prewarm: %s", report.prewarm_ms, breakdown)
+	return report
@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
+import numpy as np
+
+from src.fraud_detection.iforest_model import score_features_or_none, score_matrix_or_none
+
 
 @dataclass
 class AnomalyResult:
@@ -16,15 +20,20 @@ def zscore_to_anomaly(z: float) -> AnomalyResult:
 	return AnomalyResult(score=max(0.0, min(1.0, s)), method="zscore")
 
 
+def zscore_to_anomaly_batch(z: np.ndarray) -> np.ndarray:
+	"""Vectorized `zscore_to_anomaly`, returning scores only."""
+	s = 1.0 / (1.0 + np.power(2.718281828, -0.9 * (np.abs(z) - 2.0)))
+	return np.clip(s, 0.0, 1.0)
+
 
 def choose_anomaly_score(features: dict, preferred_method: str = "zscore") -> AnomalyResult:
 	"""Choose anomaly method based on configuration and availability.
 
-	If preferred is 'iforest' and a model is loaded, use it; else fall back to zscore.
+	If preferred is 'iforest' and a model is active in the registry, use it;
+	else fall back to zscore.
 	"""
 	if preferred_method == "iforest":
 		try:
-			from src.fraud_detection.iforest_model import score_features_or_none
 			score = score_features_or_none(features)
 			if score is not None:
 				return AnomalyResult(score=float(score), method="iforest")
@@ -33,3 +42,22 @@ def choose_anomaly_score(features: dict, preferred_method: str = "zscore") -> An
 			pass
 	# Default fallback
 	return zscore_to_anomaly(float(features.get("amount_zscore", 0.0)))
+
+
+def choose_anomaly_scores(features: np.ndarray, feature_names: list[str], preferred_method: str = "zscore") -> tuple[np.ndarray, list[str]]:
+	"""Batch counterpart of `choose_anomaly_score` over a feature matrix.
+
+	Returns (scores, methods) with one entry per row. With 'iforest' the whole
+	matrix goes through the active forest in one pass; without a usable model
+	every row falls back to zscore.
+	"""
+	if preferred_method == "iforest":
+		try:
+			scores = score_matrix_or_none(features, feature_names)
+			if scores is not None:
+				return scores, ["iforest"] * len(scores)
+		except Exception:
+			pass
+	col = feature_names.index("amount_zscore")
+	scores = zscore_to_anomaly_batch(features[:, col])
+	return scores, ["zscore"] * len(scores)
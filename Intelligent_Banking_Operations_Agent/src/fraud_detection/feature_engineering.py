@@ -1,10 +1,33 @@
 from __future__ import annotations
 
+import sys
+from bisect import bisect_left, insort
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from statistics import mean, pstdev
-from typing import Iterable
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+
+
+HIGH_RISK_MCCS = {"4829", "6011", "7995", "5944"}
+
+# Column order of the feature matrix returned by `build_features_batch`;
+# matches the key order of the `build_features` dict.
+FEATURE_NAMES = [
+	"velocity_1h_count",
+	"velocity_1h_total",
+	"velocity_24h_count",
+	"velocity_24h_total",
+	"amount_zscore",
+	"device_novelty",
+	"geo_novelty",
+	"high_risk_mcc",
+	"hour_of_day",
+	"is_night",
+	"first_time_mcc",
+]
 
 
 @dataclass
@@ -68,7 +91,7 @@ def build_features(current_amount: float, now: datetime, mcc: str | None, geo: s
 		"amount_zscore": z,
 		"device_novelty": device_novelty(device_id, history),
 		"geo_novelty": geo_distance_flag(geo, history),
-		"high_risk_mcc": 1.0 if mcc in {"4829", "6011", "7995", "5944"} else 0.0,
+		"high_risk_mcc": 1.0 if mcc in HIGH_RISK_MCCS else 0.0,
 		# Additional simple features
 		"hour_of_day": float(now.hour),
 		"is_night": 1.0 if (now.hour < 6 or now.hour >= 22) else 0.0,
@@ -77,3 +100,438 @@ def build_features(current_amount: float, now: datetime, mcc: str | None, geo: s
 	return feat
 
 
+def _timestamp_us(ts: datetime) -> int:
+	return round(ts.timestamp() * 1_000_000)
+
+
+class _WindowCounter:
+	"""Sliding-window count/total over the transactions inside the window.
+
+	In-order transactions are appended to a deque and expired from its head, so
+	both are O(1) with running sums. The rare late arrival goes into a small
+	sorted side list that expires the same way. Expiry uses the exact event time,
+	matching `compute_time_window_stats`, and events already outside the window of
+	the newest one are dropped on `add`, so memory is bounded by the window.
+	"""
+
+	__slots__ = ("window_us", "events", "late", "newest", "count", "total")
+
+	def __init__(self, window: timedelta) -> None:
+		self.window_us = window // timedelta(microseconds=1)
+		self.events: deque[tuple[int, float]] = deque()
+		self.late: list[tuple[int, float]] = []
+		self.newest: int | None = None
+		self.count = 0.0
+		self.total = 0.0
+
+	def __len__(self) -> int:
+		return len(self.events) + len(self.late)
+
+	def add(self, ts_us: int, amount: float) -> None:
+		if self.newest is None or ts_us >= self.newest:
+			self.events.append((ts_us, amount))
+			self.newest = ts_us
+		elif self.newest - ts_us > self.window_us:
+			return  # already outside the window of a newer transaction
+		else:
+			insort(self.late, (ts_us, amount))
+		self.count += 1.0
+		self.total += amount
+		self.expire(self.newest)
+
+	def expire(self, now_us: int) -> None:
+		cutoff = now_us - self.window_us
+		events = self.events
+		while events and events[0][0] < cutoff:
+			_, amount = events.popleft()
+			self.count -= 1.0
+			self.total -= amount
+		if self.late and self.late[0][0] < cutoff:
+			i = bisect_left(self.late, (cutoff,))
+			self.count -= i
+			self.total -= sum(amount for _, amount in self.late[:i])
+			del self.late[:i]
+		if not events and not self.late:
+			self.count = 0.0
+			self.total = 0.0
+
+
+@dataclass
+class AccountFeatureState:
+	"""Per-account rolling aggregates that update incrementally per observed transaction.
+
+	Holds 1h/24h sliding-window velocity counters, a Welford running mean/variance of
+	amounts for the z-score, and device/geo/MCC seen-sets. Feature reads never
+	touch raw `HistoricalTxn` lists.
+	"""
+
+	n: int = 0
+	mean: float = 0.0
+	m2: float = 0.0
+	devices: set[str] = field(default_factory=set)
+	geos: set[str] = field(default_factory=set)
+	mccs: set[str] = field(default_factory=set)
+	window_1h: _WindowCounter = field(default_factory=lambda: _WindowCounter(timedelta(hours=1)))
+	window_24h: _WindowCounter = field(default_factory=lambda: _WindowCounter(timedelta(hours=24)))
+
+	@classmethod
+	def from_history(cls, history: Iterable[HistoricalTxn]) -> "AccountFeatureState":
+		state = cls()
+		for h in sorted(history, key=lambda t: t.timestamp):
+			state.observe(h.amount, h.timestamp, geo=h.geo, device_id=h.device_id, mcc=h.mcc)
+		return state
+
+	def observe(self, amount: float, timestamp: datetime, *, geo: str | None = None, device_id: str | None = None, mcc: str | None = None) -> None:
+		amount = float(amount)
+		self.n += 1
+		delta = amount - self.mean
+		self.mean += delta / self.n
+		self.m2 += delta * (amount - self.mean)
+		ts_us = _timestamp_us(timestamp)
+		self.window_1h.add(ts_us, amount)
+		self.window_24h.add(ts_us, amount)
+		if device_id:
+			self.devices.add(device_id)
+		if geo:
+			self.geos.add(geo)
+		if mcc is not None:
+			self.mccs.add(mcc)
+
+	def amount_zscore(self, current_amount: float) -> float:
+		if self.n < 5:
+			return 0.0
+		sigma = (self.m2 / self.n) ** 0.5 or 1e-6
+		return (current_amount - self.mean) / sigma
+
+
+def assemble_features(
+	*,
+	now: datetime,
+	mcc: str | None,
+	geo: str | None,
+	device_id: str | None,
+	velocity_1h: tuple[float, float],
+	velocity_24h: tuple[float, float],
+	amount_zscore: float,
+	device_seen: bool,
+	geo_seen: bool,
+	mcc_seen: bool,
+) -> dict:
+	"""Assemble the `build_features` dict from pre-aggregated account state.
+
+	Velocity arguments are (count, total); the *_seen flags say whether the
+	value already occurs in the account's history.
+	"""
+	return {
+		"velocity_1h_count": float(velocity_1h[0]),
+		"velocity_1h_total": float(velocity_1h[1]),
+		"velocity_24h_count": float(velocity_24h[0]),
+		"velocity_24h_total": float(velocity_24h[1]),
+		"amount_zscore": amount_zscore,
+		"device_novelty": 0.0 if (device_id is None or device_seen) else 1.0,
+		"geo_novelty": 0.0 if (geo is None or geo_seen) else 1.0,
+		"high_risk_mcc": 1.0 if mcc in HIGH_RISK_MCCS else 0.0,
+		"hour_of_day": float(now.hour),
+		"is_night": 1.0 if (now.hour < 6 or now.hour >= 22) else 0.0,
+		"first_time_mcc": 0.0 if (mcc is None or mcc_seen) else 1.0,
+	}
+
+
+def build_features_from_state(current_amount: float, now: datetime, mcc: str | None, geo: str | None, device_id: str | None, state: AccountFeatureState) -> dict:
+	"""Same feature set as `build_features`, read from rolling account state."""
+	now_us = _timestamp_us(now)
+	state.window_1h.expire(now_us)
+	state.window_24h.expire(now_us)
+	return assemble_features(
+		now=now,
+		mcc=mcc,
+		geo=geo,
+		device_id=device_id,
+		velocity_1h=(state.window_1h.count, state.window_1h.total),
+		velocity_24h=(state.window_24h.count, state.window_24h.total),
+		amount_zscore=state.amount_zscore(current_amount),
+		device_seen=device_id in state.devices,
+		geo_seen=geo in state.geos,
+		mcc_seen=mcc in state.mccs,
+	)
+
+
+def _to_epoch_us(values) -> np.ndarray:
+	return np.asarray(values, dtype="datetime64[us]").astype(np.int64)
+
+
+def _factorize(*columns: np.ndarray, skip_falsy: bool = False) -> list[np.ndarray]:
+	"""Map each column to int64 codes over a shared vocabulary; None (and, when
+	`skip_falsy`, empty strings) become -1."""
+	masks = []
+	for col in columns:
+		mask = np.not_equal(col, None)
+		if skip_falsy:
+			mask &= np.not_equal(col, "")
+		masks.append(mask)
+	present = [col[mask].astype(str) for col, mask in zip(columns, masks)]
+	_, inverse = np.unique(np.concatenate(present) if present else np.array([], dtype=str), return_inverse=True)
+	out: list[np.ndarray] = []
+	offset = 0
+	for col, mask, vals in zip(columns, masks, present):
+		codes = np.full(len(col), -1, dtype=np.int64)
+		codes[mask] = inverse[offset:offset + len(vals)]
+		offset += len(vals)
+		out.append(codes)
+	return out
+
+
+def _seen_in_account(q_acct: np.ndarray, q_val: np.ndarray, h_acct: np.ndarray, h_val: np.ndarray) -> np.ndarray:
+	"""True where (account, value) of a query also occurs in the account's history."""
+	width = np.int64(max(int(q_val.max(initial=-1)), int(h_val.max(initial=-1))) + 2)
+	h_keys = h_acct * width + (h_val + 1)
+	q_keys = q_acct * width + (q_val + 1)
+	return np.isin(q_keys, h_keys[h_val >= 0])
+
+
+def _window_sums(amounts: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+	"""Sum amounts[lo:hi] per query in history order, reproducing the builtin `sum`.
+
+	The loop runs over positions inside the window and is vectorized across
+	queries, so results are bit-identical to the scalar path (including the
+	compensated summation `sum` uses for floats on Python 3.12+).
+	"""
+	total = np.zeros(len(lo), dtype=np.float64)
+	comp = np.zeros(len(lo), dtype=np.float64)
+	lengths = hi - lo
+	compensated = sys.version_info >= (3, 12)
+	for step in range(int(lengths.max(initial=0))):
+		active = np.nonzero(lengths > step)[0]
+		x = amounts[lo[active] + step]
+		f = total[active]
+		t = f + x
+		if compensated:
+			comp[active] += np.where(np.abs(f) >= np.abs(x), (f - t) + x, (x - t) + f)
+		total[active] = t
+	if compensated:
+		fix = (comp != 0.0) & np.isfinite(comp)
+		total[fix] += comp[fix]
+	return total
+
+
+def build_features_batch(
+	account_ids: Sequence[str],
+	amounts: Sequence[float],
+	timestamps: Sequence,
+	mcc: Sequence[str | None],
+	geo: Sequence[str | None],
+	device_id: Sequence[str | None],
+	*,
+	hist_account_ids: Sequence[str],
+	hist_amounts: Sequence[float],
+	hist_timestamps: Sequence,
+	hist_mcc: Sequence[str | None],
+	hist_geo: Sequence[str | None],
+	hist_device_id: Sequence[str | None],
+) -> np.ndarray:
+	"""Vectorized `build_features` over many transactions at once.
+
+	Inputs are columnar; history rows are grouped by account and ordered by
+	timestamp within each account (rows are stably re-sorted if they are not).
+	Every transaction is scored against its account's full history, exactly as
+	`build_features(amount, ts, mcc, geo, device_id, account_history)` would.
+	Returns a float64 matrix of shape (n, len(FEATURE_NAMES)).
+	"""
+	n = len(amounts)
+	q_amount = np.asarray(amounts, dtype=np.float64)
+	q_ts = _to_epoch_us(timestamps)
+	q_mcc = np.asarray(mcc, dtype=object)
+	q_geo = np.asarray(geo, dtype=object)
+	q_dev = np.asarray(device_id, dtype=object)
+
+	h_ts = _to_epoch_us(hist_timestamps)
+	h_acct_raw = np.asarray(hist_account_ids, dtype=object).astype(str)
+	q_acct_raw = np.asarray(account_ids, dtype=object).astype(str)
+	accounts, acct_inverse = np.unique(np.concatenate([h_acct_raw, q_acct_raw]), return_inverse=True)
+	h_acct = acct_inverse[:len(h_acct_raw)].astype(np.int64)
+	q_acct = acct_inverse[len(h_acct_raw):].astype(np.int64)
+
+	order = np.lexsort((h_ts, h_acct))
+	h_acct = h_acct[order]
+	h_ts = h_ts[order]
+	h_amount = np.asarray(hist_amounts, dtype=np.float64)[order]
+	h_mcc = np.asarray(hist_mcc, dtype=object)[order]
+	h_geo = np.asarray(hist_geo, dtype=object)[order]
+	h_dev = np.asarray(hist_device_id, dtype=object)[order]
+
+	seg_lo = np.searchsorted(h_acct, np.arange(len(accounts)), side="left")
+	seg_hi = np.searchsorted(h_acct, np.arange(len(accounts)), side="right")
+	q_hi = seg_hi[q_acct]
+
+	out = np.zeros((n, len(FEATURE_NAMES)), dtype=np.float64)
+	col = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+	# Velocity windows: history rows with now - ts <= window form a suffix of
+	# the account segment; locate its start with one searchsorted over
+	# (account, time-rank) keys.
+	windows = {"1h": np.int64(3_600_000_000), "24h": np.int64(86_400_000_000)}
+	starts = {label: q_ts - w for label, w in windows.items()}
+	_, ranks = np.unique(np.concatenate([h_ts, *starts.values()]), return_inverse=True)
+	ranks = ranks.astype(np.int64)
+	span = np.int64(ranks.max(initial=0) + 1)
+	h_keys = h_acct * span + ranks[:len(h_ts)]
+	offset = len(h_ts)
+	for label in windows:
+		q_keys = q_acct * span + ranks[offset:offset + n]
+		offset += n
+		lo = np.searchsorted(h_keys, q_keys, side="left")
+		out[:, col[f"velocity_{label}_count"]] = (q_hi - lo).astype(np.float64)
+		out[:, col[f"velocity_{label}_total"]] = _window_sums(h_amount, lo, q_hi)
+
+	# Amount z-score: one exact mean/pstdev per account present in the batch.
+	mu = np.zeros(len(accounts), dtype=np.float64)
+	sigma = np.ones(len(accounts), dtype=np.float64)
+	has_stats = np.zeros(len(accounts), dtype=bool)
+	for a in np.unique(q_acct):
+		group = h_amount[seg_lo[a]:seg_hi[a]].tolist()
+		if len(group) >= 5:
+			mu[a] = mean(group)
+			sigma[a] = pstdev(group) or 1e-6
+			has_stats[a] = True
+	z = (q_amount - mu[q_acct]) / sigma[q_acct]
+	out[:, col["amount_zscore"]] = np.where(has_stats[q_acct], z, 0.0)
+
+	# Novelty flags against per-account seen values.
+	q_dev_codes, h_dev_codes = _factorize(q_dev, h_dev, skip_falsy=True)
+	q_geo_codes, h_geo_codes = _factorize(q_geo, h_geo, skip_falsy=True)
+	q_mcc_codes, h_mcc_codes = _factorize(q_mcc, h_mcc)
+	dev_missing = np.equal(q_dev, None)
+	geo_missing = np.equal(q_geo, None)
+	mcc_missing = np.equal(q_mcc, None)
+	out[:, col["device_novelty"]] = np.where(dev_missing | _seen_in_account(q_acct, q_dev_codes, h_acct, h_dev_codes), 0.0, 1.0)
+	out[:, col["geo_novelty"]] = np.where(geo_missing | _seen_in_account(q_acct, q_geo_codes, h_acct, h_geo_codes), 0.0, 1.0)
+	out[:, col["first_time_mcc"]] = np.where(mcc_missing | _seen_in_account(q_acct, q_mcc_codes, h_acct, h_mcc_codes), 0.0, 1.0)
+
+	q_mcc_risk, risk_codes = _factorize(q_mcc, np.array(sorted(HIGH_RISK_MCCS), dtype=object))
+	out[:, col["high_risk_mcc"]] = np.isin(q_mcc_risk, risk_codes).astype(np.float64)
+	hour = (q_ts // 3_600_000_000) % 24
+	out[:, col["hour_of_day"]] = hour.astype(np.float64)
+	out[:, col["is_night"]] = ((hour < 6) | (hour >= 22)).astype(np.float64)
+	return out
+
+
+def build_features_folded(
+	account_ids: Sequence[str],
+	amounts: Sequence[float],
+	timestamps: Sequence[datetime],
+	mcc: Sequence[str | None],
+	geo: Sequence[str | None],
+	device_id: Sequence[str | None],
+	*,
+	states: Mapping[str, AccountFeatureState],
+) -> np.ndarray:
+	"""Vectorized features for a batch scored on top of rolling account state.
+
+	Row j is what `build_features_from_state` returns for transaction j after
+	the earlier transactions of the same account in the batch have been
+	observed into `states[account]`, so a burst on one account sees itself.
+	For batches that are time-ordered per account the result matches that
+	fold up to float rounding. `states` is read, never modified; accounts
+	missing from it start empty. Returns a float64 matrix of shape
+	(n, len(FEATURE_NAMES)).
+	"""
+	n = len(amounts)
+	out = np.zeros((n, len(FEATURE_NAMES)), dtype=np.float64)
+	if n == 0:
+		return out
+	col = {name: i for i, name in enumerate(FEATURE_NAMES)}
+	q_amount = np.asarray(amounts, dtype=np.float64)
+	q_ts = np.fromiter((_timestamp_us(t) for t in timestamps), dtype=np.int64, count=n)
+	q_mcc = np.asarray(mcc, dtype=object)
+	q_geo = np.asarray(geo, dtype=object)
+	q_dev = np.asarray(device_id, dtype=object)
+	accounts, q_acct = np.unique(np.asarray(account_ids, dtype=object).astype(str), return_inverse=True)
+	q_acct = q_acct.astype(np.int64)
+
+	# Stored state, flattened once per account into columns.
+	empty = AccountFeatureState()
+	stored = [states.get(a, empty) for a in accounts.tolist()]
+	s_n = np.array([s.n for s in stored], dtype=np.float64)
+	s_mean = np.array([s.mean for s in stored], dtype=np.float64)
+	s_m2 = np.array([s.m2 for s in stored], dtype=np.float64)
+	rows = [(a, ts, amt) for a, s in enumerate(stored) for ts, amt in (*s.window_24h.events, *s.window_24h.late)]
+	h_acct = np.array([r[0] for r in rows], dtype=np.int64)
+	h_ts = np.array([r[1] for r in rows], dtype=np.int64)
+	h_amount = np.array([r[2] for r in rows], dtype=np.float64)
+	order = np.lexsort((h_ts, h_acct))
+	h_acct, h_ts, h_amount = h_acct[order], h_ts[order], h_amount[order]
+	h_csum = np.concatenate([[0.0], np.cumsum(h_amount)])
+	q_hi = np.searchsorted(h_acct, q_acct, side="right")
+
+	# Batch items grouped by account in arrival order; c[p] earlier items of the
+	# same account precede sorted position p.
+	by_acct = np.argsort(q_acct, kind="stable")
+	p_acct = q_acct[by_acct]
+	p_start = np.searchsorted(p_acct, p_acct, side="left")
+	c = np.arange(n) - p_start
+	pair_j = np.repeat(np.arange(n), c)
+	pair_i = np.repeat(p_start, c) + (np.arange(len(pair_j)) - np.repeat(np.cumsum(c) - c, c))
+	p_ts = q_ts[by_acct]
+	p_amount = q_amount[by_acct]
+
+	# Velocity windows: stored rows inside the window form a suffix of the
+	# account segment (one searchsorted over (account, time-rank) keys), plus
+	# earlier batch items that fall inside it.
+	windows = {"1h": np.int64(3_600_000_000), "24h": np.int64(86_400_000_000)}
+	starts = {label: q_ts - w for label, w in windows.items()}
+	_, ranks = np.unique(np.concatenate([h_ts, *starts.values()]), return_inverse=True)
+	ranks = ranks.astype(np.int64)
+	span = np.int64(ranks.max(initial=0) + 1)
+	h_keys = h_acct * span + ranks[:len(h_ts)]
+	offset = len(h_ts)
+	for label, w in windows.items():
+		q_keys = q_acct * span + ranks[offset:offset + n]
+		offset += n
+		lo = np.searchsorted(h_keys, q_keys, side="left")
+		inside = p_ts[pair_i] >= p_ts[pair_j] - w
+		count = np.zeros(n, dtype=np.float64)
+		total = np.zeros(n, dtype=np.float64)
+		count[by_acct] = np.bincount(pair_j[inside], minlength=n)
+		total[by_acct] = np.bincount(pair_j[inside], weights=p_amount[pair_i[inside]], minlength=n)
+		out[:, col[f"velocity_{label}_count"]] = (q_hi - lo) + count
+		out[:, col[f"velocity_{label}_total"]] = (h_csum[q_hi] - h_csum[lo]) + total
+
+	# Amount z-score: merge the stored Welford stats with the earlier batch
+	# items through prefix sums of deviations from the stored mean.
+	d = p_amount - s_mean[p_acct]
+	d1 = np.concatenate([[0.0], np.cumsum(d)])
+	d2 = np.concatenate([[0.0], np.cumsum(d * d)])
+	k1 = d1[:-1] - d1[p_start]
+	k2 = d2[:-1] - d2[p_start]
+	total_n = s_n[p_acct] + c
+	safe_n = np.maximum(total_n, 1.0)
+	mu = s_mean[p_acct] + k1 / safe_n
+	m2 = np.maximum(s_m2[p_acct] + k2 - k1 * k1 / safe_n, 0.0)
+	sigma = np.sqrt(m2 / safe_n)
+	sigma = np.where(sigma == 0.0, 1e-6, sigma)
+	z = np.zeros(n, dtype=np.float64)
+	z[by_acct] = np.where(total_n >= 5, (p_amount - mu) / sigma, 0.0)
+	out[:, col["amount_zscore"]] = z
+
+	# Novelty: seen in the stored sets, or used by an earlier item of the batch.
+	for name, values, target, skip_falsy in (
+		("device_novelty", q_dev, "devices", True),
+		("geo_novelty", q_geo, "geos", True),
+		("first_time_mcc", q_mcc, "mccs", False),
+	):
+		seen_pairs = [(a, v) for a, s in enumerate(stored) for v in getattr(s, target)]
+		h_vals = np.array([v for _, v in seen_pairs], dtype=object)
+		q_codes, h_codes = _factorize(values, h_vals, skip_falsy=skip_falsy)
+		seen = _seen_in_account(q_acct, q_codes, np.array([a for a, _ in seen_pairs], dtype=np.int64), h_codes)
+		p_codes = q_codes[by_acct]
+		p_keys = p_acct * np.int64(int(q_codes.max(initial=-1)) + 2) + (p_codes + 1)
+		_, first, inverse = np.unique(p_keys, return_index=True, return_inverse=True)
+		seen[by_acct] |= (p_codes >= 0) & (first[inverse] < np.arange(n))
+		out[:, col[name]] = np.where(np.equal(values, None) | seen, 0.0, 1.0)
+
+	q_mcc_risk, risk_codes = _factorize(q_mcc, np.array(sorted(HIGH_RISK_MCCS), dtype=object))
+	out[:, col["high_risk_mcc"]] = np.isin(q_mcc_risk, risk_codes).astype(np.float64)
+	hour = np.fromiter((t.hour for t in timestamps), dtype=np.int64, count=n)
+	out[:, col["hour_of_day"]] = hour.astype(np.float64)
+	out[:, col["is_night"]] = ((hour < 6) | (hour >= 22)).astype(np.float64)
+	return out
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Iterable, Sequence
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from src.core.config import get_settings
+from src.fraud_detection.feature_engineering import FEATURE_NAMES, AccountFeatureState, assemble_features, build_features_folded
+
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_1H_S = timedelta(hours=1).total_seconds()
+_WINDOW_24H_S = timedelta(hours=24).total_seconds()
+
+
+@dataclass
+class ObservedTxn:
+	event_id: str
+	amount: float
+	timestamp: datetime
+	mcc: str | None = None
+	geo: str | None = None
+	device_id: str | None = None
+
+
+class OnlineFeatureStore:
+	"""Per-account sliding-window feature state kept in Redis.
+
+	Layout per account (keys share a `{account_id}` hash tag so they co-locate
+	on one Redis Cluster slot):
+
+	- `fs:{acct}:txns`    sorted set of "event_id|amount" scored by epoch seconds,
+	                      trimmed to the last 24h on every write (velocity)
+	- `fs:{acct}:stats`   hash of Welford n / mean / m2 amount aggregates (z-score),
+	                      updated under WATCH so concurrent writers do not interleave
+	- `fs:{acct}:devices`, `:geos`, `:mccs`  seen-sets (novelty, first-time MCC)
+
+	`fetch` reads everything triage needs in one pipelined round trip and
+	`observe` writes a scored transaction in another. Keys expire after
+	`ttl_s` without activity so idle accounts do not accumulate.
+	"""
+
+	def __init__(self, client: Redis, *, ttl_s: int | None = None, prefix: str = "fs") -> None:
+		self.client = client
+		self.ttl_s = ttl_s if ttl_s is not None else get_settings().feature_store_ttl_s
+		self.prefix = prefix
+
+	def _key(self, account_id: str, part: str) -> str:
+		return f"{self.prefix}:{{{account_id}}}:{part}"
+
+	async def fetch(self, account_id: str, *, amount: float, now: datetime, mcc: str | None, geo: str | None, device_id: str | None) -> dict:
+		"""Return the `build_features` dict for a transaction from stored account state."""
+		now_s = now.timestamp()
+		pipe = self.client.pipeline(transaction=False)
+		pipe.zrangebyscore(self._key(account_id, "txns"), now_s - _WINDOW_24H_S, "+inf", withscores=True)
+		pipe.hmget(self._key(account_id, "stats"), "n", "mean", "m2")
+		pipe.sismember(self._key(account_id, "devices"), device_id or "")
+		pipe.sismember(self._key(account_id, "geos"), geo or "")
+		pipe.sismember(self._key(account_id, "mccs"), mcc or "")
+		window, stats, device_seen, geo_seen, mcc_seen = await pipe.execute()
+
+		count_1h = total_1h = count_24h = total_24h = 0.0
+		for member, score in window:
+			value = float(str(member).rsplit("|", 1)[1])
+			count_24h += 1.0
+			total_24h += value
+			if now_s - score <= _WINDOW_1H_S:
+				count_1h += 1.0
+				total_1h += value
+
+		n = float(stats[0] or 0.0)
+		zscore = 0.0
+		if n >= 5:
+			sigma = (float(stats[2]) / n) ** 0.5 or 1e-6
+			zscore = (amount - float(stats[1])) / sigma
+
+		return assemble_features(
+			now=now,
+			mcc=mcc,
+			geo=geo,
+			device_id=device_id,
+			velocity_1h=(count_1h, total_1h),
+			velocity_24h=(count_24h, total_24h),
+			amount_zscore=zscore,
+			device_seen=bool(device_seen),
+			geo_seen=bool(geo_seen),
+			mcc_seen=bool(mcc_seen),
+		)
+
+	async def fetch_state(self, account_id: str, *, since: datetime, devices: Iterable[str], geos: Iterable[str], mccs: Iterable[str]) -> AccountFeatureState:
+		"""Load the account's stored state as an in-memory `AccountFeatureState`.
+
+		The velocity windows hold transactions from `since - 24h` on, and the
+		seen-sets hold whichever of the given devices/geos/MCCs the account has
+		already used, which is all `build_features_from_state` reads for them.
+		"""
+		devices, geos, mccs = list(devices), list(geos), list(mccs)
+		pipe = self.client.pipeline(transaction=False)
+		pipe.zrangebyscore(self._key(account_id, "txns"), since.timestamp() - _WINDOW_24H_S, "+inf", withscores=True)
+		pipe.hmget(self._key(account_id, "stats"), "n", "mean", "m2")
+		for part, values in (("devices", devices), ("geos", geos), ("mccs", mccs)):
+			if values:
+				pipe.smismember(self._key(account_id, part), values)
+		window, stats, *seen = await pipe.execute()
+
+		state = AccountFeatureState(n=int(float(stats[0] or 0.0)), mean=float(stats[1] or 0.0), m2=float(stats[2] or 0.0))
+		for member, score in window:
+			value = float(str(member).rsplit("|", 1)[1])
+			ts_us = round(score * 1_000_000)
+			state.window_1h.add(ts_us, value)
+			state.window_24h.add(ts_us, value)
+		flags = iter(seen)
+		for target, values in ((state.devices, devices), (state.geos, geos), (state.mccs, mccs)):
+			if values:
+				target.update(v for v, hit in zip(values, next(flags)) if hit)
+		return state
+
+	async def observe(self, account_id: str, txn: ObservedTxn) -> None:
+		"""Fold a scored transaction into the account's stored state."""
+		ts_s = txn.timestamp.timestamp()
+		amount = float(txn.amount)
+		txns_key = self._key(account_id, "txns")
+		stats_key = self._key(account_id, "stats")
+		keys = [txns_key, stats_key]
+		seen = []
+		for part, value in (("devices", txn.device_id), ("geos", txn.geo), ("mccs", txn.mcc)):
+			# Mirror build_features: empty device/geo values are never "seen"
+			if value is None or (part != "mccs" and not value):
+				continue
+			seen.append((self._key(account_id, part), value))
+			keys.append(self._key(account_id, part))
+
+		async def _write(pipe) -> None:
+			# Welford update: a read-modify-write, retried by `transaction` if
+			# another writer touches the stats between WATCH and EXEC
+			n, mean, m2 = await pipe.hmget(stats_key, "n", "mean", "m2")
+			n = float(n or 0.0) + 1.0
+			mean = float(mean or 0.0)
+			delta = amount - mean
+			mean += delta / n
+			m2 = float(m2 or 0.0) + delta * (amount - mean)
+			pipe.multi()
+			pipe.hset(stats_key, mapping={"n": repr(n), "mean": repr(mean), "m2": repr(m2)})
+			pipe.zadd(txns_key, {f"{txn.event_id}|{amount!r}": ts_s})
+			pipe.zremrangebyscore(txns_key, "-inf", f"({ts_s - _WINDOW_24H_S}")
+			for key, value in seen:
+				pipe.sadd(key, value)
+			for key in keys:
+				pipe.expire(key, self.ttl_s)
+
+		await self.client.transaction(_write, stats_key)
+
+
+_store: OnlineFeatureStore | None = None
+_retry_after: float = 0.0
+_RETRY_BACKOFF_S = 30.0
+
+
+async def get_feature_store() -> OnlineFeatureStore | None:
+	"""Return the process feature store, or None when disabled or Redis is down.
+
+	After a connection failure the store is skipped for a short backoff so
+	triage keeps serving (with history-free features) instead of waiting on
+	Redis for every request.
+	"""
+	global _store
+	if not get_settings().feature_store_enabled or monotonic() < _retry_after:
+		return None
+	if _store is None:
+		from src.core.database import get_redis_client
+
+		_store = OnlineFeatureStore(await get_redis_client())
+	return _store
+
+
+def mark_unavailable(exc: Exception) -> None:
+	"""Record a feature store failure and start the retry backoff."""
+	global _retry_after
+	_retry_after = monotonic() + _RETRY_BACKOFF_S
+	logger.warning("Online feature store unavailable, retrying in %.0fs: %s", _RETRY_BACKOFF_S, exc)
+
+
+async def fetch_account_features(account_id: str, *, amount: float, now: datetime, mcc: str | None, geo: str | None, device_id: str | None) -> dict | None:
+	"""Fetch stored features for a transaction; None when the store is unavailable."""
+	store = await get_feature_store()
+	if store is None:
+		return None
+	try:
+		return await store.fetch(account_id, amount=amount, now=now, mcc=mcc, geo=geo, device_id=device_id)
+	except (RedisError, OSError) as exc:
+		mark_unavailable(exc)
+		return None
+
+
+async def fetch_batch_features(txns: Sequence[tuple[str, ObservedTxn]]) -> list[dict | None]:
+	"""Fetch stored features for a batch of (account_id, txn) pairs, in order.
+
+	Each account's state is read once and the whole batch is featurized in one
+	vectorized pass (`build_features_folded`) that folds transactions in batch
+	order, so a burst on one account sees the earlier transactions of the
+	same batch as it would if they had arrived one request at a time. All items
+	are None when the store is unavailable.
+	"""
+	store = await get_feature_store()
+	if store is None or not txns:
+		return [None] * len(txns)
+	by_account: dict[str, list[ObservedTxn]] = {}
+	for account_id, txn in txns:
+		by_account.setdefault(account_id, []).append(txn)
+	try:
+		states = await asyncio.gather(*(
+			store.fetch_state(
+				account_id,
+				since=min((t.timestamp for t in group), key=datetime.timestamp),
+				devices={t.device_id for t in group if t.device_id},
+				geos={t.geo for t in group if t.geo},
+				mccs={t.mcc for t in group if t.mcc is not None},
+			)
+			for account_id, group in by_account.items()
+		))
+	except (RedisError, OSError) as exc:
+		mark_unavailable(exc)
+		return [None] * len(txns)
+
+	matrix = build_features_folded(
+		[account_id for account_id, _ in txns],
+		[t.amount for _, t in txns],
+		[t.timestamp for _, t in txns],
+		[t.mcc for _, t in txns],
+		[t.geo for _, t in txns],
+		[t.device_id for _, t in txns],
+		states=dict(zip(by_account, states)),
+	)
+	return [dict(zip(FEATURE_NAMES, row)) for row in matrix.tolist()]
+
+
+async def observe_account_txn(account_id: str, txn: ObservedTxn) -> None:
+	"""Write a scored transaction to the store; failures never fail triage."""
+	store = await get_feature_store()
+	if store is None:
+		return
+	try:
+		await store.observe(account_id, txn)
+	except (RedisError, OSError) as exc:
+		mark_unavailable(exc)
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Sequence
+
+import numpy as np
+
+from src.core.config import get_settings
+from src.fraud_detection.model_registry import ModelRegistry
+
+
+# Rows scored per traversal step; bounds the (rows x trees) working arrays.
+_CHUNK_ROWS = 4096
+
+
+def _average_path_length(n: np.ndarray) -> np.ndarray:
+	"""Expected path length of an unsuccessful BST search over `n` points (c(n) in the paper)."""
+	n = np.asarray(n, dtype=np.float64)
+	out = np.zeros_like(n)
+	out[n == 2] = 1.0
+	big = n > 2
+	out[big] = 2.0 * (np.log(n[big] - 1.0) + np.euler_gamma) - 2.0 * (n[big] - 1.0) / n[big]
+	return out
+
+
+@dataclass(frozen=True)
+class IsolationForestArrays:
+	"""An Isolation Forest flattened into parallel node arrays.
+
+	All trees share one set of arrays; `roots` holds each tree's first node and
+	child indices are global. Leaves point at themselves with an infinite
+	threshold, so a batch can take `max_depth` steps without masking finished
+	rows. `leaf_path` is the leaf depth plus c(n_samples at the leaf),
+	precomputed at export so scoring needs only NumPy. Scores are 2**(-E[h(x)] / c(max_samples)) in (0, 1], higher
+	is more anomalous (sklearn's `-score_samples`).
+	"""
+
+	feature_names: tuple[str, ...]
+	roots: np.ndarray
+	left: np.ndarray
+	right: np.ndarray
+	feature: np.ndarray
+	threshold: np.ndarray
+	leaf_path: np.ndarray
+	max_depth: int
+	normalizer: float
+	meta: dict = field(default_factory=dict, compare=False)
+	_columns: dict = field(default_factory=dict, compare=False, repr=False)
+
+	@property
+	def n_features(self) -> int:
+		return len(self.feature_names)
+
+	def score_matrix(self, matrix: np.ndarray) -> np.ndarray:
+		"""Score a (rows x n_features) matrix already in `feature_names` order."""
+		x = np.asarray(matrix, dtype=np.float32)  # sklearn compares float32 inputs to float64 thresholds
+		if x.ndim != 2 or x.shape[1] != self.n_features:
+			raise ValueError(f"expected a (n, {self.n_features}) matrix, got {x.shape}")
+		out = np.empty(x.shape[0], dtype=np.float64)
+		for start in range(0, x.shape[0], _CHUNK_ROWS):
+			out[start:start + _CHUNK_ROWS] = self._score_chunk(x[start:start + _CHUNK_ROWS])
+		return out
+
+	def _score_chunk(self, x: np.ndarray) -> np.ndarray:
+		n, n_features = x.shape
+		flat = x.ravel()
+		row_base = (np.arange(n, dtype=np.int64) * n_features)[:, None]
+		node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+		# Every tree advances one level per step over all rows at once
+		for _ in range(self.max_depth):
+			go_left = flat[row_base + self.feature[node]] <= self.threshold[node]
+			node = np.where(go_left, self.left[node], self.right[node])
+		return np.exp2(-self.leaf_path[node].sum(axis=1) / self.normalizer)
+
+	def score_vector(self, vector: Sequence[float] | np.ndarray) -> float:
+		"""Score one pre-ordered feature vector."""
+		return float(self.score_matrix(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0])
+
+	def column_index(self, feature_names: Sequence[str]) -> np.ndarray | None:
+		"""Columns of a matrix laid out as `feature_names` that feed this model, or None if any are missing."""
+		key = tuple(feature_names)
+		idx = self._columns.get(key)
+		if idx is None:
+			pos = {name: i for i, name in enumerate(key)}
+			if not all(name in pos for name in self.feature_names):
+				return None
+			idx = np.array([pos[name] for name in self.feature_names], dtype=np.int64)
+			self._columns[key] = idx
+		return idx
+
+	def to_arrays(self) -> dict[str, np.ndarray]:
+		return {
+			"roots": self.roots,
+			"left": self.left,
+			"right": self.right,
+			"feature": self.feature,
+			"threshold": self.threshold,
+			"leaf_path": self.leaf_path,
+		}
+
+	@classmethod
+	def from_arrays(cls, arrays: dict[str, np.ndarray], meta: dict) -> "IsolationForestArrays":
+		return cls(
+			feature_names=tuple(meta["feature_names"]),
+			max_depth=int(meta["max_depth"]),
+			normalizer=float(meta["normalizer"]),
+			meta=meta,
+			# Plain ndarray views over the memmaps: same shared pages, cheaper indexing
+			**{name: np.asarray(arr) for name, arr in arrays.items()},
+		)
+
+	@classmethod
+	def from_sklearn(cls, forest, feature_names: Sequence[str]) -> "IsolationForestArrays":
+		"""Flatten a fitted `sklearn.ensemble.IsolationForest`."""
+		roots, lefts, rights, feats, thresholds, paths = [], [], [], [], [], []
+		offset = 0
+		max_depth = 0
+		for est, est_features in zip(forest.estimators_, forest.estimators_features_):
+			tree = est.tree_
+			n = tree.node_count
+			left = tree.children_left.astype(np.int64)
+			right = tree.children_right.astype(np.int64)
+			is_leaf = left < 0
+			depth = np.zeros(n, dtype=np.int64)
+			for i in range(n):  # nodes are numbered parent-before-child
+				if not is_leaf[i]:
+					depth[left[i]] = depth[right[i]] = depth[i] + 1
+			max_depth = max(max_depth, int(depth.max()))
+			own = np.arange(n, dtype=np.int64) + offset
+			roots.append(offset)
+			lefts.append(np.where(is_leaf, own, left + offset))
+			rights.append(np.where(is_leaf, own, right + offset))
+			# Trees see a column subset; map split features back to input columns
+			feats.append(np.where(is_leaf, 0, np.asarray(est_features)[np.maximum(tree.feature, 0)]))
+			thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+			paths.append(np.where(is_leaf, depth + _average_path_length(tree.n_node_samples), 0.0))
+			offset += n
+		normalizer = len(forest.estimators_) * float(_average_path_length(np.array([forest.max_samples_]))[0])
+		return cls(
+			feature_names=tuple(feature_names),
+			roots=np.array(roots, dtype=np.int64),
+			left=np.concatenate(lefts),
+			right=np.concatenate(rights),
+			feature=np.concatenate(feats).astype(np.int64),
+			threshold=np.concatenate(thresholds),
+			leaf_path=np.concatenate(paths),
+			max_depth=max_depth,
+			normalizer=normalizer,
+		)
+
+
+@dataclass
+class ModelInfo:
+	loaded: bool = False
+	n_features: int = 0
+	feature_names: list[str] = field(default_factory=list)
+	version: str | None = None
+	trained_at: str | None = None
+	n_rows: int | None = None
+
+
+_registry: ModelRegistry[IsolationForestArrays] | None = None
+_registry_lock = Lock()
+
+
+def get_registry() -> ModelRegistry[IsolationForestArrays]:
+	global _registry
+	if _registry is None:
+		with _registry_lock:
+			if _registry is None:
+				_registry = ModelRegistry(get_settings().iforest_registry_dir, build=IsolationForestArrays.from_arrays)
+	return _registry
+
+
+def get_active_model() -> IsolationForestArrays | None:
+	active = get_registry().active()
+	return None if active is None else active[1]
+
+
+def fit_forest(matrix: np.ndarray, feature_names: Sequence[str], *, n_estimators: int = 100, n_jobs: int | None = None, random_state: int | None = 42) -> IsolationForestArrays:
+	"""Fit an Isolation Forest on a feature matrix and flatten it for serving."""
+	from sklearn.ensemble import IsolationForest
+
+	forest = IsolationForest(n_estimators=n_estimators, n_jobs=n_jobs, random_state=random_state)
+	forest.fit(np.asarray(matrix, dtype=np.float64))
+	return IsolationForestArrays.from_sklearn(forest, feature_names)
+
+
+def publish_forest(model: IsolationForestArrays, *, n_rows: int, activate: bool = True) -> str:
+	"""Save a flattened forest as a new registry version, optionally activating it."""
+	registry = get_registry()
+	version = registry.save(model.to_arrays(), {
+		"feature_names": list(model.feature_names),
+		"max_depth": model.max_depth,
+		"normalizer": model.normalizer,
+		"n_rows": n_rows,
+		"trained_at": datetime.now(timezone.utc).isoformat(),
+	})
+	if activate:
+		registry.activate(version)
+	return version
+
+
+def train_from_feature_rows(rows: list[dict[str, Any]], *, activate: bool = True) -> ModelInfo:
+	"""Train on feature dicts (columns in the first row's key order) and publish a new version."""
+	if not rows:
+		raise ValueError("no training rows")
+	names = list(rows[0])
+	matrix = np.array([[float(r.get(n, 0.0)) for n in names] for r in rows], dtype=np.float64)
+	version = publish_forest(fit_forest(matrix, names), n_rows=len(rows), activate=activate)
+	return _info(version, get_registry().metadata(version))
+
+
+def _info(version: str | None, meta: dict | None) -> ModelInfo:
+	if version is None or meta is None:
+		return ModelInfo()
+	return ModelInfo(
+		loaded=True,
+		n_features=len(meta["feature_names"]),
+		feature_names=list(meta["feature_names"]),
+		version=version,
+		trained_at=meta.get("trained_at"),
+		n_rows=meta.get("n_rows"),
+	)
+
+
+def get_model_info() -> ModelInfo:
+	active = get_registry().active()
+	if active is None:
+		return ModelInfo()
+	return _info(active[0], active[1].meta)
+
+
+def list_models() -> list[ModelInfo]:
+	registry = get_registry()
+	return [_info(v, registry.metadata(v)) for v in registry.versions()]
+
+
+def activate_model(version: str) -> ModelInfo:
+	"""Make `version` the active model for all workers; raises KeyError if unknown."""
+	model = get_registry().activate(version)
+	return _info(version, model.meta)
+
+
+def score_vector_or_none(vector: Sequence[float] | np.ndarray) -> float | None:
+	"""Score a vector in the active model's `feature_names` order; None without a model."""
+	model = get_active_model()
+	if model is None:
+		return None
+	return model.score_vector(vector)
+
+
+def score_matrix_or_none(matrix: np.ndarray, feature_names: Sequence[str]) -> np.ndarray | None:
+	"""Score every row of a feature matrix in one pass; None without a usable model."""
+	model = get_active_model()
+	if model is None:
+		return None
+	idx = model.column_index(feature_names)
+	if idx is None:
+		return None
+	return model.score_matrix(np.asarray(matrix)[:, idx])
+
+
+def score_features_or_none(features: dict[str, Any]) -> float | None:
+	"""Score one feature dict; missing features count as 0.0."""
+	model = get_active_model()
+	if model is None:
+		return None
+	vector = np.fromiter((float(features.get(n, 0.0)) for n in model.feature_names), dtype=np.float64, count=model.n_features)
+	return model.score_vector(vector)
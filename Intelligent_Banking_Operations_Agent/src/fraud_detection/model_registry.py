@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Callable, Generic, TypeVar
+
+import numpy as np
+
+
+T = TypeVar("T")
+
+_VERSION_RE = re.compile(r"^v(\d{4,})$")
+_ACTIVE = "ACTIVE"
+_META = "meta.json"
+
+
+class ModelRegistry(Generic[T]):
+	"""Versioned on-disk store of array-backed models with an atomically swapped active version.
+
+	Each version is a directory of `.npy` arrays plus `meta.json`:
+
+		<root>/v0001/{meta.json, <name>.npy, ...}
+		<root>/ACTIVE          -> "v0001"
+
+	Versions are written under a temporary name and renamed into place, and the
+	ACTIVE pointer is replaced with `os.replace`, so readers never observe a
+	half-written model. Arrays are loaded with `mmap_mode="r"`, so every worker
+	process serving the same version shares one copy in the page cache.
+
+	`active()` re-checks the pointer at most every `poll_s` seconds; an
+	activation in one process is picked up by the others without a restart.
+	Swapping is a single reference assignment, so scoring never takes a lock.
+	"""
+
+	def __init__(self, root: str | Path, *, build: Callable[[dict[str, np.ndarray], dict], T], poll_s: float = 1.0) -> None:
+		self.root = Path(root)
+		self.build = build
+		self.poll_s = poll_s
+		self._lock = Lock()
+		self._active: tuple[str, T] | None = None
+		self._checked_at = float("-inf")
+
+	# -- versions ---------------------------------------------------------
+
+	def versions(self) -> list[str]:
+		if not self.root.is_dir():
+			return []
+		names = [p.name for p in self.root.iterdir() if p.is_dir() and _VERSION_RE.match(p.name)]
+		return sorted(names, key=lambda n: int(n[1:]))
+
+	def metadata(self, version: str) -> dict:
+		return json.loads((self.root / version / _META).read_text(encoding="utf-8"))
+
+	def save(self, arrays: dict[str, np.ndarray], meta: dict) -> str:
+		"""Persist a new version and return its name; does not activate it."""
+		self.root.mkdir(parents=True, exist_ok=True)
+		tmp = Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.root))
+		try:
+			for name, arr in arrays.items():
+				np.save(tmp / f"{name}.npy", np.ascontiguousarray(arr), allow_pickle=False)
+			while True:
+				existing = self.versions()
+				version = f"v{(int(existing[-1][1:]) + 1) if existing else 1:04d}"
+				(tmp / _META).write_text(json.dumps({**meta, "version": version, "arrays": sorted(arrays)}, indent=2), encoding="utf-8")
+				try:
+					# rename() onto an existing non-empty directory fails, so two
+					# concurrent writers cannot claim the same version
+					os.rename(tmp, self.root / version)
+					return version
+				except OSError:
+					if not (self.root / version).exists():
+						raise
+		except BaseException:
+			shutil.rmtree(tmp, ignore_errors=True)
+			raise
+
+	def load(self, version: str) -> T:
+		meta = self.metadata(version)
+		path = self.root / version
+		arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r", allow_pickle=False) for name in meta["arrays"]}
+		return self.build(arrays, meta)
+
+	# -- activation -------------------------------------------------------
+
+	def active_version(self) -> str | None:
+		try:
+			version = (self.root / _ACTIVE).read_text(encoding="utf-8").strip()
+		except FileNotFoundError:
+			return None
+		return version or None
+
+	def activate(self, version: str) -> T:
+		"""Load `version`, point ACTIVE at it and swap it in for this process."""
+		if version not in self.versions():
+			raise KeyError(version)
+		model = self.load(version)
+		with self._lock:
+			fd, tmp = tempfile.mkstemp(prefix=".active-", dir=self.root)
+			with os.fdopen(fd, "w", encoding="utf-8") as f:
+				f.write(version)
+			os.replace(tmp, self.root / _ACTIVE)
+			self._active = (version, model)
+			self._checked_at = monotonic()
+		return model
+
+	def active(self) -> tuple[str, T] | None:
+		"""(version, model) currently active, or None when nothing is trained."""
+		current = self._active
+		if monotonic() - self._checked_at < self.poll_s:
+			return current
+		with self._lock:
+			self._checked_at = monotonic()
+			version = self.active_version()
+			if version is None:
+				self._active = None
+			elif current is None or current[0] != version:
+				try:
+					self._active = (version, self.load(version))
+				except (OSError, ValueError, KeyError):
+					# Keep serving the previous version if the new one is unreadable
+					pass
+			return self._active
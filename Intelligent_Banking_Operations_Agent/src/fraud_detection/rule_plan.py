@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import operator
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+
+# Operator codes used in the compiled plan arrays.
+OPERATORS: dict[str, Callable[[Any, Any], Any]] = {
+	">=": operator.ge,
+	"<=": operator.le,
+	"==": operator.eq,
+	">": operator.gt,
+	"<": operator.lt,
+}
+_OP_CODES = {op: i for i, op in enumerate(OPERATORS)}
+_OP_FUNCS = tuple(OPERATORS.values())
+
+
+@dataclass(frozen=True)
+class RuleSpec:
+	description: str
+	feature: str
+	operator: str
+	value: float
+	weight: float
+	# Built-in descriptions may embed the feature value via "{value}"; runtime
+	# descriptions are user text and are never formatted.
+	templated: bool = False
+
+
+# Built-in explainable rules, evaluated in this order before runtime rules.
+BUILTIN_RULES: tuple[RuleSpec, ...] = (
+	RuleSpec("amount spike {value:.1f}σ above mean", "amount_zscore", ">=", 3.5, 0.4, templated=True),
+	RuleSpec("high velocity in last 1h", "velocity_1h_count", ">=", 5, 0.2),
+	RuleSpec("new device detected", "device_novelty", ">=", 1.0, 0.2),
+	RuleSpec("new geo detected", "geo_novelty", ">=", 1.0, 0.1),
+	RuleSpec("high-risk MCC", "high_risk_mcc", ">=", 1.0, 0.2),
+	# Simple time-of-day risk
+	RuleSpec("night-time transaction", "is_night", ">=", 1.0, 0.05),
+	# First-time MCC behavior
+	RuleSpec("first-time MCC for account", "first_time_mcc", ">=", 1.0, 0.1),
+)
+
+
+@dataclass(frozen=True)
+class RulePlan:
+	"""Immutable, versioned evaluation plan for built-in plus runtime rules.
+
+	Rules are stored as parallel arrays of (feature, operator code, threshold,
+	weight). A plan is never mutated after compilation; new rule sets are
+	published as a new plan, so readers need no locking.
+	"""
+
+	version: int
+	rules: tuple[RuleSpec, ...]
+	n_builtin: int
+	features: tuple[str, ...]
+	op_codes: np.ndarray
+	thresholds: np.ndarray
+	weights: np.ndarray
+	# (feature, compare, threshold) per rule for the per-transaction path
+	checks: tuple[tuple[str, Callable[[Any, Any], Any], float], ...]
+
+	def _describe(self, j: int, value: float) -> str:
+		rule = self.rules[j]
+		return rule.description.format(value=value) if rule.templated else rule.description
+
+	def evaluate(self, features: dict) -> tuple[float, list[str]]:
+		"""Score one feature dict. Returns (rule_score, rule_hits), clamped to 1.0."""
+		builtin = 0.0
+		extra = 0.0
+		hits: list[str] = []
+		for j, (feature, compare, threshold) in enumerate(self.checks):
+			try:
+				fv = float(features.get(feature, 0.0))
+			except (TypeError, ValueError):
+				# ignore any malformed feature comparisons
+				continue
+			if compare(fv, threshold):
+				if j < self.n_builtin:
+					builtin += self.rules[j].weight
+				else:
+					extra += self.rules[j].weight
+				hits.append(self._describe(j, fv))
+		return min(builtin + extra, 1.0), hits
+
+	def evaluate_matrix(self, matrix: np.ndarray, feature_names: list[str]) -> tuple[np.ndarray, np.ndarray]:
+		"""Score every row of a feature matrix in one pass.
+
+		Features missing from `feature_names` evaluate as 0.0, as in `evaluate`.
+		Returns (rule_scores, hit_mask) where hit_mask has one column per rule;
+		scores are accumulated in rule order and match `evaluate` exactly.
+		"""
+		n = matrix.shape[0]
+		col = {name: i for i, name in enumerate(feature_names)}
+		padded = np.concatenate([matrix, np.zeros((n, 1), dtype=matrix.dtype)], axis=1)
+		idx = np.array([col.get(f, padded.shape[1] - 1) for f in self.features], dtype=np.int64)
+		values = padded[:, idx]
+		hit_mask = np.zeros((n, len(self.rules)), dtype=bool)
+		for code, fn in enumerate(_OP_FUNCS):
+			sel = np.nonzero(self.op_codes == code)[0]
+			if len(sel):
+				hit_mask[:, sel] = fn(values[:, sel], self.thresholds[sel])
+		builtin = np.zeros(n, dtype=np.float64)
+		extra = np.zeros(n, dtype=np.float64)
+		for j in range(len(self.rules)):
+			acc = builtin if j < self.n_builtin else extra
+			acc += np.where(hit_mask[:, j], self.weights[j], 0.0)
+		return np.minimum(builtin + extra, 1.0), hit_mask
+
+	def hits_for_row(self, hit_row: np.ndarray, feature_row: dict) -> list[str]:
+		"""Descriptions for one row of an `evaluate_matrix` hit mask."""
+		return [
+			self._describe(j, float(feature_row.get(self.rules[j].feature, 0.0)))
+			for j in np.nonzero(hit_row)[0]
+		]
+
+
+def compile_plan(runtime_rules: Iterable[RuleSpec], version: int) -> RulePlan:
+	"""Compile built-in and runtime rules into one plan.
+
+	Rules with an unknown operator never fire, so they are dropped here.
+	"""
+	rules = BUILTIN_RULES + tuple(r for r in runtime_rules if r.operator in _OP_CODES)
+	return RulePlan(
+		version=version,
+		rules=rules,
+		n_builtin=len(BUILTIN_RULES),
+		features=tuple(r.feature for r in rules),
+		op_codes=np.array([_OP_CODES[r.operator] for r in rules], dtype=np.int64),
+		thresholds=np.array([r.value for r in rules], dtype=np.float64),
+		weights=np.array([r.weight for r in rules], dtype=np.float64),
+		checks=tuple((r.feature, OPERATORS[r.operator], r.value) for r in rules),
+	)
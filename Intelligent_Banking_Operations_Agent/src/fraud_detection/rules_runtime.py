@@ -4,6 +4,8 @@ from dataclasses import dataclass, asdict
 from threading import RLock
 from typing import Literal
 
+from src.fraud_detection.rule_plan import RulePlan, RuleSpec, compile_plan
+
 
 Operator = Literal[">=", "<=", "==", ">", "<"]
 
@@ -17,63 +19,72 @@ class RuntimeRule:
     weight: float
 
 
+# Writers serialize on the lock, rebuild the plan and publish it with a single
+# reference assignment; readers only ever load `_plan` and never take the lock.
 _lock = RLock()
-_rules: list[RuntimeRule] = []
+_rules: tuple[RuntimeRule, ...] = ()
+_plan: RulePlan = compile_plan((), version=0)
+
+
+def _publish(rules: tuple[RuntimeRule, ...]) -> None:
+    global _rules, _plan
+    specs = [RuleSpec(r.description, r.feature, r.operator, r.value, r.weight) for r in rules]
+    plan = compile_plan(specs, version=_plan.version + 1)
+    _rules = rules
+    _plan = plan
+
+
+def get_rule_plan() -> RulePlan:
+    """Return the currently published plan (built-in + runtime rules)."""
+    return _plan
 
 
 def get_runtime_rules() -> list[dict]:
-    with _lock:
-        return [asdict(r) for r in _rules]
+    return [asdict(r) for r in _rules]
 
 
 def clear_runtime_rules() -> None:
-    global _rules
     with _lock:
-        _rules = []
+        _publish(())
 
 
-def add_runtime_rule(rule: dict) -> dict:
-    rr = RuntimeRule(
+def _to_rule(rule: dict) -> RuntimeRule:
+    return RuntimeRule(
         description=str(rule.get("description") or "runtime rule"),
         feature=str(rule["feature"]),
         operator=str(rule.get("operator", ">=")).strip() or ">=",
         value=float(rule.get("value", 1.0)),
         weight=float(rule.get("weight", 0.05)),
     )
+
+
+def add_runtime_rule(rule: dict) -> dict:
+    rr = _to_rule(rule)
     with _lock:
-        _rules.append(rr)
+        _publish(_rules + (rr,))
     return asdict(rr)
 
 
-def _compare(op: Operator, lhs: float, rhs: float) -> bool:
-    if op == ">=":
-        return lhs >= rhs
-    if op == "<=":
-        return lhs <= rhs
-    if op == "==":
-        return lhs == rhs
-    if op == ">":
-        return lhs > rhs
-    if op == "<":
-        return lhs < rhs
-    return False
+def replace_runtime_rules(rules: list[dict]) -> None:
+    """Swap in a complete runtime rule set with a single recompile (used to sync scoring workers)."""
+    rrs = tuple(_to_rule(r) for r in rules)
+    with _lock:
+        _publish(rrs)
 
 
 def apply_runtime_rules(features: dict) -> tuple[float, list[str]]:
     """Apply accepted runtime rules to features, returning (score_add, hits)."""
+    plan = _plan
     score_add = 0.0
     hits: list[str] = []
-    with _lock:
-        rules_snapshot = list(_rules)
-    for r in rules_snapshot:
+    for j in range(plan.n_builtin, len(plan.rules)):
+        feature, compare, threshold = plan.checks[j]
         try:
-            fv = float(features.get(r.feature, 0.0))
-            if _compare(r.operator, fv, r.value):
-                score_add += float(r.weight)
-                hits.append(r.description)
-        except Exception:
+            fv = float(features.get(feature, 0.0))
+        except (TypeError, ValueError):
             # ignore any malformed feature comparisons
             continue
+        if compare(fv, threshold):
+            score_add += plan.rules[j].weight
+            hits.append(plan.rules[j].description)
     return score_add, hits
-
-
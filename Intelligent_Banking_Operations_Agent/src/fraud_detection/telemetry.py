@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-from collections import deque
 from dataclasses import dataclass, asdict
+from threading import Lock
 from time import time
-from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from src.core.config import get_settings
+from src.core.histogram import LatencyHistogram
+from src.core.metrics import span
 from src.fraud_detection.fraud_config import get_config
 
 
@@ -29,30 +32,123 @@ class Label:
     timestamp_s: float
 
 
-_events: Deque[TriageEvent] = deque(maxlen=5000)
-_labels: Dict[str, Label] = {}
+def _confusion_cell(risk_band: str, label: str) -> str:
+    predicted_positive = risk_band in {"medium", "high"}
+    is_fraud = (label == "fraud")
+    if predicted_positive:
+        return "tp" if is_fraud else "fp"
+    return "fn" if is_fraud else "tn"
+
+
+class _EventRing:
+    """Fixed-capacity ring buffer of events with an event_id -> slot index.
+
+    Labels live alongside their event and are dropped when the event is
+    overwritten, so memory is bounded by the capacity. KPI aggregates (band
+    counts, confusion matrix, latency sum and histogram) are adjusted on every
+    append, eviction and label so reading them never scans the window.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, int(capacity))
+        self.slots: List[Optional[TriageEvent]] = [None] * self.capacity
+        self.labels: Dict[str, Label] = {}
+        self.index: Dict[str, int] = {}
+        self.head = 0  # next slot to write
+        self.size = 0
+        self.lock = Lock()
+        self.band_counts: Dict[str, int] = {"low": 0, "medium": 0, "high": 0}
+        self.confusion: Dict[str, int] = {"tp": 0, "fp": 0, "tn": 0, "fn": 0}
+        self.latency_total = 0
+        self.latency_count = 0
+        self.latency_hist = LatencyHistogram()
+
+    def append(self, ev: TriageEvent) -> None:
+        slot = self.head
+        old = self.slots[slot]
+        if old is not None:
+            self._evict(old, slot)
+        if ev.event_id in self.index:
+            # A re-used event_id takes over the index; its old label no longer applies
+            self._drop_label(ev.event_id)
+        self.slots[slot] = ev
+        self.index[ev.event_id] = slot
+        self.head = (slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._count(ev, 1)
+
+    def _evict(self, ev: TriageEvent, slot: int) -> None:
+        self._count(ev, -1)
+        # A re-used event_id may point at a newer slot; only drop our own entry
+        if self.index.get(ev.event_id) == slot:
+            self._drop_label(ev.event_id)
+            del self.index[ev.event_id]
+
+    def _count(self, ev: TriageEvent, sign: int) -> None:
+        self.band_counts[ev.risk_band] = self.band_counts.get(ev.risk_band, 0) + sign
+        if ev.sla_ms is not None:
+            self.latency_total += sign * ev.sla_ms
+            self.latency_count += sign
+            self.latency_hist.record(ev.sla_ms, sign)
+
+    def set_label(self, event_id: str, lbl: Label) -> None:
+        self._drop_label(event_id)
+        self.labels[event_id] = lbl
+        ev = self.slots[self.index[event_id]]
+        self.confusion[_confusion_cell(ev.risk_band, lbl.label)] += 1
+
+    def _drop_label(self, event_id: str) -> None:
+        lbl = self.labels.pop(event_id, None)
+        if lbl is not None:
+            ev = self.slots[self.index[event_id]]
+            self.confusion[_confusion_cell(ev.risk_band, lbl.label)] -= 1
+
+    def get(self, event_id: str) -> Optional[TriageEvent]:
+        slot = self.index.get(event_id)
+        return None if slot is None else self.slots[slot]
+
+    def ordered(self, limit: Optional[int] = None) -> List[TriageEvent]:
+        n = self.size if limit is None else max(0, min(limit, self.size))
+        start = (self.head - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.slots[start:start + n]  # type: ignore[return-value]
+        return self.slots[start:] + self.slots[:(start + n) % self.capacity]  # type: ignore[operator]
+
+
+_ring = _EventRing(get_settings().telemetry_max_events)
 
 
 def record_event(ev: TriageEvent) -> None:
-    _events.append(ev)
+    with span("telemetry_write"), _ring.lock:
+        _ring.append(ev)
+
+
+def record_events(evs: Iterable[TriageEvent]) -> None:
+    """Bulk append, used by batch scoring paths."""
+    with span("telemetry_write"), _ring.lock:
+        for ev in evs:
+            _ring.append(ev)
 
 
 def record_label(event_id: str, label: str) -> dict:
-    _labels[event_id] = Label(event_id=event_id, label=label, timestamp_s=time())
+    with _ring.lock:
+        if event_id not in _ring.index:
+            return {"status": "unknown_event", "labeled": None, "event_id": event_id}
+        _ring.set_label(event_id, Label(event_id=event_id, label=label, timestamp_s=time()))
     return {"status": "ok", "labeled": event_id, "label": label}
 
 
 def get_event(event_id: str) -> Optional[TriageEvent]:
-    for e in reversed(_events):
-        if e.event_id == event_id:
-            return e
-    return None
+    return _ring.get(event_id)
+
+
+def get_label(event_id: str) -> Optional[Label]:
+    return _ring.labels.get(event_id)
 
 
 def iter_events(limit: Optional[int] = None) -> Iterable[TriageEvent]:
-    if limit is None:
-        return list(_events)
-    return list(_events)[-limit:]
+    with _ring.lock:
+        return _ring.ordered(limit)
 
 
 def compute_kpis() -> dict:
@@ -61,35 +157,19 @@ def compute_kpis() -> dict:
     - precision/recall using risk_band medium/high as predicted positive
     - VDR (value detection rate) via cost matrix
     - band distribution counts
-    - average SLA
+    - average SLA and p50/p95/p99 SLA from the latency histogram
+
+    All inputs are maintained incrementally by the event ring, so this is O(1)
+    in the telemetry window size.
     """
     cfg = get_config()
-    events = list(_events)
-    band_counts = {"low": 0, "medium": 0, "high": 0}
-    for e in events:
-        band_counts[e.risk_band] = band_counts.get(e.risk_band, 0) + 1
-
-    # Classification metrics
-    tp = fp = tn = fn = 0
-    total_latency = 0
-    latency_count = 0
-    for e in events:
-        lbl = _labels.get(e.event_id)
-        predicted_positive = e.risk_band in {"medium", "high"}
-        if e.sla_ms is not None:
-            total_latency += e.sla_ms
-            latency_count += 1
-        if lbl is None:
-            continue
-        is_fraud = (lbl.label == "fraud")
-        if predicted_positive and is_fraud:
-            tp += 1
-        elif predicted_positive and not is_fraud:
-            fp += 1
-        elif (not predicted_positive) and (not is_fraud):
-            tn += 1
-        elif (not predicted_positive) and is_fraud:
-            fn += 1
+    with _ring.lock:
+        band_counts = {k: v for k, v in _ring.band_counts.items() if v or k in {"low", "medium", "high"}}
+        tp, fp, tn, fn = (_ring.confusion[k] for k in ("tp", "fp", "tn", "fn"))
+        alert_volumes = _ring.size
+        total_latency = _ring.latency_total
+        latency_count = _ring.latency_count
+        sla_percentiles = _ring.latency_hist.percentiles((50, 95, 99))
 
     precision = (tp / (tp + fp)) if (tp + fp) > 0 else None
     recall = (tp / (tp + fn)) if (tp + fn) > 0 else None
@@ -108,11 +188,10 @@ def compute_kpis() -> dict:
     return {
         "precision": precision,
         "recall": recall,
-        "alert_volumes": len(events),
+        "alert_volumes": alert_volumes,
         "sla_ms": avg_sla,
+        "sla_percentiles_ms": sla_percentiles,
         "band_distribution": band_counts,
         "vdr": vdr,
         "confusion": {"tp": tp, "fp": fp, "tn": tn, "fn": fn},
     }
-
-
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Iterator, Literal, Sequence
+from uuid import uuid4
+
+import numpy as np
+
+from src.core.config import get_settings
+from src.fraud_detection.feature_engineering import FEATURE_NAMES
+
+
+logger = logging.getLogger(__name__)
+
+JobStatus = Literal["queued", "running", "succeeded", "failed"]
+_PROGRESS_EVERY = 50_000  # rows between progress file updates
+
+
+@dataclass
+class TrainingJob:
+	job_id: str
+	source: str
+	sample_size: int
+	n_jobs: int
+	status: JobStatus = "queued"
+	progress: float = 0.0
+	rows_seen: int = 0
+	rows_sampled: int = 0
+	version: str | None = None
+	error: str | None = None
+	created_at: float = field(default_factory=time)
+	started_at: float | None = None
+	finished_at: float | None = None
+
+
+# -- row sources (run in the worker process) -------------------------------
+
+def _iter_rows(path: Path, feature_names: Sequence[str]) -> Iterator[tuple[np.ndarray, float]]:
+	"""Yield (row, fraction_done) from an export; rows are in `feature_names` order.
+
+	Supported exports: `.npy` matrices (memory-mapped, columns in
+	`feature_names` order), `.jsonl` with one feature dict (or telemetry event
+	with a `features` dict) per line, and `.csv` with a header row.
+	"""
+	suffix = path.suffix.lower()
+	if suffix == ".npy":
+		matrix = np.load(path, mmap_mode="r")
+		n = matrix.shape[0]
+		for i in range(n):
+			yield np.asarray(matrix[i], dtype=np.float64), (i + 1) / n
+		return
+	total = max(1, path.stat().st_size)
+	consumed = 0
+	with path.open("r", encoding="utf-8", newline="") as f:
+		def lines() -> Iterator[str]:
+			nonlocal consumed
+			for line in f:
+				consumed += len(line)
+				yield line
+
+		if suffix == ".csv":
+			records: Iterator[dict] = csv.DictReader(lines())
+		elif suffix in (".jsonl", ".ndjson"):
+			records = (json.loads(line) for line in lines() if line.strip())
+		else:
+			raise ValueError(f"unsupported export format: {path.suffix}")
+		for rec in records:
+			feats = rec.get("features") or rec
+			row = np.fromiter((float(feats.get(n) or 0.0) for n in feature_names), dtype=np.float64, count=len(feature_names))
+			yield row, min(1.0, consumed / total)
+
+
+def reservoir_sample(rows: Iterator[tuple[np.ndarray, float]], k: int, *, seed: int = 0, on_progress=None) -> tuple[np.ndarray, int]:
+	"""Uniform sample of up to `k` rows from a stream in O(k) memory (Algorithm R)."""
+	rng = random.Random(seed)
+	sample: np.ndarray | None = None
+	seen = 0
+	for row, done in rows:
+		if sample is None:
+			sample = np.empty((k, row.shape[0]), dtype=np.float64)
+		if seen < k:
+			sample[seen] = row
+		else:
+			j = rng.randrange(seen + 1)
+			if j < k:
+				sample[j] = row
+		seen += 1
+		if on_progress is not None and seen % _PROGRESS_EVERY == 0:
+			on_progress(seen, done)
+	if sample is None:
+		return np.empty((0, 0)), 0
+	return sample[:min(seen, k)], seen
+
+
+def _write_status(path: Path, **fields) -> None:
+	fd, tmp = tempfile.mkstemp(prefix=".status-", dir=path.parent)
+	with os.fdopen(fd, "w", encoding="utf-8") as f:
+		json.dump(fields, f)
+	os.replace(tmp, path)
+
+
+def _train_job(job_id: str, source_path: str, feature_names: list[str], sample_size: int, n_jobs: int, status_path: str, cleanup: bool) -> str:
+	"""Worker-process entry point: sample, fit, publish and activate a forest."""
+	from src.fraud_detection.iforest_model import fit_forest, publish_forest
+
+	try:
+		# Training competes with serving for CPU; let the scheduler favour serving
+		os.nice(10)
+	except (AttributeError, OSError):
+		pass
+	status = Path(status_path)
+	started = time()
+	_write_status(status, status="running", started_at=started, progress=0.0, rows_seen=0)
+
+	def progress(seen: int, done: float) -> None:
+		# Sampling is most of the wall time for large exports; fitting is the last 10%
+		_write_status(status, status="running", started_at=started, rows_seen=seen, progress=round(0.9 * done, 4))
+
+	try:
+		sample, seen = reservoir_sample(_iter_rows(Path(source_path), feature_names), sample_size, seed=int(job_id[:8], 16), on_progress=progress)
+		if seen < 2:
+			raise ValueError(f"need at least 2 feature rows to train, found {seen}")
+		_write_status(status, status="running", started_at=started, rows_seen=seen, rows_sampled=len(sample), progress=0.9)
+		model = fit_forest(sample, feature_names, n_jobs=n_jobs)
+		version = publish_forest(model, n_rows=len(sample), activate=True)
+		_write_status(status, status="succeeded", started_at=started, finished_at=time(), rows_seen=seen, rows_sampled=len(sample), progress=1.0, version=version)
+		return version
+	except Exception as exc:
+		_write_status(status, status="failed", started_at=started, finished_at=time(), error=f"{type(exc).__name__}: {exc}")
+		raise
+	finally:
+		if cleanup:
+			Path(source_path).unlink(missing_ok=True)
+
+
+# -- job manager (runs in the API process) ---------------------------------
+
+_lock = Lock()
+_executor: ProcessPoolExecutor | None = None
+_jobs: dict[str, TrainingJob] = {}
+_futures: dict[str, Future] = {}
+
+
+def _jobs_dir() -> Path:
+	path = Path(get_settings().iforest_registry_dir) / ".jobs"
+	path.mkdir(parents=True, exist_ok=True)
+	return path
+
+
+def _get_executor() -> ProcessPoolExecutor:
+	global _executor
+	with _lock:
+		if _executor is None:
+			# spawn: never fork a process that is running an event loop and threads
+			_executor = ProcessPoolExecutor(max_workers=get_settings().iforest_train_workers, mp_context=multiprocessing.get_context("spawn"))
+		return _executor
+
+
+def export_telemetry_features(path: Path) -> int:
+	"""Snapshot the features of in-memory telemetry events to a `.npy` matrix."""
+	from src.fraud_detection.telemetry import iter_events
+
+	events = iter_events()
+	matrix = np.array(
+		[[float(e.features.get(n, 0.0) or 0.0) for n in FEATURE_NAMES] for e in events if e.features],
+		dtype=np.float64,
+	).reshape(-1, len(FEATURE_NAMES))
+	np.save(path, matrix, allow_pickle=False)
+	return matrix.shape[0]
+
+
+def submit_training(*, source: str = "telemetry", path: str | None = None, sample_size: int | None = None, n_jobs: int = 1) -> TrainingJob:
+	"""Queue a training job and return immediately.
+
+	`source="telemetry"` trains on a snapshot of the telemetry window;
+	`source="file"` streams rows from the export at `path`. At most
+	`sample_size` rows are kept in memory (reservoir sampled). On success
+	the new version is activated for every worker.
+	"""
+	sample_size = int(sample_size or get_settings().iforest_train_sample_size)
+	if sample_size < 2:
+		raise ValueError("sample_size must be at least 2")
+	job = TrainingJob(job_id=uuid4().hex[:12], source=source, sample_size=sample_size, n_jobs=n_jobs)
+	jobs_dir = _jobs_dir()
+	if source == "telemetry":
+		source_path = jobs_dir / f"{job.job_id}.npy"
+		if export_telemetry_features(source_path) < 2:
+			source_path.unlink(missing_ok=True)
+			raise ValueError("not enough telemetry events with features to train on")
+		cleanup = True
+	elif source == "file":
+		if not path or not Path(path).is_file():
+			raise FileNotFoundError(f"training export not found: {path}")
+		source_path, cleanup = Path(path), False
+	else:
+		raise ValueError(f"unknown training source: {source}")
+
+	status_path = jobs_dir / f"{job.job_id}.json"
+	_write_status(status_path, status="queued")
+	args = (job.job_id, str(source_path), list(FEATURE_NAMES), sample_size, n_jobs, str(status_path), cleanup)
+	try:
+		future = _get_executor().submit(_train_job, *args)
+	except BrokenProcessPool:
+		# A previous worker died (e.g. OOM-killed); start a fresh pool
+		_reset_executor()
+		future = _get_executor().submit(_train_job, *args)
+	with _lock:
+		_jobs[job.job_id] = job
+		_futures[job.job_id] = future
+	future.add_done_callback(lambda f, job_id=job.job_id: _on_done(job_id, f, source_path if cleanup else None))
+	return job
+
+
+def _on_done(job_id: str, future: Future, export: Path | None) -> None:
+	exc = future.exception()
+	if exc is not None:
+		logger.warning("Isolation Forest training job %s failed: %s", job_id, exc)
+		if export is not None:
+			# The worker normally removes the snapshot; it may not have run at all
+			export.unlink(missing_ok=True)
+	else:
+		logger.info("Isolation Forest training job %s published %s", job_id, future.result())
+
+
+def get_job(job_id: str) -> TrainingJob | None:
+	"""Job state merged with the worker's latest progress report."""
+	with _lock:
+		job = _jobs.get(job_id)
+	if job is None:
+		return None
+	try:
+		reported = json.loads((_jobs_dir() / f"{job_id}.json").read_text(encoding="utf-8"))
+	except (OSError, ValueError):
+		reported = {}
+	for key, value in reported.items():
+		if hasattr(job, key) and value is not None:
+			setattr(job, key, value)
+	future = _futures.get(job_id)
+	if future is not None and future.done() and job.status in ("queued", "running"):
+		# The worker died before reporting (e.g. killed by the OOM killer)
+		exc = future.exception()
+		job.status = "failed" if exc is not None else "succeeded"
+		job.error = job.error or (f"{type(exc).__name__}: {exc}" if exc is not None else None)
+	return job
+
+
+def list_jobs() -> list[TrainingJob]:
+	with _lock:
+		ids = sorted(_jobs, key=lambda j: _jobs[j].created_at)
+	return [job for job in (get_job(j) for j in ids) if job is not None]
+
+
+def job_dict(job: TrainingJob) -> dict:
+	return asdict(job)
+
+
+def _reset_executor() -> None:
+	global _executor
+	with _lock:
+		executor, _executor = _executor, None
+	if executor is not None:
+		executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown() -> None:
+	_reset_executor()
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+_STOPWORDS = frozenset(
+	"a an and are as at be been by can for from has have if in into is it its may must not of on or "
+	"should such than that the their them these this those to was were when which will with".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+	"""Lowercase word and section-number tokens, stopwords dropped, plurals folded."""
+	out: list[str] = []
+	for token in _TOKEN_RE.findall(text.lower()):
+		if token in _STOPWORDS:
+			continue
+		# "devices" -> "device", but leave "address" and short words alone
+		if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+			token = token[:-1]
+		out.append(token)
+	return out
+
+
+@dataclass(frozen=True)
+class BM25Index:
+	"""Okapi BM25 over a fixed set of chunks with precomputed term weights.
+
+	Postings are stored CSR-style: the rows of term `t` are
+	`doc_ids[offsets[t]:offsets[t + 1]]` with their full BM25 contribution in
+	`weights`, so a query is a gather plus one `np.bincount`; no embedding
+	model is involved.
+	"""
+
+	ids: tuple[str, ...]
+	texts: tuple[str, ...]
+	metadatas: tuple[dict, ...]
+	vocab: dict[str, int]
+	offsets: np.ndarray  # (n_terms + 1,) int64
+	doc_ids: np.ndarray  # (n_postings,) int32
+	weights: np.ndarray  # (n_postings,) float32
+
+	@classmethod
+	def build(cls, ids: list[str], texts: list[str], metadatas: list[dict], *, k1: float = 1.2, b: float = 0.75) -> "BM25Index":
+		vocab: dict[str, int] = {}
+		terms: list[int] = []
+		docs: list[int] = []
+		tfs: list[int] = []
+		lengths = np.zeros(len(texts), dtype=np.float64)
+		for d, text in enumerate(texts):
+			tokens = tokenize(text)
+			lengths[d] = len(tokens)
+			for token, tf in Counter(tokens).items():
+				terms.append(vocab.setdefault(token, len(vocab)))
+				docs.append(d)
+				tfs.append(tf)
+		term_arr = np.asarray(terms, dtype=np.int64)
+		doc_arr = np.asarray(docs, dtype=np.int32)
+		tf_arr = np.asarray(tfs, dtype=np.float64)
+		order = np.argsort(term_arr, kind="stable")
+		term_arr, doc_arr, tf_arr = term_arr[order], doc_arr[order], tf_arr[order]
+		df = np.bincount(term_arr, minlength=len(vocab)).astype(np.float64)
+		n = len(texts)
+		idf = np.log1p((n - df + 0.5) / (df + 0.5))
+		avgdl = lengths.mean() if n else 0.0
+		norm = k1 * (1.0 - b + b * lengths[doc_arr] / (avgdl or 1.0))
+		weights = idf[term_arr] * tf_arr * (k1 + 1.0) / (tf_arr + norm)
+		offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+		offsets[1:] = np.cumsum(df).astype(np.int64)
+		return cls(tuple(ids), tuple(texts), tuple(metadatas), vocab, offsets, doc_arr, weights.astype(np.float32))
+
+	def __len__(self) -> int:
+		return len(self.ids)
+
+	def search(self, text: str, k: int) -> list[tuple[int, float]]:
+		"""Top-k (row, score) pairs with a positive score, best first."""
+		term_ids = {self.vocab[t] for t in tokenize(text) if t in self.vocab}
+		if not term_ids or k <= 0:
+			return []
+		slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+		docs = np.concatenate([self.doc_ids[s] for s in slices])
+		weights = np.concatenate([self.weights[s] for s in slices])
+		scores = np.bincount(docs, weights=weights, minlength=len(self.ids))
+		hits = np.flatnonzero(scores)
+		if len(hits) > k:
+			hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+		hits = hits[np.argsort(-scores[hits], kind="stable")]
+		return [(int(i), float(scores[i])) for i in hits]
+
+	def result(self, row: int) -> dict:
+		return {"doc_id": self.ids[row], "text": self.texts[row], "metadata": self.metadatas[row]}
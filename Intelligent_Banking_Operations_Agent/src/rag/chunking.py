@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+
+# "Section 3.2 - Transaction Monitoring" at the start of a line opens a chunk
+_SECTION_RE = re.compile(r"^[ \t]*Section[ \t]+(\d+(?:\.\d+)*)[ \t]*[-:–—]?[ \t]*(.*)$", re.MULTILINE | re.IGNORECASE)
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n")
+
+
+@dataclass(frozen=True)
+class PolicyChunk:
+	"""One indexed unit of a policy document.
+
+	`chunk_id` is stable across re-indexing (document id, section number and
+	part), `start`/`end` are character offsets into the source text and
+	`content_hash` decides whether the chunk has to be embedded again.
+	"""
+
+	chunk_id: str
+	doc_id: str
+	title: str
+	section: str
+	heading: str
+	text: str
+	start: int
+	end: int
+	content_hash: str
+
+	def metadata(self) -> dict:
+		return {
+			"doc_id": self.doc_id,
+			"title": self.title,
+			"section": self.section,
+			"heading": self.heading,
+			"start": self.start,
+			"end": self.end,
+			"content_hash": self.content_hash,
+		}
+
+
+def content_hash(text: str) -> str:
+	return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _split_long(start: int, end: int, text: str, max_chars: int) -> list[tuple[int, int]]:
+	"""Split [start, end) at paragraph breaks into spans of at most ~max_chars."""
+	if end - start <= max_chars:
+		return [(start, end)]
+	spans: list[tuple[int, int]] = []
+	span_start = start
+	last_break = None
+	for m in _PARAGRAPH_RE.finditer(text, start, end):
+		if m.start() - span_start > max_chars and last_break is not None:
+			spans.append((span_start, last_break))
+			span_start = last_break
+		last_break = m.end()
+	if end - span_start > max_chars and last_break is not None and last_break > span_start:
+		spans.append((span_start, last_break))
+		span_start = last_break
+	spans.append((span_start, end))
+	return spans
+
+
+def chunk_document(doc: dict, max_chars: int = 2000) -> list[PolicyChunk]:
+	"""Split a `load_policy_texts` document into "Section x.y" chunks.
+
+	Text before the first section heading becomes a "preamble" chunk; a
+	section longer than `max_chars` is split further at paragraph breaks
+	into parts (`#2`, `#3`, ...). Whitespace-only spans are dropped.
+	"""
+	text: str = doc["text"]
+	doc_id: str = doc["doc_id"]
+	title: str = doc.get("title", doc_id)
+	headings = list(_SECTION_RE.finditer(text))
+	bounds: list[tuple[str, str, int, int]] = []
+	if not headings or headings[0].start() > 0:
+		bounds.append(("preamble", "", 0, headings[0].start() if headings else len(text)))
+	for i, m in enumerate(headings):
+		end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+		bounds.append((m.group(1), m.group(2).strip(), m.start(), end))
+
+	chunks: list[PolicyChunk] = []
+	seen: dict[str, int] = {}
+	for section, heading, start, end in bounds:
+		if not text[start:end].strip():
+			continue
+		# A repeated section number in one document still gets a distinct id
+		seen[section] = seen.get(section, 0) + 1
+		base = f"{doc_id}::{section}" if seen[section] == 1 else f"{doc_id}::{section}~{seen[section]}"
+		for part, (s, e) in enumerate(_split_long(start, end, text, max_chars), start=1):
+			body = text[s:e].strip()
+			if not body:
+				continue
+			# Offsets point at the stripped body
+			s += len(text[s:e]) - len(text[s:e].lstrip())
+			chunks.append(
+				PolicyChunk(
+					chunk_id=base if part == 1 else f"{base}#{part}",
+					doc_id=doc_id,
+					title=title,
+					section=section,
+					heading=heading,
+					text=body,
+					start=s,
+					end=s + len(body),
+					content_hash=content_hash(body),
+				)
+			)
+	return chunks
+
+
+def chunk_documents(docs: list[dict], max_chars: int = 2000) -> list[PolicyChunk]:
+	return [chunk for doc in docs for chunk in chunk_document(doc, max_chars)]
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+from itertools import count
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+from src.core.file_lock import file_lock
+from src.core.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+registry.describe("banking_embedding_cache_total", "counter", "Embedding cache lookups per text, by result.")
+
+_DIGEST = 32  # sha256
+_CURRENT = "CURRENT"
+_GENERATION_FILE = re.compile(r"(?:keys|vectors)-(\d+)\.(?:bin|f32)")
+
+
+def text_digest(text: str) -> bytes:
+	return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def _write_at(path: Path, offset: int, data: bytes) -> None:
+	"""Write `data` at `offset` and cut the file there, dropping any torn tail."""
+	with open(path, "r+b" if path.exists() else "w+b") as f:
+		f.seek(offset)
+		f.write(data)
+		try:
+			f.truncate()
+		except OSError:
+			pass  # mapped by another process (Windows); the tail is unreferenced
+
+
+class EmbeddingCache:
+	"""Persistent, content-addressed cache of embeddings for one model.
+
+	Rows are keyed by the SHA-256 of the text and stored as two append-only
+	flat files under `<root>/<model_id>/`:
+
+		keys-<gen>.bin       n x 32-byte digests
+		vectors-<gen>.f32    n x dim float32, memory-mapped for reads
+		CURRENT              "<gen> <dim>"
+
+	Vectors are appended before their keys, so a key that is visible always
+	has its row. Appends are written at the offsets implied by the visible
+	keys, so the tail of a write torn by a crash (vectors without keys, a
+	partial key) is overwritten instead of shifting later rows. Writers from several worker processes serialize on a file
+	lock; readers pick up other processes' appends by watching the key
+	file grow. When the cache exceeds `max_entries` it is compacted into a
+	new generation keeping the most recently used three quarters (recency
+	as seen by the compacting process, then write order).
+	"""
+
+	def __init__(self, root: str | Path, model_id: str, *, max_entries: int = 200_000) -> None:
+		self.dir = Path(root) / re.sub(r"[^A-Za-z0-9_.-]", "_", model_id)
+		self.max_entries = max_entries
+		self._lock = Lock()
+		self._tick = count(1)
+		self._generation = -1
+		self._dim = 0
+		self._index: dict[bytes, int] = {}
+		self._last_used: dict[int, int] = {}
+		self._vectors: np.ndarray | None = None
+		self._keys_size = 0
+
+	# -- files -----------------------------------------------------------------
+
+	def _paths(self, generation: int) -> tuple[Path, Path]:
+		return self.dir / f"keys-{generation}.bin", self.dir / f"vectors-{generation}.f32"
+
+	def _read_current(self) -> tuple[int, int] | None:
+		try:
+			gen, dim = (self.dir / _CURRENT).read_text().split()
+		except FileNotFoundError:
+			return None
+		return int(gen), int(dim)
+
+	def _refresh(self) -> None:
+		"""Follow compactions and appends made by this or other processes."""
+		current = self._read_current()
+		if current is None:
+			return
+		generation, dim = current
+		if generation != self._generation:
+			self._generation, self._dim = generation, dim
+			self._index, self._last_used, self._keys_size = {}, {}, 0
+		keys_path, vectors_path = self._paths(generation)
+		try:
+			size = keys_path.stat().st_size
+		except FileNotFoundError:
+			return
+		size -= size % _DIGEST
+		if size > self._keys_size:
+			with keys_path.open("rb") as f:
+				f.seek(self._keys_size)
+				data = f.read(size - self._keys_size)
+			first = self._keys_size // _DIGEST
+			for i in range(len(data) // _DIGEST):
+				self._index[data[i * _DIGEST:(i + 1) * _DIGEST]] = first + i
+			self._keys_size = size
+			self._vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(size // _DIGEST, dim))
+
+	# -- API -------------------------------------------------------------------
+
+	def __len__(self) -> int:
+		with self._lock:
+			self._refresh()
+			return len(self._index)
+
+	def get_many(self, digests: list[bytes]) -> tuple[np.ndarray | None, list[int]]:
+		"""Cached vectors for `digests` and the positions that were not cached.
+
+		The array has one row per digest (rows of misses are zero), or is None
+		when nothing is cached yet.
+		"""
+		with self._lock:
+			self._refresh()
+			if self._vectors is None:
+				registry.inc("banking_embedding_cache_total", "result", "miss", len(digests))
+				return None, list(range(len(digests)))
+			out = np.zeros((len(digests), self._dim), dtype=np.float32)
+			missing: list[int] = []
+			for i, digest in enumerate(digests):
+				row = self._index.get(digest)
+				if row is None:
+					missing.append(i)
+				else:
+					out[i] = self._vectors[row]
+					self._last_used[row] = next(self._tick)
+		registry.inc("banking_embedding_cache_total", "result", "hit", len(digests) - len(missing))
+		registry.inc("banking_embedding_cache_total", "result", "miss", len(missing))
+		return out, missing
+
+	def put_many(self, digests: list[bytes], vectors: np.ndarray) -> None:
+		vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+		with self._lock, file_lock(self.dir / ".lock"):
+			self._refresh()
+			if self._read_current() is None:
+				self._generation, self._dim = 0, vectors.shape[1]
+				self._write_current()
+			if vectors.shape[1] != self._dim:
+				logger.warning("Not caching %d-dim embeddings in a %d-dim cache at %s", vectors.shape[1], self._dim, self.dir)
+				return
+			rows, keys, seen = [], [], set()
+			for i, digest in enumerate(digests):
+				if digest not in self._index and digest not in seen:
+					seen.add(digest)
+					rows.append(i)
+					keys.append(digest)
+			if not rows:
+				return
+			keys_path, vectors_path = self._paths(self._generation)
+			committed = self._keys_size // _DIGEST
+			_write_at(vectors_path, committed * self._dim * 4, vectors[rows].tobytes())
+			_write_at(keys_path, committed * _DIGEST, b"".join(keys))
+			self._refresh()
+			if len(self._index) > self.max_entries:
+				self._compact()
+
+	def _write_current(self) -> None:
+		tmp = self.dir / f".{_CURRENT}.{os.getpid()}"
+		tmp.write_text(f"{self._generation} {self._dim}")
+		os.replace(tmp, self.dir / _CURRENT)
+
+	def _compact(self) -> None:
+		"""Rewrite the cache keeping the most recently used entries (file lock held)."""
+		keep_n = max(1, self.max_entries * 3 // 4)
+		rows = sorted(self._index.values(), key=lambda r: (self._last_used.get(r, 0), r), reverse=True)[:keep_n]
+		rows.sort()
+		by_row = {row: digest for digest, row in self._index.items()}
+		new_gen = self._generation + 1
+		new_keys, new_vectors = self._paths(new_gen)
+		np.asarray(self._vectors[rows], dtype=np.float32).tofile(new_vectors)
+		new_keys.write_bytes(b"".join(by_row[r] for r in rows))
+		evicted = len(self._index) - len(rows)
+		self._generation = new_gen
+		self._write_current()
+		self._vectors = None
+		self._remove_old_generations(new_gen)
+		self._generation = -1
+		self._refresh()
+		logger.info("Compacted embedding cache %s: %d kept, %d evicted", self.dir, len(rows), evicted)
+
+	def _remove_old_generations(self, current: int) -> None:
+		"""Delete files of earlier generations.
+
+		A file another process still maps cannot be removed on Windows; it is
+		left in place and retried at the next compaction.
+		"""
+		for path in self.dir.iterdir():
+			match = _GENERATION_FILE.fullmatch(path.name)
+			if match and int(match.group(1)) < current:
+				try:
+					path.unlink()
+				except OSError:
+					pass
+
+
+class CachedEmbedder:
+	"""Embedder wrapper that only computes embeddings for texts not in the cache."""
+
+	def __init__(self, embed, cache: EmbeddingCache) -> None:
+		self.embed = embed
+		self.cache = cache
+		self.model_id = getattr(embed, "model_id", "")
+
+	def __call__(self, texts: list[str]) -> np.ndarray:
+		if not texts:
+			return self.embed(texts)
+		digests = [text_digest(t) for t in texts]
+		out, missing = self.cache.get_many(digests)
+		if not missing:
+			return out
+		computed = np.asarray(self.embed([texts[i] for i in missing]), dtype=np.float32)
+		self.cache.put_many([digests[i] for i in missing], computed)
+		if out is None or out.shape[1] != computed.shape[1]:
+			out = np.zeros((len(texts), computed.shape[1]), dtype=np.float32)
+		out[missing] = computed
+		return out
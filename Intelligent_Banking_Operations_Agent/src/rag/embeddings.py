@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import re
+import zlib
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from src.core.config import get_settings
+
+
+Embedder = Callable[[list[str]], np.ndarray]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+
+class HashingEmbedder:
+	"""Dependency-free embedding: hashed unigrams and bigrams, L2-normalized.
+
+	Captures lexical overlap only, but needs no model download, which makes it
+	the choice for offline environments and tests.
+	"""
+
+	def __init__(self, dim: int = 384) -> None:
+		self.dim = dim
+		self.model_id = f"hashing-{dim}"
+
+	def __call__(self, texts: list[str]) -> np.ndarray:
+		out = np.zeros((len(texts), self.dim), dtype=np.float32)
+		for row, text in enumerate(texts):
+			tokens = _TOKEN_RE.findall(text.lower())
+			for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+				h = zlib.crc32(gram.encode("utf-8"))
+				out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+		norms = np.linalg.norm(out, axis=1, keepdims=True)
+		return out / np.where(norms == 0.0, 1.0, norms)
+
+
+class MiniLMEmbedder:
+	"""all-MiniLM-L6-v2 via ONNX Runtime: the model Chroma uses by default."""
+
+	model_id = "all-MiniLM-L6-v2"
+
+	def __init__(self) -> None:
+		# Loaded on first use; the import pulls in Chroma and the model weights
+		self._fn = None
+
+	def __call__(self, texts: list[str]) -> np.ndarray:
+		if self._fn is None:
+			from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+
+			self._fn = ONNXMiniLM_L6_V2()
+		return np.asarray(self._fn(texts), dtype=np.float32)
+
+
+def get_embedder(model: str | None = None) -> Embedder:
+	"""Embedding function named by `embedding_model` (or `model`).
+
+	Unless disabled, it is wrapped in the persistent embedding cache under
+	`vector_db_path`, so text embedded once (by any worker, in any deploy)
+	is never embedded again.
+	"""
+	settings = get_settings()
+	model = model or settings.embedding_model
+	embed: Embedder = HashingEmbedder() if model == "hashing" else MiniLMEmbedder()
+	if not settings.embedding_cache_enabled:
+		return embed
+	from src.rag.embedding_cache import CachedEmbedder, EmbeddingCache
+
+	cache = EmbeddingCache(
+		Path(settings.vector_db_path) / "embedding_cache",
+		embed.model_id,
+		max_entries=settings.embedding_cache_max_entries,
+	)
+	return CachedEmbedder(embed, cache)
+
+
+def chroma_embedding_function(embed: Embedder):
+	"""Adapt an embedder to Chroma's `EmbeddingFunction` interface."""
+	from chromadb import EmbeddingFunction
+
+	class _Adapter(EmbeddingFunction):
+		def __call__(self, input):
+			return embed(list(input)).tolist()
+
+	return _Adapter()
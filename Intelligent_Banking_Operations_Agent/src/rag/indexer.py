@@ -0,0 +1,48 @@
+"""Incremental policy indexing: section chunks, embedded only when their content changes.
+
+	python -m src.rag.indexer [--policies-dir data/policies]
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+from time import perf_counter
+
+from src.core.config import get_settings
+from src.rag.chunking import chunk_documents
+from src.rag.loaders import load_policy_texts
+from src.rag.retriever import IndexReport, PolicyRetriever
+
+
+logger = logging.getLogger(__name__)
+
+
+def index_policies(retriever: PolicyRetriever, policies_dir: str, max_chars: int | None = None) -> IndexReport:
+	"""Sync the retriever's index with the policy documents under `policies_dir`.
+
+	A missing or empty directory leaves the index untouched: syncing to no
+	documents would delete every indexed chunk.
+	"""
+	started = perf_counter()
+	docs = load_policy_texts(policies_dir)
+	if not docs:
+		logger.warning("No policy documents found under %s; keeping the existing index", policies_dir)
+		return IndexReport()
+	chunks = chunk_documents(docs, max_chars or get_settings().policy_chunk_max_chars)
+	report = retriever.sync(chunks)
+	logger.info(
+		"Indexed %d policy documents as %d chunks in %.2fs: %d embedded, %d moved, %d deleted, %d unchanged",
+		len(docs), len(chunks), perf_counter() - started,
+		len(report.embedded), len(report.moved), len(report.deleted), report.unchanged,
+	)
+	return report
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Incrementally index policy documents into the vector store.")
+	parser.add_argument("--policies-dir", default=None)
+	parser.add_argument("--vector-db-path", default=None)
+	args = parser.parse_args()
+	logging.basicConfig(level=logging.INFO)
+	settings = get_settings()
+	index_policies(PolicyRetriever(args.vector_db_path or settings.vector_db_path), args.policies_dir or settings.policies_dir)
@@ -13,7 +13,7 @@ def load_policy_texts(policies_dir: str) -> list[dict]:
 	if not root.exists():
 		return []
 	docs: list[dict] = []
-	for path in root.glob("*.txt"):
+	for path in sorted(root.glob("*.txt")):
 		text = path.read_text(encoding="utf-8", errors="ignore")
 		docs.append({"doc_id": path.stem, "title": path.stem, "text": text})
 	return docs
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Hashable
+
+from src.core.metrics import registry
+
+
+registry.describe("banking_rag_cache_total", "counter", "Policy retrieval cache lookups, by result.")
+
+
+def normalize_query(text: str) -> str:
+	"""Case- and whitespace-insensitive form of a query, used as the cache key."""
+	return " ".join(text.lower().split())
+
+
+class QueryCache:
+	"""Bounded LRU cache with a per-entry TTL for retrieval results.
+
+	Safe to share between threads (lookups run in `asyncio.to_thread`). Expired
+	entries are dropped when read; the least recently used entry is evicted
+	once `max_entries` is reached.
+	"""
+
+	def __init__(self, max_entries: int = 1024, ttl_s: float = 600.0, *, metric: str = "banking_rag_cache_total") -> None:
+		self.max_entries = max_entries
+		self.ttl_s = ttl_s
+		self.metric = metric
+		self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+		self._lock = Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key: Hashable) -> Any | None:
+		with self._lock:
+			entry = self._entries.get(key)
+			if entry is not None and entry[0] > monotonic():
+				self._entries.move_to_end(key)
+				self.hits += 1
+				registry.inc(self.metric, "result", "hit")
+				return entry[1]
+			if entry is not None:
+				del self._entries[key]
+			self.misses += 1
+		registry.inc(self.metric, "result", "miss")
+		return None
+
+	def put(self, key: Hashable, value: Any) -> None:
+		if self.max_entries <= 0:
+			return
+		with self._lock:
+			self._entries[key] = (monotonic() + self.ttl_s, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_entries:
+				self._entries.popitem(last=False)
+				self.evictions += 1
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+	def stats(self) -> dict:
+		with self._lock:
+			size = len(self._entries)
+		lookups = self.hits + self.misses
+		return {
+			"size": size,
+			"max_entries": self.max_entries,
+			"ttl_s": self.ttl_s,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"hit_ratio": self.hits / lookups if lookups else None,
+		}
@@ -1,17 +1,147 @@
 from __future__ import annotations
 
+import json
+import os
+import tempfile
+from dataclasses import dataclass, field
 from pathlib import Path
+from threading import Lock
 from typing import Iterable
 
-from chromadb import PersistentClient
+from src.core.config import get_settings
+from src.rag.bm25 import BM25Index
+from src.rag.chunking import PolicyChunk
+from src.rag.query_cache import QueryCache, normalize_query
+
+
+# Chroma rejects very large add/upsert calls; write in slices of this size
+_WRITE_BATCH = 256
+# Hybrid retrieval: candidates taken from each ranking (x k) and the
+# reciprocal rank fusion constant
+_HYBRID_DEPTH = 4
+_RRF_K = 60
+# Chunks the BM25 index is built from, kept next to the vector store
+_LEXICAL_CORPUS = "lexical.json"
+
+
+@dataclass
+class IndexReport:
+	embedded: list[str] = field(default_factory=list)  # new or changed chunks (re-embedded)
+	moved: list[str] = field(default_factory=list)  # same content, offsets/metadata updated
+	deleted: list[str] = field(default_factory=list)
+	unchanged: int = 0
+
+	@property
+	def changed(self) -> bool:
+		return bool(self.embedded or self.moved or self.deleted)
 
 
 class PolicyRetriever:
-	"""Very small wrapper around Chroma for policy retrieval."""
+	"""Very small wrapper around a vector store for policy retrieval.
+
+	The store is Chroma or the in-process memory-mapped `NumpyVectorStore`
+	(`vector_backend`); both live under `persist_directory` and are opened on
+	first use. `retrieval_mode` picks dense search, BM25 over the same chunks
+	("lexical": no vector store or embedding model is touched), or "hybrid",
+	which fuses both rankings. The chunks BM25 is built from are persisted
+	as `lexical.json` under `persist_directory` by every sync, so lexical
+	search never reads them back from the vector store. Query results are cached per (normalized query,
+	k, mode, index version); every write to the index bumps the version and
+	drops the cache.
+	"""
+
+	def __init__(self, persist_directory: str, cache: QueryCache | None = None, backend: str | None = None, mode: str | None = None):
+		settings = get_settings()
+		self.persist_directory = persist_directory
+		self.backend = backend or settings.vector_backend
+		self.mode = mode or settings.retrieval_mode
+		self.client = None
+		self._collection = None
+		self._collection_lock = Lock()
+		self.lexical: BM25Index | None = None
+		if cache is None:
+			cache = QueryCache(settings.rag_cache_max_entries, settings.rag_cache_ttl_s)
+		self.cache = cache
+		self.index_version = 0
+
+	@property
+	def collection(self):
+		if self._collection is None:
+			with self._collection_lock:
+				if self._collection is None:
+					self._collection = self._open_collection()
+		return self._collection
+
+	def _open_collection(self):
+		settings = get_settings()
+		if self.backend == "numpy":
+			from src.rag.embeddings import get_embedder
+			from src.rag.vector_store import NumpyVectorStore
+
+			return NumpyVectorStore(
+				Path(self.persist_directory) / "numpy",
+				get_embedder(),
+				model=settings.embedding_model,
+				ann_min_rows=settings.vector_ann_min_rows,
+				nprobe=settings.vector_ann_nprobe,
+				on_change=self._invalidate,
+			)
+		from chromadb import PersistentClient
+
+		from src.rag.embeddings import chroma_embedding_function, get_embedder
+
+		self.client = PersistentClient(path=self.persist_directory)
+		# Chroma's default model, routed through the persistent embedding cache
+		return self.client.get_or_create_collection(
+			name="policies",
+			embedding_function=chroma_embedding_function(get_embedder("minilm")),
+		)
+
+	def _invalidate(self) -> None:
+		self.index_version += 1
+		self.cache.clear()
+		# Reloaded from the persisted corpus on next use, which another
+		# process's sync may have replaced
+		self.lexical = None
+
+	def _load_lexical(self) -> BM25Index | None:
+		try:
+			corpus = json.loads((Path(self.persist_directory) / _LEXICAL_CORPUS).read_text(encoding="utf-8"))
+		except FileNotFoundError:
+			return None
+		return BM25Index.build(corpus["ids"], corpus["texts"], corpus["metadatas"])
+
+	def _save_lexical(self, index: BM25Index) -> None:
+		root = Path(self.persist_directory)
+		root.mkdir(parents=True, exist_ok=True)
+		fd, tmp = tempfile.mkstemp(prefix=".lexical-", suffix=".json", dir=root)
+		with os.fdopen(fd, "w", encoding="utf-8") as f:
+			json.dump({"ids": list(index.ids), "texts": list(index.texts), "metadatas": list(index.metadatas)}, f)
+		os.replace(tmp, root / _LEXICAL_CORPUS)
 
-	def __init__(self, persist_directory: str):
-		self.client = PersistentClient(path=persist_directory)
-		self.collection = self.client.get_or_create_collection(name="policies")
+	def _lexical_index(self) -> BM25Index:
+		index = self.lexical
+		if index is None:
+			index = self._load_lexical()
+			if index is None and self.mode == "lexical":
+				# Nothing synced yet; lexical mode never falls back to the vector store
+				index = BM25Index.build([], [], [])
+			elif index is None:
+				stored = self.collection.get(include=["documents", "metadatas"])
+				index = BM25Index.build(stored["ids"], stored["documents"], stored["metadatas"])
+			self.lexical = index
+		return index
+
+	def _publish_lexical(self, index: BM25Index) -> None:
+		self._save_lexical(index)
+		self._invalidate()
+		self.lexical = index
+
+	def count(self) -> int:
+		"""Number of indexed chunks."""
+		if self.mode == "lexical":
+			return len(self._lexical_index())
+		return self.collection.count()
 
 	def add_documents(self, docs: list[dict]) -> None:
 		if not docs:
@@ -19,21 +149,148 @@ class PolicyRetriever:
 		ids = [d["doc_id"] for d in docs]
 		txts = [d["text"] for d in docs]
 		metas = [{"title": d.get("title", d["doc_id"]) } for d in docs]
+		if self.mode == "lexical":
+			current = self._lexical_index()
+			added = set(ids)
+			rows = [i for i, x in enumerate(current.ids) if x not in added]
+			self._publish_lexical(BM25Index.build(
+				[current.ids[i] for i in rows] + ids,
+				[current.texts[i] for i in rows] + txts,
+				[current.metadatas[i] for i in rows] + metas,
+			))
+			return
 		self.collection.add(ids=ids, documents=txts, metadatas=metas)
+		stored = self.collection.get(include=["documents", "metadatas"])
+		self._publish_lexical(BM25Index.build(stored["ids"], stored["documents"], stored["metadatas"]))
 
-	def query(self, text: str, k: int = 3) -> list[dict]:
-		res = self.collection.query(query_texts=[text], n_results=k)
-		if not res or not res.get("ids"):
-			return []
-		out: list[dict] = []
-		for i in range(len(res["ids"][0])):
-			out.append(
-				{
-					"doc_id": res["ids"][0][i],
-					"text": res["documents"][0][i],
-					"metadata": res["metadatas"][0][i],
-				}
+	def reindex(self, docs: list[dict]) -> None:
+		"""Replace the whole index with `docs`."""
+		if self.mode == "lexical":
+			self._publish_lexical(BM25Index.build([], [], []))
+		else:
+			existing = self.collection.get(include=[])["ids"]
+			if existing:
+				self.collection.delete(ids=existing)
+		self.add_documents(docs)
+		self._invalidate()
+
+	def sync(self, chunks: list[PolicyChunk]) -> IndexReport:
+		"""Make the index hold exactly `chunks`, embedding only what changed.
+
+		Chunks are matched by id: a new id or a different content hash is
+		upserted (and embedded), a metadata-only difference such as shifted
+		offsets is updated in place, and ids no longer present are deleted.
+		"""
+		lexical = BM25Index.build([c.chunk_id for c in chunks], [c.text for c in chunks], [c.metadata() for c in chunks])
+		previous = self._load_lexical()
+		if previous is None or (previous.ids, previous.metadatas) != (lexical.ids, lexical.metadatas):
+			# Written before the vector store, so a process reloading on its
+			# change notification already finds the new corpus
+			self._save_lexical(lexical)
+			self._invalidate()
+		self.lexical = lexical
+		if self.mode == "lexical":
+			# The vector store is left as is; it is synced when dense search is enabled again
+			return IndexReport(unchanged=len(chunks))
+		stored = self.collection.get(include=["metadatas"])
+		current = dict(zip(stored["ids"], stored["metadatas"] or []))
+		report = IndexReport()
+		to_embed: list[PolicyChunk] = []
+		to_move: list[PolicyChunk] = []
+		for chunk in chunks:
+			meta = current.get(chunk.chunk_id)
+			if meta is None or meta.get("content_hash") != chunk.content_hash:
+				to_embed.append(chunk)
+			elif meta != chunk.metadata():
+				to_move.append(chunk)
+			else:
+				report.unchanged += 1
+		wanted = {c.chunk_id for c in chunks}
+		report.deleted = [i for i in current if i not in wanted]
+		report.embedded = [c.chunk_id for c in to_embed]
+		report.moved = [c.chunk_id for c in to_move]
+
+		for i in range(0, len(to_embed), _WRITE_BATCH):
+			batch = to_embed[i:i + _WRITE_BATCH]
+			self.collection.upsert(
+				ids=[c.chunk_id for c in batch],
+				documents=[c.text for c in batch],
+				metadatas=[c.metadata() for c in batch],
 			)
-		return out
+		for i in range(0, len(to_move), _WRITE_BATCH):
+			batch = to_move[i:i + _WRITE_BATCH]
+			self.collection.update(ids=[c.chunk_id for c in batch], metadatas=[c.metadata() for c in batch])
+		for i in range(0, len(report.deleted), _WRITE_BATCH):
+			self.collection.delete(ids=report.deleted[i:i + _WRITE_BATCH])
+		if report.changed:
+			self._invalidate()
+			self.lexical = lexical
+		return report
+
+	def query(self, text: str, k: int = 3) -> list[dict]:
+		return self.query_many([text], k)[0]
+
+	def query_many(self, texts: list[str], k: int = 3) -> list[list[dict]]:
+		"""Results for each of `texts`, in order.
 
+		Cache misses are deduplicated and searched in one backend call: one
+		embedding pass and one similarity search for the whole batch.
+		"""
+		version = self.index_version
+		results: list[list[dict] | None] = [None] * len(texts)
+		misses: dict[tuple, list[int]] = {}
+		for i, text in enumerate(texts):
+			key = (normalize_query(text), k, self.mode, version)
+			cached = self.cache.get(key)
+			if cached is not None:
+				results[i] = list(cached)
+			else:
+				misses.setdefault(key, []).append(i)
+		if misses:
+			fetched = self._search([texts[rows[0]] for rows in misses.values()], k)
+			for (key, rows), out in zip(misses.items(), fetched):
+				# Only store if no re-index happened while the search ran
+				if version == self.index_version:
+					self.cache.put(key, tuple(out))
+				for i in rows:
+					results[i] = list(out)
+		return results
 
+	def _search(self, texts: list[str], k: int) -> list[list[dict]]:
+		if self.mode == "lexical":
+			index = self._lexical_index()
+			return [[index.result(row) for row, _ in index.search(text, k)] for text in texts]
+		if self.mode == "hybrid":
+			return self._search_hybrid(texts, k)
+		return self._query_index(texts, k)
+
+	def _search_hybrid(self, texts: list[str], k: int) -> list[list[dict]]:
+		"""Reciprocal rank fusion of dense and BM25 rankings, each `_HYBRID_DEPTH` x k deep."""
+		depth = max(k * _HYBRID_DEPTH, k)
+		index = self._lexical_index()
+		out: list[list[dict]] = []
+		for text, dense in zip(texts, self._query_index(texts, depth)):
+			fused: dict[str, float] = {}
+			by_id: dict[str, dict] = {}
+			for rank, r in enumerate(dense):
+				fused[r["doc_id"]] = fused.get(r["doc_id"], 0.0) + 1.0 / (_RRF_K + rank + 1)
+				by_id[r["doc_id"]] = r
+			for rank, (row, _) in enumerate(index.search(text, depth)):
+				r = index.result(row)
+				fused[r["doc_id"]] = fused.get(r["doc_id"], 0.0) + 1.0 / (_RRF_K + rank + 1)
+				by_id.setdefault(r["doc_id"], r)
+			best = sorted(fused, key=lambda doc_id: -fused[doc_id])[:k]
+			out.append([by_id[doc_id] for doc_id in best])
+		return out
+
+	def _query_index(self, texts: list[str], k: int) -> list[list[dict]]:
+		res = self.collection.query(query_texts=texts, n_results=k)
+		if not res or not res.get("ids"):
+			return [[] for _ in texts]
+		return [
+			[
+				{"doc_id": doc_id, "text": text, "metadata": meta}
+				for doc_id, text, meta in zip(ids, docs, metas)
+			]
+			for ids, docs, metas in zip(res["ids"], res["documents"], res["metadatas"])
+		]
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from time import monotonic
+from typing import Callable, Iterator
+
+import numpy as np
+
+from src.core.file_lock import file_lock
+from src.rag.embeddings import Embedder
+
+
+logger = logging.getLogger(__name__)
+
+_CURRENT = "CURRENT"
+_GENERATION_FILE = re.compile(r"(?:index|vectors|ivf)-(\d+)\.(?:json|npy|npz)")
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+	generation: int
+	ids: tuple[str, ...]
+	documents: tuple[str, ...]
+	metadatas: tuple[dict, ...]
+	vectors: np.ndarray  # (n, dim) float32, rows L2-normalized; memory-mapped
+	ivf: "_IVFIndex | None"
+
+
+class _IVFIndex:
+	"""Inverted-file approximate index: spherical k-means cells, probed nearest-first.
+
+	Trained by the writer when a corpus is large enough for exact search to
+	matter and stored next to the generation it indexes, so readers only load
+	it; a query scores the centroids, then only the rows in the `nprobe`
+	closest cells.
+	"""
+
+	def __init__(self, centroids: np.ndarray, rows: np.ndarray, offsets: np.ndarray) -> None:
+		self.centroids = centroids
+		self.rows = rows
+		self.offsets = offsets
+
+	@classmethod
+	def train(cls, vectors: np.ndarray, *, seed: int = 0, iterations: int = 8) -> "_IVFIndex":
+		n = vectors.shape[0]
+		n_cells = max(1, int(np.sqrt(n)))
+		rng = np.random.default_rng(seed)
+		sample = vectors[rng.choice(n, size=min(n, n_cells * 64), replace=False)]
+		centroids = sample[rng.choice(len(sample), size=n_cells, replace=False)].copy()
+		for _ in range(iterations):
+			assign = np.argmax(sample @ centroids.T, axis=1)
+			for c in range(n_cells):
+				members = sample[assign == c]
+				if len(members):
+					centroids[c] = members.sum(axis=0)
+			centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+		assign = np.empty(n, dtype=np.int64)
+		for start in range(0, n, 65536):
+			assign[start:start + 65536] = np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+		order = np.argsort(assign, kind="stable")
+		return cls(centroids, order, np.searchsorted(assign[order], np.arange(n_cells + 1)))
+
+	def save(self, f) -> None:
+		np.savez(f, centroids=self.centroids, rows=self.rows, offsets=self.offsets)
+
+	@classmethod
+	def load(cls, path: Path) -> "_IVFIndex":
+		with np.load(path, allow_pickle=False) as data:
+			return cls(data["centroids"], data["rows"], data["offsets"])
+
+	def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+		cells = np.argsort(-(self.centroids @ query))[:max(1, nprobe)]
+		return np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+
+
+class NumpyVectorStore:
+	"""In-process vector index over a memory-mapped float32 matrix.
+
+	Implements the part of the Chroma collection API that `PolicyRetriever`
+	uses (`count`, `get`, `add`, `upsert`, `update`, `delete`, `query`), so it
+	is a drop-in backend. On disk:
+
+		<root>/CURRENT                 "<gen>", the published generation
+		<root>/index-<gen>.json        ids, documents, metadatas, model
+		<root>/vectors-<gen>.npy       (n, dim) float32 embeddings
+		<root>/ivf-<gen>.npz           IVF cells, for corpora of `ann_min_rows`+ rows
+
+	Writers from any process serialize on a file lock, write the next
+	generation under temporary names and publish it by replacing `CURRENT`,
+	so readers never see a half-written index. Every worker process maps the
+	same files and polls the few bytes of `CURRENT` every `poll_s` seconds to
+	pick up other processes' changes. Older generations are left for readers
+	that still map them and removed by later writes. Queries are exact
+	dot-product top-k, or IVF-approximate once the corpus has `ann_min_rows`
+	rows. The IVF index is trained on write, never on the query path; a
+	generation without one (written with a higher threshold) is searched
+	exactly.
+	"""
+
+	def __init__(
+		self,
+		root: str | Path,
+		embed: Embedder,
+		*,
+		model: str = "",
+		ann_min_rows: int = 20_000,
+		nprobe: int = 8,
+		poll_s: float = 1.0,
+		on_change: Callable[[], None] | None = None,
+	) -> None:
+		self.root = Path(root)
+		self.embed = embed
+		self.model = model
+		self.ann_min_rows = ann_min_rows
+		self.nprobe = nprobe
+		self.poll_s = poll_s
+		self.on_change = on_change
+		self._write_lock = Lock()
+		self._snapshot = self._load()
+		self._checked_at = monotonic()
+
+	# -- persistence -----------------------------------------------------------
+
+	def _empty(self, generation: int = 0) -> _Snapshot:
+		return _Snapshot(generation, (), (), (), np.zeros((0, 0), dtype=np.float32), None)
+
+	def _read_current(self) -> int | None:
+		try:
+			return int((self.root / _CURRENT).read_text(encoding="utf-8"))
+		except FileNotFoundError:
+			return None
+
+	def _load(self, *, load_ann: bool = True) -> _Snapshot:
+		for _ in range(3):
+			generation = self._read_current()
+			if generation is None:
+				return self._empty()
+			try:
+				index = json.loads((self.root / f"index-{generation}.json").read_text(encoding="utf-8"))
+				vectors = np.load(self.root / f"vectors-{generation}.npy", mmap_mode="r")
+				break
+			except FileNotFoundError:
+				continue  # cleaned up under us by a newer generation; re-read CURRENT
+		else:
+			raise FileNotFoundError(f"vector index generation {generation} vanished from {self.root}")
+		if self.model and index.get("model") != self.model:
+			# Vectors from another embedding model are not comparable; start
+			# empty so the next sync re-embeds everything
+			logger.warning("Vector index at %s was built with %r, not %r; ignoring it", self.root, index.get("model"), self.model)
+			return self._empty(generation)
+		ivf = None
+		if load_ann and len(vectors) >= self.ann_min_rows:
+			try:
+				ivf = _IVFIndex.load(self.root / f"ivf-{generation}.npz")
+			except FileNotFoundError:
+				pass
+		return _Snapshot(generation, tuple(index["ids"]), tuple(index["documents"]), tuple(index["metadatas"]), vectors, ivf)
+
+	def _current(self) -> _Snapshot:
+		now = monotonic()
+		if now - self._checked_at >= self.poll_s:
+			self._checked_at = now
+			if (self._read_current() or 0) != self._snapshot.generation:
+				self._snapshot = self._load()
+				if self.on_change is not None:
+					self.on_change()
+		return self._snapshot
+
+	@contextmanager
+	def _writing(self) -> Iterator[_Snapshot]:
+		"""Serialize a write across threads and processes; yields the latest snapshot."""
+		with self._write_lock, file_lock(self.root / ".lock"):
+			yield self._load(load_ann=False)
+
+	def _write(self, base: _Snapshot, ids: list[str], documents: list[str], metadatas: list[dict], vectors: np.ndarray) -> None:
+		"""Publish the next generation (write lock held)."""
+		generation = base.generation + 1
+		fd, tmp_vectors = tempfile.mkstemp(prefix=".vectors-", suffix=".npy", dir=self.root)
+		with os.fdopen(fd, "wb") as f:
+			np.save(f, np.ascontiguousarray(vectors, dtype=np.float32), allow_pickle=False)
+		fd, tmp_index = tempfile.mkstemp(prefix=".index-", suffix=".json", dir=self.root)
+		with os.fdopen(fd, "w", encoding="utf-8") as f:
+			json.dump({"model": self.model, "ids": ids, "documents": documents, "metadatas": metadatas}, f)
+		if len(vectors) >= self.ann_min_rows:
+			fd, tmp_ivf = tempfile.mkstemp(prefix=".ivf-", suffix=".npz", dir=self.root)
+			with os.fdopen(fd, "wb") as f:
+				_IVFIndex.train(np.asarray(vectors, dtype=np.float32)).save(f)
+			os.replace(tmp_ivf, self.root / f"ivf-{generation}.npz")
+		os.replace(tmp_vectors, self.root / f"vectors-{generation}.npy")
+		os.replace(tmp_index, self.root / f"index-{generation}.json")
+		fd, tmp_current = tempfile.mkstemp(prefix=".current-", dir=self.root)
+		with os.fdopen(fd, "w", encoding="utf-8") as f:
+			f.write(str(generation))
+		os.replace(tmp_current, self.root / _CURRENT)
+		self._snapshot = self._load()
+		self._checked_at = monotonic()
+		self._remove_old_generations(generation)
+
+	def _remove_old_generations(self, current: int) -> None:
+		"""Delete generations older than the previous one.
+
+		The previous generation stays for readers that have not polled yet; a
+		file some process still maps cannot be removed on Windows and is retried
+		on the next write.
+		"""
+		for path in self.root.iterdir():
+			match = _GENERATION_FILE.fullmatch(path.name)
+			if match and int(match.group(1)) < current - 1:
+				try:
+					path.unlink()
+				except OSError:
+					pass
+
+	# -- collection API --------------------------------------------------------
+
+	def count(self) -> int:
+		return len(self._current().ids)
+
+	def get(self, ids: list[str] | None = None, include: list[str] | None = None) -> dict:
+		snap = self._current()
+		wanted = None if ids is None else set(ids)
+		rows = [i for i, x in enumerate(snap.ids) if wanted is None or x in wanted]
+		include = ["metadatas", "documents"] if include is None else include
+		return {
+			"ids": [snap.ids[i] for i in rows],
+			"documents": [snap.documents[i] for i in rows] if "documents" in include else None,
+			"metadatas": [snap.metadatas[i] for i in rows] if "metadatas" in include else None,
+		}
+
+	def upsert(self, ids: list[str], documents: list[str], metadatas: list[dict] | None = None) -> None:
+		if not ids:
+			return
+		metadatas = metadatas or [{} for _ in ids]
+		new_vectors = self.embed(list(documents))
+		new_vectors /= np.maximum(np.linalg.norm(new_vectors, axis=1, keepdims=True), 1e-12)
+		with self._writing() as snap:
+			pos = {x: i for i, x in enumerate(snap.ids)}
+			all_ids, all_docs, all_metas = list(snap.ids), list(snap.documents), list(snap.metadatas)
+			dim = new_vectors.shape[1]
+			vectors = np.empty((len(snap.ids) + len(ids), dim), dtype=np.float32)
+			if len(snap.ids):
+				vectors[:len(snap.ids)] = snap.vectors
+			n = len(all_ids)
+			for j, (x, doc, meta) in enumerate(zip(ids, documents, metadatas)):
+				i = pos.get(x)
+				if i is None:
+					i = pos[x] = n
+					n += 1
+					all_ids.append(x)
+					all_docs.append(doc)
+					all_metas.append(meta)
+				else:
+					all_docs[i], all_metas[i] = doc, meta
+				vectors[i] = new_vectors[j]
+			self._write(snap, all_ids, all_docs, all_metas, vectors[:n])
+
+	add = upsert
+
+	def update(self, ids: list[str], metadatas: list[dict]) -> None:
+		with self._writing() as snap:
+			changes = dict(zip(ids, metadatas))
+			metas = [changes.get(x, m) for x, m in zip(snap.ids, snap.metadatas)]
+			self._write(snap, list(snap.ids), list(snap.documents), metas, np.asarray(snap.vectors))
+
+	def delete(self, ids: list[str]) -> None:
+		with self._writing() as snap:
+			drop = set(ids)
+			keep = [i for i, x in enumerate(snap.ids) if x not in drop]
+			self._write(snap, [snap.ids[i] for i in keep], [snap.documents[i] for i in keep], [snap.metadatas[i] for i in keep], np.asarray(snap.vectors)[keep])
+
+	def query(self, query_texts: list[str], n_results: int = 10) -> dict:
+		"""Top-`n_results` by cosine similarity; distances are `1 - similarity`."""
+		snap = self._current()
+		out: dict[str, list] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+		if not snap.ids:
+			for key in out:
+				out[key] = [[] for _ in query_texts]
+			return out
+		queries = self.embed(list(query_texts))
+		queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+		if snap.ivf is None:
+			# Exact: one (n, dim) x (dim, m) product scores every query at once
+			scores = snap.vectors @ queries.T
+			k = min(n_results, scores.shape[0])
+			top = np.argpartition(-scores, k - 1, axis=0)[:k]
+			top_scores = np.take_along_axis(scores, top, axis=0)
+			order = np.argsort(-top_scores, axis=0)
+			ranked = [(np.take_along_axis(top, order, axis=0)[:, j], np.take_along_axis(top_scores, order, axis=0)[:, j]) for j in range(len(queries))]
+		else:
+			ranked = []
+			for q in queries:
+				rows = snap.ivf.candidates(q, self.nprobe)
+				if not len(rows):
+					# Every probed cell is empty
+					ranked.append((rows, np.empty(0, dtype=np.float32)))
+					continue
+				row_scores = snap.vectors[rows] @ q
+				k = min(n_results, len(rows))
+				top = np.argpartition(-row_scores, k - 1)[:k]
+				top = top[np.argsort(-row_scores[top])]
+				ranked.append((rows[top], row_scores[top]))
+		for idx, sims in ranked:
+			out["ids"].append([snap.ids[i] for i in idx])
+			out["documents"].append([snap.documents[i] for i in idx])
+			out["metadatas"].append([snap.metadatas[i] for i in idx])
+			out["distances"].append([float(1.0 - s) for s in sims])
+		return out
@@ -0,0 +1,19 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture
+def online_store(monkeypatch):
+	"""Route the process feature store to an in-memory fakeredis instance."""
+	from fakeredis import FakeAsyncRedis
+
+	from src.fraud_detection import feature_store
+
+	store = feature_store.OnlineFeatureStore(FakeAsyncRedis(decode_responses=True), ttl_s=3600)
+	monkeypatch.setattr(feature_store, "_store", store)
+	monkeypatch.setattr(feature_store, "_retry_after", 0.0)
+	return store
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+
+from src.agents.compliance_rag_agent import ComplianceRAGAgent
+from src.core.config import get_settings
+from src.rag.indexer import index_policies
+from src.rag.query_cache import QueryCache
+from src.rag.retriever import PolicyRetriever
+
+
+POLICIES = str(Path(__file__).resolve().parent.parent / "data" / "policies")
+QUERIES = [
+	"customer due diligence",
+	"suspicious transaction reporting",
+	"debt to income affordability",
+	"Customer  due diligence",
+	"credit limit increase",
+]
+
+
+@pytest.fixture
+def offline_embeddings(monkeypatch):
+	monkeypatch.setattr(get_settings(), "embedding_model", "hashing")
+	monkeypatch.setattr(get_settings(), "embedding_cache_enabled", False)
+
+
+@pytest.mark.parametrize("mode", ["dense", "lexical", "hybrid"])
+def test_query_many_matches_one_query_at_a_time(tmp_path, offline_embeddings, mode):
+	index_policies(PolicyRetriever(str(tmp_path), backend="numpy", mode=mode), POLICIES)
+	batched = PolicyRetriever(str(tmp_path), cache=QueryCache(0), backend="numpy", mode=mode)
+	single = PolicyRetriever(str(tmp_path), cache=QueryCache(0), backend="numpy", mode=mode)
+	assert batched.query_many(QUERIES, k=3) == [single.query(q, k=3) for q in QUERIES]
+
+
+def test_query_many_runs_one_search_for_deduplicated_misses(tmp_path, offline_embeddings):
+	retriever = PolicyRetriever(str(tmp_path), backend="numpy", mode="dense")
+	index_policies(retriever, POLICIES)
+	calls = []
+	query = retriever.collection.query
+
+	def counting_query(query_texts, n_results):
+		calls.append(list(query_texts))
+		return query(query_texts=query_texts, n_results=n_results)
+
+	retriever.collection.query = counting_query
+	first = retriever.query_many(QUERIES, k=2)
+	assert len(calls) == 1 and len(calls[0]) == 4  # the two "due diligence" spellings share a key
+	assert all(first) and first[0] == first[3]
+	assert retriever.query_many(QUERIES, k=2) == first and len(calls) == 1
+
+
+def test_cite_many_matches_cite(tmp_path):
+	retriever = PolicyRetriever(str(tmp_path), mode="lexical")
+	index_policies(retriever, POLICIES)
+	agent = ComplianceRAGAgent(retriever)
+	assert agent.cite_many(QUERIES) == [agent.cite(q) for q in QUERIES]
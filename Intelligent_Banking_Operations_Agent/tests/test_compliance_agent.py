@@ -0,0 +1,61 @@
+import pytest
+
+from src.agents import langgraph_workflow
+from src.rag import indexer
+
+
+@pytest.fixture(autouse=True)
+def _reset(monkeypatch):
+	monkeypatch.setattr(langgraph_workflow, "_compliance_agent", None)
+	monkeypatch.setattr(langgraph_workflow, "_compliance_retry_after", 0.0)
+
+
+def test_failed_build_is_retried_after_backoff(monkeypatch):
+	clock = [1000.0]
+	calls = []
+
+	def failing_index(retriever, policies_dir, max_chars=None):
+		calls.append(policies_dir)
+		raise RuntimeError("index down")
+
+	monkeypatch.setattr(langgraph_workflow, "monotonic", lambda: clock[0])
+	monkeypatch.setattr(indexer, "index_policies", failing_index)
+	assert langgraph_workflow.get_compliance_agent() is None
+	assert langgraph_workflow.get_compliance_agent() is None
+	assert len(calls) == 1
+
+	monkeypatch.setattr(indexer, "index_policies", lambda retriever, policies_dir, max_chars=None: None)
+	clock[0] += langgraph_workflow._COMPLIANCE_RETRY_BACKOFF_S + 1
+	agent = langgraph_workflow.get_compliance_agent()
+	assert agent is not None
+	assert langgraph_workflow.get_compliance_agent() is agent
+
+
+def test_grounding_resolves_the_agent_off_the_event_loop(monkeypatch):
+	import asyncio
+	import threading
+	from types import SimpleNamespace
+
+	threads = []
+
+	class _Agent:
+		def cite(self, query):
+			return SimpleNamespace(citations=["policy.md"], snippets=[query])
+
+		def cite_many(self, queries):
+			return [self.cite(q) for q in queries]
+
+	def fake_get():
+		threads.append(threading.current_thread())
+		return _Agent()
+
+	monkeypatch.setattr(langgraph_workflow, "get_compliance_agent", fake_get)
+
+	async def main():
+		node = await langgraph_workflow.compliance_node({"intent": "fraud", "payload": {"amount": 10.0}})
+		many = await langgraph_workflow.ground_many([{"amount": 10.0}])
+		return threading.current_thread(), node, many
+
+	loop_thread, node, many = asyncio.run(main())
+	assert node["citations"] == ["policy.md"] and many[0]["citations"] == ["policy.md"]
+	assert len(threads) == 2 and loop_thread not in threads
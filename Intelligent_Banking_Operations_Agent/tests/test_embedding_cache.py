@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.rag.embedding_cache import CachedEmbedder, EmbeddingCache, text_digest
+from src.rag.embeddings import HashingEmbedder
+
+
+class _CountingEmbedder:
+	def __init__(self) -> None:
+		self.inner = HashingEmbedder(32)
+		self.model_id = self.inner.model_id
+		self.calls: list[list[str]] = []
+
+	def __call__(self, texts: list[str]) -> np.ndarray:
+		self.calls.append(list(texts))
+		return self.inner(texts)
+
+
+def test_only_uncached_texts_are_embedded(tmp_path):
+	embed = _CountingEmbedder()
+	cached = CachedEmbedder(embed, EmbeddingCache(tmp_path, embed.model_id))
+	first = cached(["a b", "c d"])
+	second = cached(["c d", "e f", "a b"])
+	assert embed.calls == [["a b", "c d"], ["e f"]]
+	np.testing.assert_array_equal(second[[2, 0]], first)
+
+
+def test_entries_are_shared_through_the_files(tmp_path):
+	vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+	digests = [text_digest(t) for t in ("x", "y", "z")]
+	EmbeddingCache(tmp_path, "m").put_many(digests, vectors)
+	out, missing = EmbeddingCache(tmp_path, "m").get_many(digests + [text_digest("w")])
+	assert missing == [3]
+	np.testing.assert_array_equal(out[:3], vectors)
+
+
+def test_compaction_keeps_recent_entries_and_removes_old_files(tmp_path):
+	cache = EmbeddingCache(tmp_path, "m", max_entries=8)
+	for i in range(12):
+		cache.put_many([text_digest(str(i))], np.full((1, 4), i, dtype=np.float32))
+	assert len(cache) <= 8
+	files = sorted(p.name for p in cache.dir.iterdir() if not p.name.startswith("."))
+	generation = cache._generation
+	assert files == ["CURRENT", f"keys-{generation}.bin", f"vectors-{generation}.f32"]
+	out, missing = cache.get_many([text_digest("11")])
+	assert missing == [] and out[0, 0] == 11.0
+
+
+def test_torn_write_does_not_misalign_later_rows(tmp_path):
+	cache = EmbeddingCache(tmp_path, "m")
+	cache.put_many([text_digest("a")], np.full((1, 4), 1.0, dtype=np.float32))
+	keys_path, vectors_path = cache._paths(cache._generation)
+	# Crash mid-append: vectors of two rows landed, only part of a key did
+	with vectors_path.open("ab") as f:
+		f.write(np.full((2, 4), 9.0, dtype=np.float32).tobytes())
+	with keys_path.open("ab") as f:
+		f.write(text_digest("lost")[:10])
+
+	writer = EmbeddingCache(tmp_path, "m")
+	writer.put_many([text_digest("b"), text_digest("c")], np.array([[2.0] * 4, [3.0] * 4], dtype=np.float32))
+	out, missing = EmbeddingCache(tmp_path, "m").get_many([text_digest(t) for t in ("a", "b", "c", "lost")])
+	assert missing == [3]
+	np.testing.assert_array_equal(out[:3, 0], [1.0, 2.0, 3.0])
+	assert vectors_path.stat().st_size == 3 * 4 * 4 and keys_path.stat().st_size == 3 * 32
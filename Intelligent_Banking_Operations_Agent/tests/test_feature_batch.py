@@ -0,0 +1,89 @@
+import copy
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.agents.fraud_triage_agent import FraudTriageAgent
+from src.fraud_detection.feature_engineering import FEATURE_NAMES, AccountFeatureState, HistoricalTxn, build_features, build_features_batch, build_features_folded, build_features_from_state
+
+
+NOW = datetime(2024, 3, 1, 12, 0, 0)
+
+
+def _random_history(rng: random.Random) -> dict[str, list[HistoricalTxn]]:
+	history: dict[str, list[HistoricalTxn]] = {}
+	for a in range(rng.randint(1, 8)):
+		history[f"acct-{a}"] = [
+			HistoricalTxn(
+				amount=round(rng.uniform(0.5, 2000), 2),
+				timestamp=NOW - timedelta(seconds=rng.choice([rng.randint(0, 40 * 3600), 3600, 86400, 3601, 86401])),
+				geo=rng.choice(["IN-MH", "IN-KA", "", None]),
+				device_id=rng.choice(["d1", "d2", "", None]),
+				mcc=rng.choice(["5411", "6011", "7995", None]),
+			)
+			for _ in range(rng.randint(0, 30))
+		]
+		# Bit-for-bit parity holds for time-ordered history (the order sums run in)
+		history[f"acct-{a}"].sort(key=lambda h: h.timestamp)
+	return history
+
+
+def test_build_features_batch_matches_scalar_bit_for_bit():
+	rng = random.Random(11)
+	for _ in range(40):
+		history = _random_history(rng)
+		rows = [(acct, h) for acct, txns in history.items() for h in txns]
+		rows.sort(key=lambda r: r[1].timestamp)  # interleave accounts; each keeps its order
+		queries = [
+			(rng.choice([*history, "unknown"]), rng.uniform(1, 5000), NOW + timedelta(minutes=rng.randint(0, 90)), rng.choice(["5411", "4829", None]), rng.choice(["IN-MH", "US-NY", None]), rng.choice(["d1", "d9", None]))
+			for _ in range(rng.randint(1, 25))
+		]
+		matrix = build_features_batch(
+			[q[0] for q in queries], [q[1] for q in queries], [q[2] for q in queries],
+			[q[3] for q in queries], [q[4] for q in queries], [q[5] for q in queries],
+			hist_account_ids=[a for a, _ in rows],
+			hist_amounts=[h.amount for _, h in rows],
+			hist_timestamps=[h.timestamp for _, h in rows],
+			hist_mcc=[h.mcc for _, h in rows],
+			hist_geo=[h.geo for _, h in rows],
+			hist_device_id=[h.device_id for _, h in rows],
+		)
+		for (acct, amount, now, mcc, geo, device_id), row in zip(queries, matrix):
+			expected = build_features(amount, now, mcc, geo, device_id, history.get(acct, []))
+			assert row.tolist() == [expected[name] for name in FEATURE_NAMES]
+
+
+def test_triage_batch_matches_per_item_triage():
+	rng = random.Random(5)
+	agent = FraudTriageAgent()
+	history = _random_history(rng)
+	txns = [
+		{"account_id": rng.choice(list(history)), "amount": rng.uniform(1, 5000), "mcc": rng.choice(["5411", "7995"]), "geo": "IN-MH", "device_id": rng.choice(["d1", "d9"])}
+		for _ in range(20)
+	]
+	batch = agent.triage_batch(txns, history=history, now=NOW)
+	for txn, out in zip(txns, batch):
+		single = agent.triage(amount=txn["amount"], mcc=txn["mcc"], geo=txn["geo"], device_id=txn["device_id"], history=history[txn["account_id"]], now=NOW)
+		assert out.alert_score == single.alert_score
+		assert (out.decision, out.risk_band, out.rule_hits) == (single.decision, single.risk_band, single.rule_hits)
+		assert np.allclose([out.features[n] for n in FEATURE_NAMES], [single.features[n] for n in FEATURE_NAMES], rtol=0, atol=0)
+
+
+def test_build_features_folded_matches_the_scalar_fold():
+	rng = random.Random(5)
+	for _ in range(40):
+		states = {acct: AccountFeatureState.from_history(txns) for acct, txns in _random_history(rng).items()}
+		items = []
+		ts = NOW
+		for _ in range(rng.randint(1, 25)):
+			ts += timedelta(minutes=rng.randint(0, 40))
+			items.append((rng.choice([*states, "unknown"]), rng.uniform(1, 5000), ts, rng.choice(["5411", "4829", "", None]), rng.choice(["IN-MH", "US-NY", "", None]), rng.choice(["d1", "d9", "", None])))
+		matrix = build_features_folded(*map(list, zip(*items)), states=states)
+
+		reference = copy.deepcopy(states)
+		for row, (acct, amount, now, mcc, geo, device_id) in zip(matrix, items):
+			state = reference.setdefault(acct, AccountFeatureState())
+			expected = build_features_from_state(amount, now, mcc, geo, device_id, state)
+			state.observe(amount, now, geo=geo, device_id=device_id, mcc=mcc)
+			np.testing.assert_allclose(row, [expected[name] for name in FEATURE_NAMES], rtol=1e-9, atol=1e-9)
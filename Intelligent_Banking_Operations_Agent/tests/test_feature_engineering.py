@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.fraud_detection.feature_engineering import AccountFeatureState, HistoricalTxn, build_features, build_features_from_state
+
+
+NOW = datetime(2024, 3, 1, 12, 0, 30)
+
+
+def _txn(ts: datetime, amount: float = 10.0, **kw) -> HistoricalTxn:
+	return HistoricalTxn(amount=amount, timestamp=ts, **kw)
+
+
+def _assert_parity(history: list[HistoricalTxn], now: datetime, *, amount: float = 50.0, mcc: str | None = "5411", geo: str | None = "IN-MH", device_id: str | None = "d1") -> None:
+	state = AccountFeatureState()
+	for h in history:  # observe in arrival order, not sorted
+		state.observe(h.amount, h.timestamp, geo=h.geo, device_id=h.device_id, mcc=h.mcc)
+	expected = build_features(amount, now, mcc, geo, device_id, history)
+	actual = build_features_from_state(amount, now, mcc, geo, device_id, state)
+	assert actual.keys() == expected.keys()
+	for name, value in expected.items():
+		assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-9), name
+
+
+def test_late_event_expires_with_its_own_timestamp():
+	day = datetime(2024, 3, 1)
+	history = [_txn(day.replace(hour=11, minute=50)), _txn(day.replace(hour=10)), _txn(day.replace(hour=11, minute=55))]
+	state = AccountFeatureState()
+	for h in history:
+		state.observe(h.amount, h.timestamp)
+	features = build_features_from_state(1.0, day.replace(hour=12), None, None, None, state)
+	assert features["velocity_1h_count"] == 2.0
+	assert features["velocity_24h_count"] == 3.0
+
+
+@pytest.mark.parametrize("offset", [
+	timedelta(hours=1) - timedelta(seconds=1),
+	timedelta(hours=1),
+	timedelta(hours=1, microseconds=1),
+	timedelta(hours=1, seconds=59),
+	timedelta(hours=24),
+	timedelta(hours=24, microseconds=1),
+])
+def test_window_edges_are_exact(offset):
+	_assert_parity([_txn(NOW - offset, 25.0)], NOW)
+	_assert_parity([_txn(NOW - timedelta(minutes=5)), _txn(NOW - offset, 25.0)], NOW)
+
+
+def test_matches_build_features_on_shuffled_history():
+	rng = random.Random(7)
+	for _ in range(50):
+		history = [
+			_txn(
+				NOW - timedelta(seconds=rng.randint(0, 30 * 3600)),
+				round(rng.uniform(1, 500), 2),
+				geo=rng.choice(["IN-MH", "IN-KA", None]),
+				device_id=rng.choice(["d1", "d2", ""]),
+				mcc=rng.choice(["5411", "6011", None]),
+			)
+			for _ in range(rng.randint(0, 40))
+		]
+		_assert_parity(history, NOW, amount=rng.uniform(1, 900))
+
+
+def test_observe_keeps_only_the_window():
+	state = AccountFeatureState.from_history(_txn(NOW - timedelta(minutes=i)) for i in range(5000))
+	assert len(state.window_1h) == 61
+	assert len(state.window_24h) == 1441
+	assert not state.window_24h.late
+	assert state.n == 5000
@@ -0,0 +1,79 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from src.fraud_detection.feature_engineering import HistoricalTxn, build_features
+from src.fraud_detection.feature_store import ObservedTxn, OnlineFeatureStore
+
+
+NOW = datetime(2024, 3, 1, 12, 0, 0)
+
+
+def _store() -> OnlineFeatureStore:
+	return OnlineFeatureStore(FakeAsyncRedis(decode_responses=True), ttl_s=3600)
+
+
+def _history(rng: random.Random, size: int) -> list[HistoricalTxn]:
+	return [
+		HistoricalTxn(
+			amount=round(rng.uniform(1, 500), 2),
+			timestamp=NOW - timedelta(seconds=rng.randint(1, 20 * 3600)),
+			geo=rng.choice(["IN-MH", "IN-KA", None]),
+			device_id=rng.choice(["d1", "d2", ""]),
+			mcc=rng.choice(["5411", "6011", None]),
+		)
+		for _ in range(size)
+	]
+
+
+async def _observe_all(store: OnlineFeatureStore, account_id: str, history: list[HistoricalTxn]) -> None:
+	for i, h in enumerate(history):
+		await store.observe(account_id, ObservedTxn(event_id=f"e{i}", amount=h.amount, timestamp=h.timestamp, mcc=h.mcc, geo=h.geo, device_id=h.device_id))
+
+
+def test_fetch_matches_build_features():
+	async def run():
+		rng = random.Random(3)
+		for trial in range(20):
+			store = _store()
+			history = _history(rng, rng.randint(0, 30))
+			await _observe_all(store, "acct", history)
+			amount = rng.uniform(1, 900)
+			for mcc, geo, device_id in (("5411", "IN-MH", "d1"), ("7995", "US-NY", "d9"), (None, None, None)):
+				expected = build_features(amount, NOW, mcc, geo, device_id, history)
+				actual = await store.fetch("acct", amount=amount, now=NOW, mcc=mcc, geo=geo, device_id=device_id)
+				for name, value in expected.items():
+					assert actual[name] == pytest.approx(value, rel=1e-9, abs=1e-9), (trial, name)
+
+	asyncio.run(run())
+
+
+def test_zscore_is_stable_for_large_constant_amounts():
+	async def run():
+		store = _store()
+		history = [HistoricalTxn(amount=1e9 + 0.01, timestamp=NOW - timedelta(minutes=i)) for i in range(10)]
+		await _observe_all(store, "acct", history)
+		features = await store.fetch("acct", amount=1e9 + 0.01, now=NOW, mcc=None, geo=None, device_id=None)
+		assert features["amount_zscore"] == 0.0
+
+	asyncio.run(run())
+
+
+def test_concurrent_observes_are_not_lost():
+	async def run():
+		store = _store()
+		amounts = [float(i) for i in range(1, 21)]
+		await asyncio.gather(*(
+			store.observe("acct", ObservedTxn(event_id=f"e{i}", amount=a, timestamp=NOW - timedelta(minutes=i)))
+			for i, a in enumerate(amounts)
+		))
+		stats = await store.client.hgetall(store._key("acct", "stats"))
+		assert float(stats["n"]) == 20.0
+		assert float(stats["mean"]) == pytest.approx(10.5)
+		features = await store.fetch("acct", amount=10.5, now=NOW, mcc=None, geo=None, device_id=None)
+		assert features["velocity_1h_count"] == 20.0
+
+	asyncio.run(run())
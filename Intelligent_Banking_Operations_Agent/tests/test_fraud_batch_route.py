@@ -0,0 +1,50 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.channels.banking_api_routes import router
+
+
+def _client() -> TestClient:
+	app = FastAPI()
+	app.include_router(router)
+	return TestClient(app)
+
+
+def _txn(account_id: str, amount: float, device_id: str = "d1") -> dict:
+	return {"account_id": account_id, "amount": amount, "mcc": "5411", "geo": "IN-MH", "device_id": device_id}
+
+
+def test_batch_reads_and_writes_the_feature_store(online_store):
+	with _client() as client:
+		burst = [_txn("acct-1", 10.0 + i) for i in range(8)] + [_txn("acct-2", 99.0, device_id="d7")]
+		items = client.post("/fraud/triage/batch", json={"transactions": burst}).json()["items"]
+		assert [it["features"]["velocity_1h_count"] for it in items[:8]] == [float(i) for i in range(8)]
+		assert items[1]["features"]["velocity_1h_total"] == 10.0
+		assert items[0]["features"]["device_novelty"] == 1.0
+		assert items[1]["features"]["device_novelty"] == 0.0
+		assert items[8]["features"]["velocity_1h_count"] == 0.0
+
+		follow_up = client.post("/fraud/triage/batch", json={"transactions": [_txn("acct-1", 20.0), _txn("acct-2", 5.0, device_id="d7")]}).json()["items"]
+		assert follow_up[0]["features"]["velocity_1h_count"] == 8.0
+		assert follow_up[0]["features"]["velocity_1h_total"] == sum(10.0 + i for i in range(8))
+		assert follow_up[1]["features"]["velocity_1h_count"] == 1.0
+		assert follow_up[1]["features"]["device_novelty"] == 0.0
+
+
+def test_batch_without_feature_store_scores_history_free(monkeypatch):
+	from src.core.config import get_settings
+
+	monkeypatch.setattr(get_settings(), "feature_store_enabled", False)
+	with _client() as client:
+		items = client.post("/fraud/triage/batch", json={"transactions": [_txn("acct-1", 10.0), _txn("acct-1", 7995.0)]}).json()["items"]
+	assert [it["features"]["velocity_1h_count"] for it in items] == [0.0, 0.0]
+	assert [it["features"]["device_novelty"] for it in items] == [1.0, 1.0]
+
+
+def test_batch_records_the_batch_sla_on_every_event(online_store):
+	from src.fraud_detection.telemetry import get_event
+
+	with _client() as client:
+		body = client.post("/fraud/triage/batch", json={"transactions": [_txn("acct-1", 10.0), _txn("acct-2", 20.0)]}).json()
+	assert all("llm_rationale_status" in it for it in body["items"])
+	assert [get_event(it["event_id"]).sla_ms for it in body["items"]] == [body["sla_ms"]] * 2
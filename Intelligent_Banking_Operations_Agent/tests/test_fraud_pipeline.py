@@ -0,0 +1,71 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from src.channels import fraud_pipeline
+from src.channels.ndjson_stream import parse_event
+
+
+T0 = datetime(2024, 3, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _line(account_id: str, amount: float, ts: datetime | None, **extra) -> bytes:
+	obj = {"account_id": account_id, "amount": amount, "mcc": "5411", "device_id": "d1", **extra}
+	if ts is not None:
+		obj["ts"] = ts.isoformat()
+	return json.dumps(obj).encode()
+
+
+def _capture_features(monkeypatch) -> list[dict]:
+	seen: list[dict] = []
+	score = fraud_pipeline.triage_fraud_features
+
+	async def capturing(items):
+		seen.extend(item["features"] for item in items)
+		return await score(items)
+
+	monkeypatch.setattr(fraud_pipeline, "triage_fraud_features", capturing)
+	return seen
+
+
+def test_burst_on_one_account_sees_earlier_events_of_the_batch(online_store, monkeypatch):
+	features = _capture_features(monkeypatch)
+	lines = [_line("acct-1", 100.0, T0 + timedelta(seconds=i)) for i in range(8)]
+	lines.insert(3, _line("acct-2", 5.0, T0))
+	lines.append(b"not json")
+	events = [parse_event(seq, line) for seq, line in enumerate(lines)]
+
+	async def run():
+		first = await fraud_pipeline.score_stream_events(events)
+		await fraud_pipeline.score_stream_events([parse_event(0, _line("acct-1", 100.0, T0 + timedelta(minutes=1)))])
+		return first
+
+	records = asyncio.run(run())
+
+	assert len(records) == 10 and "error" in records[-1]
+	burst = [f for f, e in zip(features, [e for e in events if e.error is None]) if e.account_id == "acct-1"]
+	assert [f["velocity_1h_count"] for f in burst] == [float(i) for i in range(8)]
+	assert [f["velocity_1h_total"] for f in burst] == [100.0 * i for i in range(8)]
+	assert [f["device_novelty"] for f in burst] == [1.0] + [0.0] * 7
+	assert any("velocity" in x for x in records[-2]["explanations"])
+	assert features[-1]["velocity_1h_count"] == 8.0
+
+
+def test_mixed_timestamped_and_untimed_events_on_one_account(online_store, monkeypatch):
+	features = _capture_features(monkeypatch)
+	events = [parse_event(0, _line("acct-1", 10.0, datetime.now(timezone.utc))), parse_event(1, _line("acct-1", 20.0, None))]
+	asyncio.run(fraud_pipeline.score_stream_events(events))
+	assert [f["velocity_24h_count"] for f in features] == [0.0, 1.0]
+
+
+def test_overlapping_batches_on_one_account_are_serialized(online_store, monkeypatch):
+	features = _capture_features(monkeypatch)
+	first = [parse_event(i, _line("acct-1", 10.0, T0 + timedelta(seconds=i))) for i in range(3)]
+	second = [parse_event(3, _line("acct-1", 10.0, T0 + timedelta(seconds=3))), parse_event(4, _line("acct-2", 10.0, T0))]
+
+	async def run():
+		await asyncio.gather(fraud_pipeline.score_stream_events(first), fraud_pipeline.score_stream_events(second))
+		return dict(fraud_pipeline._account_batches)
+
+	assert asyncio.run(run()) == {}
+	assert [f["velocity_1h_count"] for f in features] == [0.0, 1.0, 2.0, 3.0, 0.0]
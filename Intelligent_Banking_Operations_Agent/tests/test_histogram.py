@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from src.core.histogram import LatencyHistogram
+
+
+def _exact(values: list[int], p: float) -> int:
+	ordered = sorted(values)
+	return ordered[max(1, int(-(-len(ordered) * p // 100))) - 1]
+
+
+def test_small_values_are_exact_and_large_ones_within_the_error_bound():
+	rng = random.Random(2)
+	hist = LatencyHistogram()
+	assert hist.percentile(50) is None
+	values = [rng.randint(0, 127) for _ in range(500)]
+	for v in values:
+		hist.record(v)
+	for p in (1, 50, 95, 99, 100):
+		assert hist.percentile(p) == _exact(values, p)
+
+	hist = LatencyHistogram()
+	values = [int(rng.lognormvariate(5, 1.5)) for _ in range(5000)]
+	for v in values:
+		hist.record(v)
+	for p in (50, 90, 95, 99, 99.9):
+		exact = _exact(values, p)
+		assert exact <= hist.percentile(p) <= exact * (1 + 2 ** -(hist.sub_bits - 1)) + 1
+	assert hist.percentile(100) == max(values)
+
+
+def test_remove_and_merge():
+	a, b = LatencyHistogram(), LatencyHistogram()
+	for v in (5, 10, 400):
+		a.record(v)
+	a.remove(400)
+	assert a.total == 2 and a.percentile(100) == 10
+	for v in (20, 30):
+		b.record(v)
+	a.merge(b)
+	assert a.percentiles((50, 100)) == {"p50": 10, "p100": 30}
+	with pytest.raises(ValueError):
+		a.merge(LatencyHistogram(sub_bits=5))
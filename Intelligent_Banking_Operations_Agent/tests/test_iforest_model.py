@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+
+from src.fraud_detection.iforest_model import IsolationForestArrays
+from src.fraud_detection.model_registry import ModelRegistry
+
+
+NAMES = [f"f{i}" for i in range(5)]
+
+
+def _data(seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+	rng = np.random.default_rng(seed)
+	train = rng.normal(size=(600, 5))
+	test = np.vstack([rng.normal(size=(200, 5)), rng.normal(loc=6.0, size=(20, 5))])
+	return train, test
+
+
+@pytest.mark.parametrize("max_features", [1.0, 0.6])
+def test_flattened_forest_matches_sklearn(max_features):
+	train, test = _data()
+	forest = IsolationForest(n_estimators=40, max_features=max_features, random_state=7).fit(train)
+	model = IsolationForestArrays.from_sklearn(forest, NAMES)
+	np.testing.assert_allclose(model.score_matrix(test), -forest.score_samples(test), rtol=1e-12)
+	assert model.score_vector(test[-1]) == pytest.approx(-forest.score_samples(test[-1:])[0], rel=1e-12)
+	assert model.score_matrix(test[-20:]).min() > model.score_matrix(test[:200]).mean()
+
+
+def test_column_index_reorders_or_rejects_layouts():
+	forest = IsolationForest(n_estimators=5, random_state=0).fit(_data()[0])
+	model = IsolationForestArrays.from_sklearn(forest, NAMES)
+	assert model.column_index(["x", *reversed(NAMES)]).tolist() == [5, 4, 3, 2, 1]
+	assert model.column_index(NAMES[:4]) is None
+
+
+def _registry(root) -> ModelRegistry[IsolationForestArrays]:
+	return ModelRegistry(root, build=IsolationForestArrays.from_arrays, poll_s=0.0)
+
+
+def _save(registry: ModelRegistry, model: IsolationForestArrays) -> str:
+	return registry.save(model.to_arrays(), {"feature_names": list(model.feature_names), "max_depth": model.max_depth, "normalizer": model.normalizer})
+
+
+def test_registry_activation_reaches_other_instances(tmp_path):
+	train, test = _data(1)
+	models = [IsolationForestArrays.from_sklearn(IsolationForest(n_estimators=10, random_state=s).fit(train), NAMES) for s in (1, 2)]
+	writer, reader = _registry(tmp_path), _registry(tmp_path)
+	assert reader.active() is None
+
+	v1, v2 = _save(writer, models[0]), _save(writer, models[1])
+	assert (v1, v2) == ("v0001", "v0002") and writer.versions() == [v1, v2]
+	assert reader.active() is None  # saving does not activate
+
+	writer.activate(v1)
+	version, served = reader.active()
+	assert version == v1
+	np.testing.assert_array_equal(served.score_matrix(test), models[0].score_matrix(test))
+	assert isinstance(np.load(tmp_path / v1 / "left.npy", mmap_mode="r"), np.memmap)
+
+	writer.activate(v2)
+	assert reader.active()[0] == v2
+	with pytest.raises(KeyError):
+		writer.activate("v0099")
+	assert reader.active()[0] == v2
+
+
+def test_registry_keeps_serving_when_the_new_version_is_unreadable(tmp_path):
+	model = IsolationForestArrays.from_sklearn(IsolationForest(n_estimators=5, random_state=0).fit(_data()[0]), NAMES)
+	registry = _registry(tmp_path)
+	registry.activate(_save(registry, model))
+	broken = _save(registry, model)
+	(tmp_path / broken / "left.npy").unlink()
+	(tmp_path / "ACTIVE").write_text(broken)
+	assert registry.active()[0] == "v0001"
@@ -0,0 +1,37 @@
+from src.core import metrics
+from src.core.metrics import MetricsRegistry, record_decision, span
+
+
+def test_render_uses_the_prometheus_text_format():
+	reg = MetricsRegistry()
+	reg.describe("stage_seconds", "histogram", "Stage time.")
+	for value in (0.002, 0.02, 0.02, 5.0):
+		reg.observe("stage_seconds", "stage", "score", value, bounds=(0.01, 0.1))
+	reg.inc("decisions_total", "intent", "fraud")
+	reg.inc("decisions_total", "intent", "fraud", 2)
+	reg.set("lag_bytes", "group", "g", 1024)
+
+	lines = reg.render().splitlines()
+	assert lines[:2] == ["# HELP stage_seconds Stage time.", "# TYPE stage_seconds histogram"]
+	assert 'stage_seconds_bucket{stage="score",le="0.01"} 1' in lines
+	assert 'stage_seconds_bucket{stage="score",le="0.1"} 3' in lines
+	assert 'stage_seconds_bucket{stage="score",le="+Inf"} 4' in lines
+	assert 'stage_seconds_count{stage="score"} 4' in lines
+	assert float(next(x for x in lines if x.startswith("stage_seconds_sum")).split()[-1]) == 0.002 + 0.02 + 0.02 + 5.0
+	assert "# TYPE decisions_total counter" in lines and 'decisions_total{intent="fraud"} 3' in lines
+	assert "# TYPE lag_bytes gauge" in lines and 'lag_bytes{group="g"} 1024' in lines
+
+
+def test_span_and_decision_helpers_feed_the_process_registry(monkeypatch):
+	reg = MetricsRegistry()
+	monkeypatch.setattr(metrics, "registry", reg)
+	with span("unit_stage") as sp:
+		pass
+	assert sp.elapsed_s >= 0.0
+	record_decision("fraud", 0.010, budget_ms=150)
+	record_decision("fraud", 0.200, budget_ms=150)
+
+	text = reg.render()
+	assert 'banking_stage_duration_seconds_count{stage="unit_stage"} 1' in text
+	assert 'banking_triage_requests_total{intent="fraud"} 2' in text
+	assert 'banking_triage_over_budget_total{intent="fraud"} 1' in text
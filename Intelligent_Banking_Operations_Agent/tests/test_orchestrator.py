@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from src.agents import langgraph_workflow
+from src.channels.fraud_pipeline import fraud_explanations
+
+
+@pytest.fixture(autouse=True)
+def _no_policy_index(monkeypatch):
+	monkeypatch.setattr(langgraph_workflow, "get_compliance_agent", lambda: None)
+
+
+def test_graph_is_compiled_once_per_process(monkeypatch):
+	builds = []
+	build = langgraph_workflow.build_triage_graph
+
+	def counting_build():
+		builds.append(1)
+		return build()
+
+	monkeypatch.setattr(langgraph_workflow, "build_triage_graph", counting_build)
+	monkeypatch.setattr(langgraph_workflow, "_orchestrator", None)
+	first = langgraph_workflow.get_orchestrator()
+	assert langgraph_workflow.get_orchestrator() is first
+	assert len(builds) == 1
+
+
+def test_shared_orchestrator_scores_mixed_payloads_in_order(online_store):
+	payloads = [
+		{"account_id": "acct-1", "amount": 25.0, "mcc": "7995", "device_id": "d1"},
+		{"income": 5000.0, "liabilities": 1200.0},
+		{"account_id": "acct-1", "amount": 30.0, "mcc": "5411", "device_id": "d1"},
+	]
+
+	async def run():
+		orchestrator = langgraph_workflow.get_orchestrator()
+		return await orchestrator.ainvoke_many(payloads), await orchestrator.ainvoke(payloads[0])
+
+	results, single = asyncio.run(run())
+	assert [r["intent"] for r in results] == ["fraud", "credit", "fraud"]
+	assert "score" in results[1] and "alert_score" not in results[1]
+	for r in (results[0], single):
+		assert "Merchant Category (7995) is flagged as high-risk" in r["explanations"]
+		from_features = fraud_explanations(r["features"], "7995", None)
+		assert r["explanations"][:len(from_features)] == from_features
+		assert r["summary"] == f"{r['risk_band'].capitalize()} Risk ({round(r['alert_score'] * 100)}/100): " + ("Approve." if r["risk_band"] == "low" else "Manual review recommended.")
+	assert len({results[0]["event_id"], results[2]["event_id"], single["event_id"]}) == 3
@@ -0,0 +1,58 @@
+from src.rag import query_cache
+from src.rag.query_cache import QueryCache, normalize_query
+from src.rag.retriever import PolicyRetriever
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+	clock = [100.0]
+	monkeypatch.setattr(query_cache, "monotonic", lambda: clock[0])
+	cache = QueryCache(max_entries=4, ttl_s=10.0)
+	cache.put("a", 1)
+	clock[0] += 9.9
+	assert cache.get("a") == 1
+	clock[0] += 0.2
+	assert cache.get("a") is None
+	assert cache.stats()["size"] == 0 and (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+	cache = QueryCache(max_entries=2, ttl_s=60.0)
+	cache.put("a", 1)
+	cache.put("b", 2)
+	assert cache.get("a") == 1  # "b" is now the least recently used
+	cache.put("c", 3)
+	assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+	assert cache.evictions == 1
+
+	disabled = QueryCache(max_entries=0)
+	disabled.put("a", 1)
+	assert disabled.get("a") is None
+
+
+def test_retriever_cache_is_keyed_by_index_version(tmp_path):
+	retriever = PolicyRetriever(str(tmp_path), cache=QueryCache(16, 60.0), mode="lexical")
+	retriever.add_documents([{"doc_id": "a", "text": "wire transfer limits"}, {"doc_id": "b", "text": "card chargeback rules"}])
+	first = retriever.query("Chargeback  RULES", k=1)
+	assert [h["doc_id"] for h in first] == ["b"]
+	assert retriever.query("chargeback rules", k=1) == first
+	assert retriever.cache.hits == 1 and normalize_query("Chargeback  RULES") == "chargeback rules"
+
+	version = retriever.index_version
+	retriever.reindex([{"doc_id": "c", "text": "chargeback rules for disputes"}])
+	assert retriever.index_version > version and retriever.cache.stats()["size"] == 0
+	assert [h["doc_id"] for h in retriever.query("chargeback rules", k=1)] == ["c"]
+
+
+def test_results_of_a_search_overtaken_by_a_reindex_are_not_cached(tmp_path):
+	retriever = PolicyRetriever(str(tmp_path), cache=QueryCache(16, 60.0), mode="lexical")
+	retriever.add_documents([{"doc_id": "a", "text": "wire transfer limits"}])
+	search = retriever._search
+
+	def reindexed_during_search(texts, k):
+		out = search(texts, k)
+		retriever._invalidate()
+		return out
+
+	retriever._search = reindexed_during_search
+	assert retriever.query("wire limits", k=1)
+	assert retriever.cache.stats()["size"] == 0
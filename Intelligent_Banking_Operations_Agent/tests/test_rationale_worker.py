@@ -0,0 +1,111 @@
+import asyncio
+
+from src.agents.rationale_worker import FakeLLM, RationaleService
+
+
+CONTEXT = {"decision": "review", "risk_band": "high", "explanations": ["New device"], "summary": "High Risk (80/100): Manual review recommended."}
+
+
+def _service(llm, **kw) -> RationaleService:
+	kw.setdefault("rate_per_s", 0.0)
+	kw.setdefault("backoff_s", 0.001)
+	return RationaleService(llm, **kw)
+
+
+class _FlakyLLM(FakeLLM):
+	"""Fails the first `failures` calls with `error`."""
+
+	def __init__(self, failures: int, error: Exception) -> None:
+		super().__init__(latency_s=0.0)
+		self.failures = failures
+		self.error = error
+
+	async def complete(self, system: str, prompt: str) -> str:
+		if self.calls < self.failures:
+			self.calls += 1
+			raise self.error
+		return await super().complete(system, prompt)
+
+
+class _HTTPError(Exception):
+	def __init__(self, status_code: int) -> None:
+		super().__init__(f"HTTP {status_code}")
+		self.response = type("Response", (), {"status_code": status_code})()
+
+
+def test_queue_full_jobs_are_dropped():
+	async def run():
+		service = _service(FakeLLM(latency_s=0.0), concurrency=1, queue_max=1)
+		statuses = [service.submit("fraud", f"e{i}", CONTEXT).status for i in range(3)]
+		job = await service.wait("e0", 1.0)
+		await service.close()
+		return statuses, job.status, service.get("e2").error
+
+	statuses, first, error = asyncio.run(run())
+	assert statuses == ["queued", "dropped", "dropped"]
+	assert first == "done"
+	assert error == "rationale queue full"
+
+
+def test_retryable_failures_are_retried_with_backoff():
+	async def run():
+		llm = _FlakyLLM(2, _HTTPError(503))
+		service = _service(llm, max_retries=3)
+		service.submit("fraud", "e1", CONTEXT)
+		job = await service.wait("e1", 1.0)
+		await service.close()
+		return job, llm.calls
+
+	job, calls = asyncio.run(run())
+	assert job.status == "done" and job.attempts == 3 and calls == 3
+	assert job.rationale.startswith("Decision review at high.")
+
+
+def test_client_errors_and_exhausted_retries_fail():
+	async def run(error, max_retries):
+		service = _service(_FlakyLLM(10, error), max_retries=max_retries)
+		service.submit("fraud", "e1", CONTEXT)
+		job = await service.wait("e1", 1.0)
+		await service.close()
+		return job
+
+	bad_request = asyncio.run(run(_HTTPError(400), 3))
+	assert bad_request.status == "failed" and bad_request.attempts == 1
+	exhausted = asyncio.run(run(RuntimeError("down"), 2))
+	assert exhausted.status == "failed" and exhausted.attempts == 3
+	assert exhausted.error == "RuntimeError: down"
+
+
+def test_slow_calls_time_out():
+	async def run():
+		service = _service(FakeLLM(latency_s=1.0), timeout_s=0.02, max_retries=1)
+		service.submit("credit", "e1", {"decision": "approve", "score": 720})
+		job = await service.wait("e1", 2.0)
+		await service.close()
+		return job
+
+	job = asyncio.run(run())
+	assert job.status == "failed" and job.attempts == 2
+	assert job.error.startswith("TimeoutError")
+
+
+def test_identical_cases_hit_the_cache():
+	async def run():
+		llm = FakeLLM(latency_s=0.0)
+		service = _service(llm)
+		service.submit("fraud", "e1", CONTEXT)
+		first = await service.wait("e1", 1.0)
+		service.submit("fraud", "e2", dict(CONTEXT))
+		second = await service.wait("e2", 1.0)
+		await service.close()
+		return first, second, llm.calls
+
+	first, second, calls = asyncio.run(run())
+	assert calls == 1
+	assert not first.cached and second.cached
+	assert second.status == "done" and second.rationale == first.rationale
+
+
+def test_rate_limiter_exists_before_first_submit():
+	service = RationaleService(FakeLLM(latency_s=0.0), rate_per_s=2.0)
+	assert service._limiter.interval == 0.5
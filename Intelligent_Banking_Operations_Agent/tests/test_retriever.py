@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+
+from src.core.config import get_settings
+from src.rag.chunking import chunk_documents
+from src.rag.indexer import index_policies
+from src.rag.retriever import PolicyRetriever
+
+
+POLICIES = str(Path(__file__).resolve().parent.parent / "data" / "policies")
+
+
+class _NoStore(PolicyRetriever):
+	def _open_collection(self):
+		raise AssertionError("lexical mode must not open the vector store")
+
+
+def test_lexical_mode_never_opens_the_vector_store(tmp_path):
+	retriever = _NoStore(str(tmp_path), mode="lexical")
+	assert retriever.count() == 0
+	index_policies(retriever, POLICIES)
+	assert retriever.count() > 0
+	hits = retriever.query("customer due diligence kyc", k=3)
+	assert hits and all(h["metadata"]["doc_id"] for h in hits)
+
+	# A fresh process reads the persisted corpus, also after invalidation
+	restarted = _NoStore(str(tmp_path), mode="lexical")
+	assert restarted.count() == retriever.count()
+	restarted._invalidate()
+	assert restarted.query("customer due diligence kyc", k=3) == hits
+
+
+def test_lexical_add_documents_and_reindex(tmp_path):
+	retriever = _NoStore(str(tmp_path), mode="lexical")
+	retriever.add_documents([{"doc_id": "a", "text": "wire transfer limits"}, {"doc_id": "b", "text": "card chargeback rules"}])
+	assert [h["doc_id"] for h in retriever.query("chargeback", k=1)] == ["b"]
+	retriever.reindex([{"doc_id": "c", "text": "safe deposit lockers"}])
+	assert _NoStore(str(tmp_path), mode="lexical").count() == 1
+
+
+def test_dense_sync_persists_the_lexical_corpus(tmp_path, monkeypatch):
+	monkeypatch.setattr(get_settings(), "embedding_model", "hashing")
+	monkeypatch.setattr(get_settings(), "embedding_cache_enabled", False)
+	dense = PolicyRetriever(str(tmp_path), backend="numpy", mode="hybrid")
+	report = index_policies(dense, POLICIES)
+	assert report.embedded
+	lexical = _NoStore(str(tmp_path), mode="lexical")
+	assert lexical.count() == dense.count()
+	assert dense.query("customer due diligence", k=2) and lexical.query("customer due diligence", k=2)
+
+	# Unchanged policies do not rewrite the corpus
+	corpus = tmp_path / "lexical.json"
+	mtime = corpus.stat().st_mtime_ns
+	assert not index_policies(PolicyRetriever(str(tmp_path), backend="numpy", mode="hybrid"), POLICIES).changed
+	assert corpus.stat().st_mtime_ns == mtime
+
+
+def test_missing_or_empty_policies_dir_keeps_the_index(tmp_path):
+	retriever = _NoStore(str(tmp_path / "index"), mode="lexical")
+	index_policies(retriever, get_settings().policies_dir)
+	count = retriever.count()
+	assert count > 0
+
+	(tmp_path / "empty").mkdir()
+	for policies_dir in (tmp_path / "missing", tmp_path / "empty"):
+		assert not index_policies(retriever, str(policies_dir)).changed
+		assert retriever.count() == count
@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.fraud_detection import rules_runtime
+from src.fraud_detection.feature_engineering import FEATURE_NAMES
+from src.fraud_detection.rule_engine import evaluate_rules, evaluate_rules_batch
+from src.fraud_detection.rule_plan import BUILTIN_RULES, OPERATORS, RuleSpec, compile_plan
+
+
+@pytest.fixture(autouse=True)
+def _no_runtime_rules():
+	rules_runtime.clear_runtime_rules()
+	yield
+	rules_runtime.clear_runtime_rules()
+
+
+def _reference(rules: list[RuleSpec], features: dict) -> tuple[float, list[str]]:
+	# Built-in and runtime weights are summed separately, as rules were before plans
+	builtin = extra = 0.0
+	hits = []
+	for j, rule in enumerate(rules):
+		value = float(features.get(rule.feature, 0.0))
+		if OPERATORS[rule.operator](value, rule.value):
+			if j < len(BUILTIN_RULES):
+				builtin += rule.weight
+			else:
+				extra += rule.weight
+			hits.append(rule.description.format(value=value) if rule.templated else rule.description)
+	return min(builtin + extra, 1.0), hits
+
+
+def _random_rows(rng: random.Random, n: int) -> np.ndarray:
+	return np.array([
+		[rng.choice([0.0, 1.0, 2.0, 4.0, 5.0, 6.0, rng.uniform(-5, 8)]) for _ in FEATURE_NAMES]
+		for _ in range(n)
+	])
+
+
+def test_plan_evaluate_and_matrix_match_the_rule_definitions():
+	runtime = [
+		RuleSpec("velocity exactly 4", "velocity_1h_count", "==", 4.0, 0.15),
+		RuleSpec("tiny amount", "amount_zscore", "<", -2.0, 0.05),
+		RuleSpec("late hours", "hour_of_day", ">", 22.0, 0.1),
+		RuleSpec("low 24h velocity", "velocity_24h_count", "<=", 1.0, 0.01),
+		RuleSpec("custom feature", "not_a_feature", ">=", 0.0, 0.3),
+		RuleSpec("bad operator", "amount_zscore", "!=", 0.0, 0.9),
+	]
+	plan = compile_plan(runtime, version=7)
+	assert len(plan.rules) == len(BUILTIN_RULES) + 5  # unknown operator dropped
+	rules = list(plan.rules)
+
+	matrix = _random_rows(random.Random(3), 300)
+	scores, hit_mask = plan.evaluate_matrix(matrix, FEATURE_NAMES)
+	for i, row in enumerate(matrix):
+		features = dict(zip(FEATURE_NAMES, row.tolist()))
+		expected = _reference(rules, features)
+		assert plan.evaluate(features) == expected
+		assert scores[i] == expected[0]
+		assert plan.hits_for_row(hit_mask[i], features) == expected[1]
+
+
+def test_rule_engine_batch_matches_per_row_under_runtime_rules():
+	rules_runtime.add_runtime_rule({"description": "burst", "feature": "velocity_1h_count", "operator": ">", "value": 3, "weight": 0.3})
+	rules_runtime.add_runtime_rule({"description": "odd op", "feature": "is_night", "operator": "~", "value": 1})
+	assert rules_runtime.get_rule_plan().version >= 2
+
+	matrix = _random_rows(random.Random(9), 200)
+	scores, hits = evaluate_rules_batch(matrix, FEATURE_NAMES)
+	for i, row in enumerate(matrix):
+		assert evaluate_rules(dict(zip(FEATURE_NAMES, row.tolist()))) == (scores[i], hits[i])
+
+
+def test_malformed_feature_values_are_skipped():
+	plan = compile_plan([RuleSpec("text feature", "channel", "==", 1.0, 0.5)], version=1)
+	score, hits = plan.evaluate({"channel": "web", "high_risk_mcc": 1.0})
+	assert hits == ["high-risk MCC"] and score == pytest.approx(0.2)
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from src.agents import scoring_pool
+from src.agents.scoring_pool import _HEADER, ScoringPool, SharedSnapshot, update_fraud_config
+from src.fraud_detection.fraud_config import get_config
+
+
+@pytest.fixture
+def snapshot():
+	snap = SharedSnapshot()
+	yield snap
+	snap.close()
+
+
+def test_snapshot_round_trip(snapshot):
+	snapshot.publish(b'{"rules": []}')
+	assert snapshot.read() == (2, b'{"rules": []}')
+
+
+def test_read_gives_up_on_a_stuck_writer(snapshot, monkeypatch):
+	snapshot.publish(b"{}")
+	_HEADER.pack_into(snapshot.shm.buf, 0, 3, 0)  # writer died mid-publish
+	monkeypatch.setattr(scoring_pool, "_READ_ATTEMPTS", 5)
+	with pytest.raises(TimeoutError):
+		snapshot.read()
+
+	monkeypatch.setattr(scoring_pool, "_snapshot", snapshot)
+	monkeypatch.setattr(scoring_pool, "_applied_seq", 2)
+	scoring_pool._sync_state()
+	assert scoring_pool._applied_seq == 2
+
+
+def test_publish_state_only_on_rule_or_config_change():
+	pool = ScoringPool(workers=1, max_batch=8, max_wait_s=0.001)
+	original = get_config().anomaly_method
+	try:
+		seq = pool.snapshot.sequence()
+		pool.publish_state()
+		assert pool.snapshot.sequence() == seq
+
+		update_fraud_config(anomaly_method="iforest")
+		pool.publish_state()
+		assert pool.snapshot.sequence() == seq + 2
+		assert json.loads(pool.snapshot.read()[1])["config"]["anomaly_method"] == "iforest"
+	finally:
+		update_fraud_config(anomaly_method=original)
+		pool.close()
+
+
+def test_micro_batcher_tracks_batches_and_logs_failures(caplog):
+	import asyncio
+
+	from src.agents.scoring_pool import MicroBatcher
+
+	async def dispatch(items):
+		if "bad" in items:
+			return None  # not a result list: fails inside the batch task
+		return [item.upper() for item in items]
+
+	async def main():
+		batcher = MicroBatcher(dispatch, workers=1, max_batch=8, max_wait_s=0.01)
+		assert await asyncio.gather(batcher.submit("a"), batcher.submit("b")) == ["A", "B"]
+		assert not batcher._tasks
+
+		waiter = asyncio.ensure_future(batcher.submit("bad"))
+		await asyncio.sleep(0.05)
+		assert not batcher._tasks
+		waiter.cancel()
+
+	with caplog.at_level("ERROR", logger="src.agents.scoring_pool"):
+		asyncio.run(main())
+	assert "Micro-batch dispatch failed" in caplog.text
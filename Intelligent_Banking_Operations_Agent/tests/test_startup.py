@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from src.agents import langgraph_workflow
+from src.core import startup
+from src.fraud_detection import feature_store
+
+
+@pytest.fixture(autouse=True)
+def _fresh_report(monkeypatch):
+	monkeypatch.setattr(startup, "report", startup.StartupReport())
+
+
+def _fail():
+	raise RuntimeError("boom")
+
+
+def test_failed_components_are_reported_as_degraded():
+	async def optional_down():
+		raise OSError("connection refused")
+
+	report = asyncio.run(startup.prewarm({
+		"ok": (lambda: "fine", True),
+		"broken": (_fail, True),
+		"optional": (optional_down, False),
+	}))
+	body = report.to_dict()
+	assert body["ready"] is True
+	assert body["status"] == "degraded"
+	assert body["degraded"] == ["broken", "optional"]
+	assert body["components"]["ok"]["status"] == "ready"
+
+
+def test_all_ready():
+	report = asyncio.run(startup.prewarm({"ok": (lambda: None, True)}))
+	assert report.status() == "ready" and report.degraded() == []
+
+
+def test_missing_policy_index_fails_the_component(monkeypatch):
+	monkeypatch.setattr(langgraph_workflow, "get_compliance_agent", lambda: None)
+	with pytest.raises(RuntimeError):
+		startup._warm_policy_index()
+
+
+def test_feature_store_in_backoff_fails_the_component(monkeypatch):
+	async def unavailable():
+		return None
+
+	monkeypatch.setattr(feature_store, "get_feature_store", unavailable)
+	with pytest.raises(RuntimeError):
+		asyncio.run(startup._warm_feature_store())
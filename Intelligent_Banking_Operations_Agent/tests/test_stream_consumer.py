@@ -0,0 +1,76 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+from src.channels import fraud_pipeline
+from src.channels.stream_consumer import FileTailConsumer
+
+
+def test_batch_on_one_account_accumulates_velocity(online_store, monkeypatch, tmp_path):
+	topic = tmp_path / "topic"
+	topic.mkdir()
+	t0 = datetime(2024, 3, 1, 12, 0)
+	with (topic / "00000.ndjson").open("w") as f:
+		for i in range(6):
+			f.write(json.dumps({"event_id": f"e{i}", "account_id": "acct-1", "amount": 50.0, "device_id": "d1", "ts": (t0 + timedelta(seconds=i)).isoformat()}) + "\n")
+
+	seen: list[dict] = []
+	score = fraud_pipeline.triage_fraud_features
+
+	async def capturing(items):
+		seen.extend(item["features"] for item in items)
+		return await score(items)
+
+	monkeypatch.setattr(fraud_pipeline, "triage_fraud_features", capturing)
+	consumer = FileTailConsumer(topic, group="g", offsets_dir=tmp_path / "offsets", output=tmp_path / "out.ndjson", batch_max_events=100, batch_max_wait_s=0.01, poll_interval_s=0.01)
+
+	async def run():
+		stop = asyncio.Event()
+		batch = await consumer._next_batch(stop)
+		assert len(batch) == 6
+		await consumer._process(batch)
+
+	asyncio.run(run())
+	assert [f["velocity_1h_count"] for f in seen] == [float(i) for i in range(6)]
+	assert [f["velocity_1h_total"] for f in seen] == [50.0 * i for i in range(6)]
+	records = [json.loads(line) for line in (tmp_path / "out.ndjson").read_text().splitlines()]
+	assert [r["event_id"] for r in records] == [f"e{i}" for i in range(6)]
+	assert consumer.committed.lines == 6
+
+
+def _consumer(tmp_path) -> FileTailConsumer:
+	return FileTailConsumer(tmp_path / "topic", group="g", offsets_dir=tmp_path / "offsets", output=tmp_path / "out.ndjson")
+
+
+def test_corrupt_offsets_file_restarts_from_the_beginning(tmp_path):
+	from src.channels.stream_consumer import CommittedOffset
+
+	offsets = tmp_path / "offsets"
+	offsets.mkdir()
+	for content in ("", "{not json", '["a list"]', '{"unknown": 1}'):
+		(offsets / "g.json").write_text(content)
+		assert _consumer(tmp_path).committed == CommittedOffset()
+
+	consumer = _consumer(tmp_path)
+	consumer._commit(CommittedOffset(segment="00000.ndjson", position=42, lines=3))
+	assert _consumer(tmp_path).committed == consumer.committed
+
+
+def test_consumer_task_failure_is_logged(tmp_path, caplog):
+	from src.channels import stream_consumer
+
+	consumer = _consumer(tmp_path)
+
+	async def failing_run(stop):
+		raise RuntimeError("disk gone")
+
+	consumer.run = failing_run
+
+	async def main():
+		stream_consumer.start_consumer(consumer)
+		await stream_consumer.stop_consumers()
+
+	with caplog.at_level("ERROR", logger="src.channels.stream_consumer"):
+		asyncio.run(main())
+	assert "Stream consumer g stopped with an error" in caplog.text
+	assert "disk gone" in caplog.text
@@ -0,0 +1,89 @@
+from src.fraud_detection.telemetry import Label, TriageEvent, _EventRing
+
+
+def _event(event_id: str, risk_band: str = "low", sla_ms: int | None = 10) -> TriageEvent:
+	return TriageEvent(
+		event_id=event_id,
+		timestamp_s=0.0,
+		intent="fraud",
+		payload={},
+		decision="approve",
+		risk_band=risk_band,
+		alert_score=0.1,
+		explanations=[],
+		features={},
+		sla_ms=sla_ms,
+	)
+
+
+def _label(ring: _EventRing, event_id: str, label: str) -> None:
+	ring.set_label(event_id, Label(event_id=event_id, label=label, timestamp_s=0.0))
+
+
+def test_ring_indexes_by_id_and_drops_labels_with_evicted_events():
+	ring = _EventRing(3)
+	for i in range(3):
+		ring.append(_event(f"e{i}"))
+	_label(ring, "e0", "fraud")
+	_label(ring, "e2", "genuine")
+
+	ring.append(_event("e3"))
+	ring.append(_event("e4"))
+	assert ring.get("e0") is None and ring.get("e1") is None
+	assert [e.event_id for e in ring.ordered()] == ["e2", "e3", "e4"]
+	assert [e.event_id for e in ring.ordered(2)] == ["e3", "e4"]
+	assert set(ring.index) == {"e2", "e3", "e4"}
+	assert set(ring.labels) == {"e2"}
+
+
+def test_reused_event_id_takes_over_the_index_and_sheds_its_label():
+	ring = _EventRing(3)
+	ring.append(_event("a", risk_band="high"))
+	_label(ring, "a", "fraud")
+	ring.append(_event("b"))
+	ring.append(_event("a", risk_band="low"))
+	assert "a" not in ring.labels
+	assert ring.get("a").risk_band == "low"
+	assert ring.confusion == {"tp": 0, "fp": 0, "tn": 0, "fn": 0}
+
+	# Evicting the stale first "a" must not unindex the newer one
+	ring.append(_event("c"))
+	assert ring.get("a").risk_band == "low"
+	_label(ring, "a", "genuine")
+	assert ring.confusion["tn"] == 1
+
+
+def test_incremental_kpi_aggregates_match_a_full_recompute():
+	import random
+
+	from src.core.histogram import LatencyHistogram
+	from src.fraud_detection.telemetry import _confusion_cell
+
+	rng = random.Random(4)
+	ring = _EventRing(50)
+	for step in range(2000):
+		if rng.random() < 0.7 or not ring.index:
+			event_id = f"e{rng.randint(0, 400)}"  # ids repeat, as replays do
+			ring.append(_event(event_id, rng.choice(["low", "medium", "high"]), rng.choice([None, rng.randint(0, 5000)])))
+		else:
+			_label(ring, rng.choice(list(ring.index)), rng.choice(["fraud", "genuine"]))
+		if step % 97:
+			continue
+
+		live = ring.ordered()
+		bands = {"low": 0, "medium": 0, "high": 0}
+		for ev in live:
+			bands[ev.risk_band] += 1
+		confusion = {"tp": 0, "fp": 0, "tn": 0, "fn": 0}
+		for event_id, lbl in ring.labels.items():
+			confusion[_confusion_cell(ring.get(event_id).risk_band, lbl.label)] += 1
+		latencies = [ev.sla_ms for ev in live if ev.sla_ms is not None]
+		hist = LatencyHistogram()
+		for ms in latencies:
+			hist.record(ms)
+
+		assert ring.band_counts == bands
+		assert ring.confusion == confusion
+		assert (ring.latency_total, ring.latency_count) == (sum(latencies), len(latencies))
+		trim = lambda counts: counts[:max((i + 1 for i, c in enumerate(counts) if c), default=0)]
+		assert trim(ring.latency_hist.counts) == trim(hist.counts)
@@ -0,0 +1,89 @@
+import json
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.core.config import get_settings
+from src.fraud_detection import iforest_model, training_jobs
+from src.fraud_detection.feature_engineering import FEATURE_NAMES
+from src.fraud_detection.training_jobs import reservoir_sample
+
+
+def _rows(n: int):
+	return ((np.array([float(i)]), (i + 1) / n) for i in range(n))
+
+
+def test_reservoir_keeps_short_streams_whole_and_bounds_long_ones():
+	sample, seen = reservoir_sample(_rows(5), 10)
+	assert seen == 5 and sample[:, 0].tolist() == [0, 1, 2, 3, 4]
+	sample, seen = reservoir_sample(_rows(1000), 10, seed=3)
+	assert seen == 1000 and sample.shape == (10, 1) and len(set(sample[:, 0])) == 10
+	assert reservoir_sample(iter(()), 10)[1] == 0
+
+
+def test_reservoir_sample_is_uniform():
+	hits = np.zeros(20)
+	for seed in range(2000):
+		sample, _ = reservoir_sample(_rows(20), 5, seed=seed)
+		hits[sample[:, 0].astype(int)] += 1
+	# Each row is kept with probability 5/20: 500 expected per row
+	assert np.all(np.abs(hits - 500) < 90)
+
+
+def test_reservoir_reports_progress(monkeypatch):
+	monkeypatch.setattr(training_jobs, "_PROGRESS_EVERY", 4)
+	calls = []
+	reservoir_sample(_rows(10), 3, on_progress=lambda seen, done: calls.append((seen, done)))
+	assert calls == [(4, 0.4), (8, 0.8)]
+
+
+@pytest.fixture
+def inline_jobs(tmp_path, monkeypatch):
+	"""Run training jobs on a thread against a temporary model registry."""
+	monkeypatch.setattr(get_settings(), "iforest_registry_dir", str(tmp_path / "models"))
+	monkeypatch.setattr(iforest_model, "_registry", None)
+	monkeypatch.setattr(os, "nice", lambda inc: 0, raising=False)
+	executor = ThreadPoolExecutor(max_workers=1)
+	monkeypatch.setattr(training_jobs, "_executor", executor)
+	monkeypatch.setattr(training_jobs, "_jobs", {})
+	monkeypatch.setattr(training_jobs, "_futures", {})
+	yield tmp_path
+	executor.shutdown(wait=True)
+
+
+def _export(path, n: int) -> str:
+	rng = random.Random(0)
+	with open(path, "w", encoding="utf-8") as f:
+		for _ in range(n):
+			f.write(json.dumps({"features": {name: rng.random() for name in FEATURE_NAMES}}) + "\n")
+	return str(path)
+
+
+def test_training_job_runs_to_an_active_version(inline_jobs):
+	job = training_jobs.submit_training(source="file", path=_export(inline_jobs / "rows.jsonl", 300), sample_size=100)
+	assert job.status == "queued"
+	training_jobs._futures[job.job_id].result(timeout=60)
+
+	done = training_jobs.get_job(job.job_id)
+	assert done.status == "succeeded" and done.progress == 1.0
+	assert (done.rows_seen, done.rows_sampled) == (300, 100)
+	assert done.version == iforest_model.get_model_info().version
+	assert iforest_model.get_active_model() is not None
+	assert [j.job_id for j in training_jobs.list_jobs()] == [job.job_id]
+
+
+def test_training_job_failure_is_reported(inline_jobs):
+	job = training_jobs.submit_training(source="file", path=_export(inline_jobs / "rows.jsonl", 1), sample_size=100)
+	with pytest.raises(ValueError):
+		training_jobs._futures[job.job_id].result(timeout=60)
+	failed = training_jobs.get_job(job.job_id)
+	assert failed.status == "failed" and "at least 2" in failed.error
+	assert failed.version is None
+
+	with pytest.raises(FileNotFoundError):
+		training_jobs.submit_training(source="file", path=str(inline_jobs / "missing.jsonl"))
+	with pytest.raises(ValueError):
+		training_jobs.submit_training(source="file", path=str(inline_jobs / "rows.jsonl"), sample_size=1)
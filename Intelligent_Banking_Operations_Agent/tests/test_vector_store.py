@@ -0,0 +1,89 @@
+import multiprocessing
+
+from src.rag.embeddings import HashingEmbedder
+from src.rag.vector_store import NumpyVectorStore
+
+
+def _store(root, **kw) -> NumpyVectorStore:
+	return NumpyVectorStore(root, HashingEmbedder(64), model="hashing-64", poll_s=0.0, **kw)
+
+
+def _write_ids(root: str, prefix: str, n: int) -> None:
+	store = _store(root)
+	for i in range(n):
+		store.upsert([f"{prefix}-{i}"], [f"policy text {prefix} {i}"], [{"i": i}])
+
+
+def test_upsert_query_delete(tmp_path):
+	store = _store(tmp_path)
+	store.upsert(["a", "b"], ["velocity limits for card payments", "affordability and debt to income"], [{"s": "a"}, {"s": "b"}])
+	assert store.count() == 2
+	assert store.query(["card velocity"], n_results=1)["ids"] == [["a"]]
+	store.update(["a"], [{"s": "a2"}])
+	assert store.get(["a"])["metadatas"] == [{"s": "a2"}]
+	store.delete(["a"])
+	assert store.get()["ids"] == ["b"]
+
+
+def test_changes_from_another_instance_are_picked_up(tmp_path):
+	reader = _store(tmp_path)
+	changes = []
+	reader.on_change = lambda: changes.append(1)
+	assert reader.count() == 0
+	_store(tmp_path).upsert(["x"], ["kyc refresh"])
+	assert reader.count() == 1
+	assert changes == [1]
+
+
+def test_old_generations_are_removed(tmp_path):
+	store = _store(tmp_path)
+	for i in range(4):
+		store.upsert([f"id{i}"], [f"text {i}"])
+	names = sorted(p.name for p in tmp_path.iterdir() if not p.name.startswith("."))
+	assert names == ["CURRENT", "index-3.json", "index-4.json", "vectors-3.npy", "vectors-4.npy"]
+
+
+def test_concurrent_writers_in_separate_processes(tmp_path):
+	ctx = multiprocessing.get_context("spawn")
+	procs = [ctx.Process(target=_write_ids, args=(str(tmp_path), f"p{w}", 5)) for w in range(3)]
+	for p in procs:
+		p.start()
+	for p in procs:
+		p.join(60)
+		assert p.exitcode == 0
+	store = _store(tmp_path)
+	assert sorted(store.get()["ids"]) == sorted(f"p{w}-{i}" for w in range(3) for i in range(5))
+	assert (tmp_path / "CURRENT").read_text() == "15"
+
+
+def test_ivf_is_trained_on_write_not_on_query(tmp_path, monkeypatch):
+	from src.rag import vector_store
+
+	docs = [f"policy clause {i} on topic {i % 7}" for i in range(64)]
+	_store(tmp_path, ann_min_rows=32).upsert([f"d{i}" for i in range(64)], docs)
+	assert (tmp_path / "ivf-1.npz").exists()
+
+	def no_training(*args, **kwargs):
+		raise AssertionError("IVF trained on the read path")
+
+	monkeypatch.setattr(vector_store._IVFIndex, "train", no_training)
+	reader = _store(tmp_path, ann_min_rows=32, nprobe=64)
+	assert reader._current().ivf is not None
+	assert reader.query([docs[5]], n_results=1)["ids"] == [["d5"]]
+
+
+def test_ivf_query_with_only_empty_cells_returns_nothing(tmp_path):
+	from dataclasses import replace
+
+	import numpy as np
+
+	from src.rag.vector_store import _IVFIndex
+
+	store = _store(tmp_path)
+	store.upsert(["a", "b"], ["card velocity", "kyc refresh"])
+	# Two cells, all rows in the second; probing one cell finds no candidates
+	ivf = _IVFIndex(np.eye(2, 64, dtype=np.float32), np.array([0, 1]), np.array([0, 0, 2]))
+	store._snapshot = replace(store._current(), ivf=ivf)
+	store.nprobe = 1
+	store.embed = lambda texts: np.tile(np.eye(1, 64, dtype=np.float32), (len(texts), 1))
+	assert store.query(["anything"], n_results=3) == {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}